@@ -0,0 +1,116 @@
+# DayZ Server Monitor
+# Project: DayZ Server Monitor
+# File: benchmarks/bench_bbcode.py
+# Purpose: Micro-benchmark of the BBCode converter (src/bbcode.py) against the previous multi-pass
+#          re.sub implementation, on generated Workshop-sized descriptions.
+#          Run with: python -m benchmarks.bench_bbcode [--sizes 2000 8000 32000] [--repeat 20]
+# Author: Tig Campbell-Moore (firstname[at]lastname[dot]com)
+# License: CC BY-NC 4.0 (see LICENSE file)
+
+import argparse
+import random
+import re
+import time
+from src.bbcode import bbcode_to_discord, bbcode_to_discord_lines
+
+def legacy_bbcode_to_discord(text):
+    """Previous multi-pass implementation from mod_checker.py, kept as the reference for output and timing."""
+    if not text:
+        return ""
+    text = re.sub(r'\[img\](.*?)\[/img\]', '', text, flags=re.DOTALL | re.IGNORECASE)
+    text = re.sub(r'\[image\](.*?)\[/image\]', '', text, flags=re.DOTALL | re.IGNORECASE)
+    text = re.sub(r'\[url(=[^\]]*)?\](.*?)\[/url\]', '', text, flags=re.DOTALL | re.IGNORECASE)
+    text = re.sub(r'<a\b[^>]*>(.*?)</a>', '', text, flags=re.DOTALL | re.IGNORECASE)
+    text = re.sub(r'<img\b[^>]*>', '', text, flags=re.DOTALL | re.IGNORECASE)
+    text = re.sub(r'\[b\](.*?)\[/b\]', r'**\1**', text, flags=re.DOTALL | re.IGNORECASE)
+    text = re.sub(r'\[u\](.*?)\[/u\]', r'__\1__', text, flags=re.DOTALL | re.IGNORECASE)
+    text = re.sub(r'\[i\](.*?)\[/i\]', r'*\1*', text, flags=re.DOTALL | re.IGNORECASE)
+    text = re.sub(r'\[s\](.*?)\[/s\]', r'~~\1~~', text, flags=re.DOTALL | re.IGNORECASE)
+    text = re.sub(r'\[/?(url|color|list|quote|h[1-6]|img|image|spoiler|code|center|size|font|video|audio|flash|table|tr|td|th|hr|li|ol|ul|br|yt|youtube|media|left|right|justify|indent|outdent|sup|sub)(=[^\]]*)?\]', '', text, flags=re.DOTALL | re.IGNORECASE)
+    text = re.sub(r'<[^>]+>', '', text)
+    text = re.sub(r'\[/?[a-zA-Z0-9]+(=[^\]]*)?\]', '', text)
+    lines = [l for l in text.splitlines() if l.strip() and not re.match(r'^[\*\_\~]+$', l.strip())]
+    return "\n".join(lines)
+
+WORDS = (
+    "fixed added removed updated server client weapon vehicle loot spawn config crash desync "
+    "inventory attachment texture model zombie animal performance compatibility patch hotfix"
+).split()
+
+def make_description(size, seed=0):
+    """
+    Build a Workshop-style description of roughly `size` characters: headings, formatted changelog
+    entries, lists, links, images, colour/size tags, HTML fragments and blank lines.
+    """
+    rng = random.Random(seed)
+
+    def sentence(n=8):
+        return " ".join(rng.choice(WORDS) for _ in range(n)).capitalize() + "."
+
+    blocks = []
+    length = 0
+    version = 1
+    while length < size:
+        kind = rng.random()
+        if kind < 0.25:
+            block = f"[h1]Update {version}.{rng.randint(0, 9)}[/h1]\n[list]\n"
+            block += "".join(f"[*] [b]{rng.choice(WORDS)}[/b]: {sentence()}\n" for _ in range(rng.randint(2, 8)))
+            block += "[/list]\n"
+            version += 1
+        elif kind < 0.4:
+            block = f"[url=https://steamcommunity.com/sharedfiles/filedetails/?id={rng.randint(10**9, 10**10)}]" \
+                    f"{sentence(3)}[/url]\n[img]https://i.imgur.com/{rng.randint(0, 10**6)}.png[/img]\n"
+        elif kind < 0.5:
+            block = f"<a href=\"https://discord.gg/{rng.randint(0, 10**6)}\">Discord</a> <img src=\"x.png\"><br>\n"
+        elif kind < 0.65:
+            block = f"[color=#ff0000][size=4][u]{sentence(4)}[/u][/size][/color]\n\n[i]{sentence()}[/i] [s]{sentence(3)}[/s]\n"
+        elif kind < 0.75:
+            block = f"[spoiler]{sentence(12)}[/spoiler]\n[quote=author]{sentence()}[/quote]\n[b][/b]\n   \n"
+        else:
+            block = f"{sentence(rng.randint(6, 20))}\r\n"
+        blocks.append(block)
+        length += len(block)
+    return "".join(blocks)
+
+def time_call(func, text, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(text)
+    return (time.perf_counter() - start) / repeat
+
+def legacy_render(text, max_lines):
+    """Old render_changelog path: convert the whole description, then truncate."""
+    return legacy_bbcode_to_discord(text).splitlines()[:max_lines + 1]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the BBCode to Discord converter")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2000, 8000, 32000], help="Description sizes in characters")
+    parser.add_argument("--repeat", type=int, default=20, help="Conversions per measurement")
+    parser.add_argument("--max-lines", type=int, default=10, help="max_changelog_lines for the early-stop measurement")
+    parser.add_argument("--samples", type=int, default=50, help="Generated descriptions checked for output mismatches")
+    args = parser.parse_args()
+
+    print(f"{'size':>8} {'legacy ms':>10} {'bbcode ms':>10} {'speedup':>8} {'legacy+trunc ms':>16} {'early-stop ms':>14} {'speedup':>8}")
+    for size in args.sizes:
+        text = make_description(size)
+        legacy = time_call(legacy_bbcode_to_discord, text, args.repeat)
+        current = time_call(bbcode_to_discord, text, args.repeat)
+        legacy_trunc = time_call(lambda t: legacy_render(t, args.max_lines), text, args.repeat)
+        early = time_call(lambda t: bbcode_to_discord_lines(t, limit=args.max_lines + 1), text, args.repeat)
+        print(
+            f"{len(text):>8} {legacy * 1000:>10.3f} {current * 1000:>10.3f} {legacy / current:>7.1f}x "
+            f"{legacy_trunc * 1000:>16.3f} {early * 1000:>14.3f} {legacy_trunc / early:>7.1f}x"
+        )
+
+    mismatches = 0
+    for seed in range(args.samples):
+        size = 500 + seed * 200
+        text = make_description(size, seed=seed)
+        if bbcode_to_discord(text) != legacy_bbcode_to_discord(text):
+            mismatches += 1
+            print(f"Output mismatch for seed {seed} (size {size})")
+    print(f"Output mismatches: {mismatches}/{args.samples}")
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
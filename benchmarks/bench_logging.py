@@ -0,0 +1,88 @@
+# DayZ Server Monitor
+# Project: DayZ Server Monitor
+# File: benchmarks/bench_logging.py
+# Purpose: Logging overhead per mod lookup, with the handlers called directly on the logging thread versus
+#          queue mode (logging.queue: a listener thread does the formatting and writes). Worker threads log
+#          what a lookup logs (debug lines per batch and mod, an info line, now and then an exception trace)
+#          through setup_logging's real per-level file handlers.
+#          Run with: python -m benchmarks.bench_logging [--threads 1 10] [--lookups 2000] [--level DEBUG]
+# Author: Tig Campbell-Moore (firstname[at]lastname[dot]com)
+# License: CC BY-NC 4.0 (see LICENSE file)
+
+import argparse
+import contextlib
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from src import logger
+
+def simulate_lookup(n, mods_per_lookup, error_every):
+    """The log calls of one batch lookup in serial/threaded mode."""
+    logging.debug(f"[SERIAL] Fetching mod info for {mods_per_lookup} mods")
+    for i in range(mods_per_lookup):
+        logging.debug(f"[SERIAL] Mod {n * mods_per_lookup + i}: time_updated=1700000000")
+    if error_every and n % error_every == 0:
+        try:
+            raise ConnectionError(f"Simulated failure for batch {n}")
+        except ConnectionError as e:
+            logging.exception(f"[THREADED] Failed for batch of {mods_per_lookup} mods: {e}")
+    logging.info(f"[SERIAL] Completed {mods_per_lookup} mods.")
+
+def run_case(log_dir, queued, threads, lookups, mods_per_lookup, error_every, level):
+    """
+    Returns (caller seconds per lookup, seconds until everything was written).
+    """
+    config = {"logging": {"enabled": True, "level": level, "log_dir": str(log_dir), "queue": queued}}
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stderr(devnull):
+        logger.setup_logging(config)
+        per_thread = lookups // threads
+        caller_seconds = []
+        barrier = threading.Barrier(threads + 1)
+
+        def worker(index):
+            barrier.wait()
+            start = time.perf_counter()
+            for n in range(index * per_thread, (index + 1) * per_thread):
+                simulate_lookup(n, mods_per_lookup, error_every)
+            caller_seconds.append(time.perf_counter() - start)
+
+        workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+        for thread in workers:
+            thread.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for thread in workers:
+            thread.join()
+        logger.stop_queue_logging()
+        total = time.perf_counter() - start
+        for handler in logging.root.handlers[:]:
+            logging.root.removeHandler(handler)
+            handler.close()
+    return sum(caller_seconds) / (per_thread * threads), total
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark logging overhead per mod lookup")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 10], help="Concurrent logging threads")
+    parser.add_argument("--lookups", type=int, default=2000, help="Lookups per case, spread over the threads")
+    parser.add_argument("--mods-per-lookup", type=int, default=5, help="Per-mod debug lines per lookup")
+    parser.add_argument("--error-every", type=int, default=50, help="Log an exception trace every N lookups (0 = never)")
+    parser.add_argument("--level", default="DEBUG", choices=["DEBUG", "INFO"], help="logging.level")
+    args = parser.parse_args()
+
+    print(f"{'threads':>7} {'mode':>7} {'caller us/lookup':>17} {'written after s':>16} {'caller speedup':>15}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for threads in args.threads:
+            results = {}
+            for queued in (False, True):
+                log_dir = os.path.join(tmp, f"{threads}-{int(queued)}")
+                results[queued] = run_case(log_dir, queued, threads, args.lookups, args.mods_per_lookup, args.error_every, args.level)
+            for queued, (per_lookup, total) in results.items():
+                speedup = f"{results[False][0] / per_lookup:>14.1f}x" if queued else f"{'':>15}"
+                print(f"{threads:>7} {'queue' if queued else 'direct':>7} {per_lookup * 1e6:>17.1f} {total:>16.3f} {speedup}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+# DayZ Server Monitor
+# Project: DayZ Server Monitor
+# File: benchmarks/bench_modes.py
+# Purpose: Offline benchmark of the serial, threaded and async mod check modes against the local Steam
+#          stand-in (tests/fakes/steam_server.py). Each mode/mod count runs in its own process so peak RSS
+#          is per run. Results are saved to benchmarks/results/ and compared with the previous run.
+#          Run with: python -m benchmarks.bench_modes [--mod-counts 10 100 1000 5000] [--latency-ms 50]
+# Author: Tig Campbell-Moore (firstname[at]lastname[dot]com)
+# License: CC BY-NC 4.0 (see LICENSE file)
+
+import argparse
+import json
+import logging
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+MODES = ["serial", "threaded", "async"]
+
+def peak_rss_kb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+def run_child(mode, mod_count, url, batch_size, max_workers, rate_limit):
+    """
+    Run one mode against the stand-in inside this process and print a JSON result line.
+    """
+    logging.basicConfig(level=logging.WARNING)
+    from src import mod_resolver, rate_limiter
+
+    config = {
+        "mods": {"mod_check_mode": mode, "steam_batch_size": batch_size, "async_concurrency": max_workers},
+        "steam": {"cache_enabled": False, "api_url": url, "rate_limit_per_second": rate_limit},
+        "threaded_mode": {"max_workers": max_workers},
+    }
+    rate_limiter.configure(config)
+    mods = [{"name": f"Mod {i}", "workshop_id": str(1000000 + i)} for i in range(mod_count)]
+
+    start = time.perf_counter()
+    results = mod_resolver.fetch_mod_details(config, None, mods)
+    wall = time.perf_counter() - start
+    print(json.dumps({"wall_seconds": wall, "resolved": len(results), "peak_rss_kb": peak_rss_kb()}))
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def latest_results():
+    files = sorted(RESULTS_DIR.glob("*.json"))
+    if not files:
+        return None
+    with files[-1].open("r") as f:
+        return json.load(f)
+
+def compare(previous, current, threshold):
+    """
+    Print wall-time changes against the previous run; return the runs slower by more than threshold.
+    """
+    before = {(r["mode"], r["mod_count"]): r for r in previous.get("runs", [])}
+    regressions = []
+    print(f"\nCompared with {previous.get('commit') or 'unknown commit'} ({previous.get('timestamp')}):")
+    for run in current["runs"]:
+        old = before.get((run["mode"], run["mod_count"]))
+        if not old or not old.get("wall_seconds"):
+            continue
+        change = run["wall_seconds"] / old["wall_seconds"] - 1
+        flag = " REGRESSION" if change > threshold else ""
+        print(f"  {run['mode']:>8} {run['mod_count']:>6} mods: {old['wall_seconds']:.3f}s -> {run['wall_seconds']:.3f}s ({change:+.0%}){flag}")
+        if flag:
+            regressions.append(run)
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the mod check modes against a local Steam stand-in")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    parser.add_argument("--mod-counts", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Stand-in response latency")
+    parser.add_argument("--jitter-ms", type=float, default=20.0, help="Uniform +/- jitter on the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 500")
+    parser.add_argument("--batch-size", type=int, default=100, help="mods.steam_batch_size")
+    parser.add_argument("--max-workers", type=int, default=10, help="threaded_mode.max_workers and mods.async_concurrency")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="steam.rate_limit_per_second (0 = unlimited)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--no-save", action="store_true", help="Do not write a results file")
+    parser.add_argument("--regression-threshold", type=float, default=0.2, help="Relative wall-time increase flagged as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--child", nargs=6, metavar=("MODE", "COUNT", "URL", "BATCH", "WORKERS", "RATE"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        mode, count, url, batch, workers, rate = args.child
+        run_child(mode, int(count), url, int(batch), int(workers), float(rate))
+        return 0
+
+    sys.path.insert(0, str(ROOT))
+    from tests.fakes.steam_server import FakeSteamServer
+
+    server = FakeSteamServer(
+        latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000, error_rate=args.error_rate, seed=args.seed
+    ).start()
+    runs = []
+    print(f"{'mode':>8} {'mods':>6} {'wall s':>8} {'resolved':>8} {'requests':>8} {'errors':>6} {'p50 ms':>8} {'p99 ms':>8} {'peak RSS MB':>11}")
+    try:
+        for mod_count in args.mod_counts:
+            for mode in args.modes:
+                server.reset_stats()
+                child = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.bench_modes", "--child", mode, str(mod_count), server.url,
+                     str(args.batch_size), str(args.max_workers), str(args.rate_limit)],
+                    cwd=ROOT, capture_output=True, text=True,
+                )
+                if child.returncode != 0:
+                    print(f"{mode} with {mod_count} mods failed:\n{child.stderr}", file=sys.stderr)
+                    continue
+                run = {"mode": mode, "mod_count": mod_count, **json.loads(child.stdout.strip().splitlines()[-1]), **server.stats()}
+                runs.append(run)
+                rss = f"{run['peak_rss_kb'] / 1024:.1f}" if run["peak_rss_kb"] else "n/a"
+                print(
+                    f"{mode:>8} {mod_count:>6} {run['wall_seconds']:>8.3f} {run['resolved']:>8} {run['requests']:>8} {run['errors']:>6} "
+                    f"{run['latency_p50_ms'] or 0:>8.1f} {run['latency_p99_ms'] or 0:>8.1f} {rss:>11}"
+                )
+    finally:
+        server.stop()
+
+    current = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {k: v for k, v in vars(args).items() if k not in ("child", "no_save", "fail_on_regression")},
+        "runs": runs,
+    }
+    previous = latest_results()
+    regressions = compare(previous, current, args.regression_threshold) if previous else []
+    if not args.no_save:
+        RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+        path = RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}-{current['commit'] or 'nogit'}.json"
+        with path.open("w") as f:
+            json.dump(current, f, indent=2)
+        print(f"\nResults saved to {path.relative_to(ROOT)}")
+    return 1 if regressions and args.fail_on_regression else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
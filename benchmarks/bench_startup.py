@@ -0,0 +1,98 @@
+# DayZ Server Monitor
+# Project: DayZ Server Monitor
+# File: benchmarks/bench_startup.py
+# Purpose: Cold-start import budget for monitor.py. Imports the entrypoint in fresh interpreters with
+#          `python -X importtime`, reports the median import time and the slowest modules, and fails (exit 1)
+#          if the median exceeds the budget or a dependency that should load lazily is imported at startup.
+#          Run with: python -m benchmarks.bench_startup [--runs 5] [--budget-ms 400] [--top 15]
+# Author: Tig Campbell-Moore (firstname[at]lastname[dot]com)
+# License: CC BY-NC 4.0 (see LICENSE file)
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_MODULE = "monitor"
+DEFAULT_BUDGET_MS = 400.0
+# Loaded on first use (HTTP session, async mode, server queries), never by importing the entrypoint
+LAZY_MODULES = ["aiohttp", "requests", "urllib3", "dayzquery", "a2s", "bs4", "src.modes.async_mode"]
+
+def parse_importtime(stderr):
+    """
+    Return [(module, self_us, cumulative_us)] from `-X importtime` output, in import order.
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # header line
+        rows.append((fields[2].strip(), int(fields[0]), int(fields[1])))
+    return rows
+
+def run_importtime(module):
+    """
+    Import module in a fresh interpreter. Returns ({module: (self_us, cumulative_us)}, module's cumulative us).
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    rows = parse_importtime(result.stderr)
+    timings = {name: (self_us, cumulative_us) for name, self_us, cumulative_us in rows}
+    return timings, timings[module][1]
+
+def imported_modules(module):
+    """
+    Return the names in sys.modules after importing module in a fresh interpreter.
+    """
+    code = f"import json, sys, {module}; print(json.dumps(sorted(sys.modules)))"
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return set(json.loads(result.stdout.strip().splitlines()[-1]))
+
+def eager_lazy_modules(module, lazy_modules=LAZY_MODULES):
+    """
+    Return the lazy_modules (or their submodules) that importing module loads.
+    """
+    loaded = imported_modules(module)
+    return sorted(name for name in lazy_modules if any(m == name or m.startswith(name + ".") for m in loaded))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cold-start import time of the monitor entrypoint")
+    parser.add_argument("--module", default=DEFAULT_MODULE, help="Module to import")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to time (the median is compared)")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="Fail above this median import time")
+    parser.add_argument("--top", type=int, default=15, help="Slowest modules to list (by cumulative time)")
+    args = parser.parse_args()
+
+    runs = [run_importtime(args.module) for _ in range(args.runs)]
+    totals = [total for _, total in runs]
+    median_us = statistics.median(totals)
+    timings = min(runs, key=lambda run: abs(run[1] - median_us))[0]
+
+    print(f"{'cumulative ms':>13} {'self ms':>8}  module")
+    slowest = sorted(timings.items(), key=lambda item: item[1][1], reverse=True)[:args.top]
+    for name, (self_us, cumulative_us) in slowest:
+        print(f"{cumulative_us / 1000:>13.1f} {self_us / 1000:>8.1f}  {name}")
+    print(f"\nimport {args.module}: median {median_us / 1000:.1f} ms over {args.runs} runs "
+          f"(min {min(totals) / 1000:.1f}, max {max(totals) / 1000:.1f}), budget {args.budget_ms:.0f} ms")
+
+    failed = False
+    eager = eager_lazy_modules(args.module)
+    if eager:
+        print(f"FAIL: imported at startup instead of on first use: {', '.join(eager)}")
+        failed = True
+    if median_us / 1000 > args.budget_ms:
+        print(f"FAIL: cold start is over budget by {median_us / 1000 - args.budget_ms:.1f} ms")
+        failed = True
+    if not failed:
+        print("OK")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
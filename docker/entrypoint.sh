@@ -1,5 +1,10 @@
 #!/bin/bash
 
+if [ "${RUN_MODE:-cron}" = "daemon" ]; then
+    echo "🔁 Starting monitor in daemon mode (schedule.interval_seconds per server)"
+    exec python3 /app/monitor.py --daemon
+fi
+
 echo "🔧 Configuring cron schedule..."
 
 export CRON_SCHEDULE="${CRON_SCHEDULE:-*/3 * * * *}"
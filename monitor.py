@@ -3,78 +3,319 @@
 # File: monitor.py
 # Purpose: Entrypoint for the monitoring process, with multi-server support, config defaults, required validation, advanced logging/rotation,
 #          and persistent tracking of mod changes and per-server performance.
+#          Supports a single pass (cron) or --daemon mode with an in-process scheduler that keeps warm state between cycles.
+#          Servers are checked concurrently by a bounded worker pool (schedule.max_concurrent_servers); their
+#          console summaries and Discord posts are still released in config order.
+#          With query.engine: async, all servers of a cycle are queried up front from one asyncio event loop,
+#          and the union of their workshop IDs is resolved once (mod_resolver.py) and shared by every server.
+#          Updated: Discord summaries are sent in the background; queued posts are drained at shutdown.
+#          Updated: Configs come from the compiled config cache when unchanged (--no-config-cache to bypass it).
+#          Updated: A daemon reload (SIGHUP) also re-applies logging, HTTP, rate limit, performance and Discord settings.
 # Author: Tig Campbell-Moore (firstname[at]lastname[dot]com)
 # License: CC BY-NC 4.0 (see LICENSE file)
 
 import sys
+import argparse
+import signal
+import threading
+import concurrent.futures
 import traceback
 import logging
-from src.config_loader import load_configs, validate_required
+import time
+from src.config_loader import CONFIG_CACHE_DIR, load_configs, validate_required
 from src.logger import setup_logging
+from src import http_session
+from src import perf_store
+from src import rate_limiter
+from src import discord_notifier
+from src import output_handler
+from src import server_query
+from src import mod_resolver
 import src.mod_checker as mod_checker
+from src.scheduler import Scheduler
 from src.templates import TemplateLoader
 
 # Import tracking utilities
 from src.server_monitor_tracker import (
-    detect_mod_changes,
-    update_performance,
+    mod_changes_since,
     load_performance_stats,
 )
 
-def main():
+DEFAULT_INTERVAL_SECONDS = 180
+DEFAULT_MAX_CONCURRENT_SERVERS = 4
+
+# TemplateLoader per locale, kept warm across daemon cycles
+_template_loaders = {}
+_template_loaders_lock = threading.Lock()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="DayZ Server Monitor")
+    parser.add_argument("--daemon", action="store_true",
+                        help="Run continuously with an in-process scheduler (schedule.interval_seconds per server)")
+    parser.add_argument("--config-dir", default="config", help="Directory containing the YAML config files")
+    parser.add_argument("--no-config-cache", action="store_true",
+                        help="Always parse and validate the config files instead of using the compiled config cache")
+    return parser.parse_args(argv)
+
+def get_templates(locale):
+    with _template_loaders_lock:
+        templates = _template_loaders.get(locale)
+        if templates is None:
+            templates = TemplateLoader(locale)
+            _template_loaders[locale] = templates
+        return templates
+
+def get_server_name(raw_config):
+    return raw_config.get("server_name", raw_config.get("_config_file", "unnamed_server").replace(".yaml", ""))
+
+def log_http_stats():
+    http_stats = http_session.get_stats()
+    logging.info(
+        f"HTTP pool: {http_stats['requests']} requests over {http_stats['connections']} connections "
+        f"({http_stats['reused']} reused)"
+    )
+
+def configure_process(config):
+    """
+    Apply the process-wide settings (logging, HTTP pool, performance history, Steam rate limit and
+    Discord sender) from the first server config. Called at startup and again on a daemon reload.
+    """
+    setup_logging(config)
+    http_session.configure(config)
+    perf_store.configure(config)
+    rate_limiter.configure(config)
+    discord_notifier.configure(config)
+
+def run_server(raw_config, pydantic_config, required, query_result=None, resolved_mods=None):
+    """
+    Run the mod check, change detection and performance tracking for one server.
+    """
+    # Use raw_config for legacy dict-based code, pydantic_config for new-style attribute access
+    server_name = get_server_name(raw_config)
+    if not validate_required(raw_config, required, None):
+        logging.error(f"Skipping server {server_name} due to missing required config.")
+        return
+
+    logging.info(f"Starting monitor for {server_name}")
+
+    # Use locale from config (raw or pydantic)
+    locale = getattr(pydantic_config, "locale", None) or raw_config.get("locale", "en_GB")
+    templates = get_templates(locale)
+
     try:
-        # Updated: load_configs now returns (raw_configs, required, validated_pydantic_configs)
-        raw_configs, required, pydantic_configs = load_configs("config")
+        run_started = time.time()
+        # --- Run mod check and track mods ---
+        # Pass raw_config for legacy code. Update to use pydantic_config where possible.
+        mod_check_result = mod_checker.run_mod_check(
+            raw_config, templates, query_result=query_result, resolved_mods=resolved_mods
+        )
+        if isinstance(mod_check_result, tuple) and len(mod_check_result) == 2:
+            current_mod_list, performance_stats = mod_check_result
+        else:
+            # Backward compatibility: only mod list returned, or nothing returned
+            current_mod_list = mod_check_result if isinstance(mod_check_result, list) else []
+            performance_stats = {}
 
-        # Initialize logging once (using the first config, or default if none)
-        config_for_logging = raw_configs[0] if raw_configs else {}
-        setup_logging(config_for_logging)
+        # --- Mod change detection (events recorded by this run's tracking save) ---
+        added_mods, removed_mods, updated_mods = mod_changes_since(server_name, run_started)
+        if added_mods or removed_mods or updated_mods:
+            logging.info(f"Server {server_name}: Mods changed!")
+            if added_mods:
+                logging.info(f"Added mods: {added_mods}")
+            if removed_mods:
+                logging.info(f"Removed mods: {removed_mods}")
+            if updated_mods:
+                logging.info(f"Updated mods: {updated_mods}")
+        else:
+            logging.info(f"Server {server_name}: No mod changes detected.")
 
-        for raw_config, pydantic_config in zip(raw_configs, pydantic_configs):
-            # Use raw_config for legacy dict-based code, pydantic_config for new-style attribute access
-            server_name = raw_config.get("server_name", raw_config.get("_config_file", "unnamed_server").replace(".yaml", ""))
-            if not validate_required(raw_config, required, None):
-                logging.error(f"Skipping server {server_name} due to missing required config.")
-                continue
+        # --- Performance tracking (the record itself is appended by run_mod_check) ---
+        if performance_stats:
+            last_stats = load_performance_stats(server_name)
+            logging.info(f"Server {server_name} last performance: {last_stats}")
 
-            logging.info(f"Starting monitor for {server_name}")
+    except Exception as e:
+        logging.error("Unhandled exception during mod check")
+        logging.error(traceback.format_exc())
+        # Continue with next server instead of exiting the whole process
 
-            # Use locale from config (raw or pydantic)
-            locale = getattr(pydantic_config, "locale", None) or raw_config.get("locale", "en_GB")
-            templates = TemplateLoader(locale)
+def get_max_concurrent_servers(config):
+    limit = config.get("schedule", {}).get("max_concurrent_servers", DEFAULT_MAX_CONCURRENT_SERVERS)
+    return max(1, int(limit or 1))
+
+def prefetch_server_queries(servers):
+    """
+    Query every server that uses the async engine (query.engine: async) from a single event loop.
+    Returns a list aligned with servers: (info, mods), the raised exception, or None (query in the worker).
+    """
+    results = [None] * len(servers)
+    targets = []
+    indexes = []
+    max_concurrent = server_query.DEFAULT_MAX_CONCURRENT_QUERIES
+    for index, (raw_config, _) in enumerate(servers):
+        engine, timeout = server_query.get_query_settings(raw_config)
+        host, port = server_query.get_query_target(raw_config)
+        if engine != "async" or not raw_config.get("mods", {}).get("mod_checking_enabled", True):
+            continue
+        if host is None or port is None:
+            continue
+        targets.append((host, port, timeout))
+        indexes.append(index)
+        max_concurrent = (raw_config.get("query") or {}).get("max_concurrent_queries", max_concurrent)
+
+    if not targets:
+        return results
+    logging.info(f"Querying {len(targets)} servers (asyncio A2S engine)")
+    try:
+        for index, result in zip(indexes, server_query.query_servers(targets, max_concurrent)):
+            results[index] = result
+    except Exception:
+        logging.exception("Asyncio server query stage failed, servers will be queried individually")
+    return results
+
+def resolve_cycle_mods(servers, query_results):
+    """
+    Look up every workshop ID reported by this cycle's servers once (settings from the first server config).
+    Returns the shared workshop ID -> record dict, or None to let each server look up its own mods.
+    """
+    if not servers or not any(isinstance(result, tuple) for result in query_results):
+        return None
+    try:
+        return mod_resolver.resolve_cycle(servers[0][0], query_results)
+    except Exception:
+        logging.exception("Cycle-wide mod resolution failed, servers will look up their own mods")
+        return None
+
+def run_isolated_server(raw_config, pydantic_config, required, query_result=None, resolved_mods=None):
+    """
+    Run one server with its own output buffer, so concurrent servers never share output state.
+    Returns the server's finished output (see output_handler.publish) for the caller to release.
+    """
+    threading.current_thread().name = f"server-{get_server_name(raw_config)}"
+    published = []
+    with output_handler.output_buffer(deferred=published):
+        run_server(raw_config, pydantic_config, required, query_result, resolved_mods)
+    return published
 
+def run_servers(servers, required, max_workers=1):
+    """
+    Check all servers, at most max_workers at a time. Cycle time follows the slowest server
+    rather than the sum of all of them. Each server's output is released in config order, as soon as
+    the servers before it have finished, so it is never interleaved or reordered.
+    """
+    servers = list(servers)
+    query_results = prefetch_server_queries(servers)
+    resolved_mods = resolve_cycle_mods(servers, query_results)
+
+    def shared_for(query_result):
+        # Only servers whose mods went into the cycle-wide resolution can use it
+        return resolved_mods if isinstance(query_result, tuple) else None
+
+    if max_workers <= 1 or len(servers) <= 1:
+        for (raw_config, pydantic_config), query_result in zip(servers, query_results):
+            with output_handler.output_buffer():
+                run_server(raw_config, pydantic_config, required, query_result, shared_for(query_result))
+        return
+
+    workers = min(max_workers, len(servers))
+    logging.info(f"Checking {len(servers)} servers with {workers} workers")
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="server") as executor:
+        futures = [executor.submit(run_isolated_server, raw_config, pydantic_config, required,
+                                   query_result, shared_for(query_result))
+                   for (raw_config, pydantic_config), query_result in zip(servers, query_results)]
+        for future in futures:
             try:
-                # --- Run mod check and track mods ---
-                # Pass raw_config for legacy code. Update to use pydantic_config where possible.
-                mod_check_result = mod_checker.run_mod_check(raw_config, templates)
-                if isinstance(mod_check_result, tuple) and len(mod_check_result) == 2:
-                    current_mod_list, performance_stats = mod_check_result
-                else:
-                    # Backward compatibility: only mod list returned, or nothing returned
-                    current_mod_list = mod_check_result if isinstance(mod_check_result, list) else []
-                    performance_stats = {}
-
-                # --- Mod change detection and persistence ---
-                added_mods, removed_mods = detect_mod_changes(server_name, current_mod_list)
-                if added_mods or removed_mods:
-                    logging.info(f"Server {server_name}: Mods changed!")
-                    if added_mods:
-                        logging.info(f"Added mods: {added_mods}")
-                    if removed_mods:
-                        logging.info(f"Removed mods: {removed_mods}")
-                else:
-                    logging.info(f"Server {server_name}: No mod changes detected.")
-
-                # --- Performance tracking and persistence ---
-                if performance_stats:
-                    update_performance(server_name, performance_stats)
-                    last_stats = load_performance_stats(server_name)
-                    logging.info(f"Server {server_name} last performance: {last_stats}")
-
-            except Exception as e:
-                logging.error("Unhandled exception during mod check")
+                published = future.result()
+            except Exception:
+                logging.error("Unhandled exception in server worker")
                 logging.error(traceback.format_exc())
-                # Continue with next server instead of exiting the whole process
+                continue
+            output_handler.release(published)
+
+def run_daemon(config_dir, raw_configs, required, pydantic_configs, max_workers=1, config_cache_dir=CONFIG_CACHE_DIR):
+    """
+    Run scheduled cycles until SIGTERM/SIGINT. Each server runs every schedule.interval_seconds.
+    Configs, templates, caches and HTTP pools stay alive between cycles. SIGHUP reloads the configs and
+    re-applies the process-wide settings (see configure_process) and schedule.max_concurrent_servers.
+    """
+    scheduler = Scheduler()
+    state = {"reload": False}
+    servers = {}
+
+    def load_schedule(raw_configs, pydantic_configs):
+        servers.clear()
+        scheduler.clear()
+        for raw_config, pydantic_config in zip(raw_configs, pydantic_configs):
+            key = raw_config.get("_config_file", get_server_name(raw_config))
+            servers[key] = (raw_config, pydantic_config)
+            interval = raw_config.get("schedule", {}).get("interval_seconds", DEFAULT_INTERVAL_SECONDS)
+            scheduler.schedule(key, interval)
+            logging.info(f"[Daemon] Scheduled {get_server_name(raw_config)} every {interval}s")
+
+    def run_due(keys):
+        run_servers([servers[key] for key in keys if key in servers], required, max_workers)
+        log_http_stats()
+
+    def on_wake():
+        nonlocal required, max_workers
+        if state["reload"]:
+            state["reload"] = False
+            logging.info("[Daemon] Reloading configs")
+            try:
+                new_raw, new_required, new_pydantic = load_configs(config_dir, config_cache_dir)
+            except Exception:
+                logging.exception("[Daemon] Config reload failed, keeping previous configs")
+                return
+            required = new_required
+            config_for_logging = new_raw[0] if new_raw else {}
+            configure_process(config_for_logging)
+            max_workers = get_max_concurrent_servers(config_for_logging)
+            load_schedule(new_raw, new_pydantic)
+
+    def handle_stop(signum, frame):
+        logging.info(f"[Daemon] Received signal {signum}, shutting down after the current cycle")
+        scheduler.stop()
+
+    def handle_reload(signum, frame):
+        state["reload"] = True
+        scheduler.wake()
+
+    signal.signal(signal.SIGTERM, handle_stop)
+    signal.signal(signal.SIGINT, handle_stop)
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, handle_reload)
+
+    load_schedule(raw_configs, pydantic_configs)
+    logging.info("[Daemon] Started")
+    scheduler.run(run_due, on_wake=on_wake)
+    mod_resolver.close()
+    discord_notifier.close()
+    http_session.close()
+    logging.info("[Daemon] Stopped")
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        # Updated: load_configs now returns (raw_configs, required, validated_pydantic_configs)
+        config_cache_dir = None if args.no_config_cache else CONFIG_CACHE_DIR
+        raw_configs, required, pydantic_configs = load_configs(args.config_dir, config_cache_dir)
+
+        # Initialize logging and the shared clients (using the first config, or default if none)
+        config_for_logging = raw_configs[0] if raw_configs else {}
+        configure_process(config_for_logging)
+
+        max_workers = get_max_concurrent_servers(config_for_logging)
+
+        if args.daemon:
+            run_daemon(args.config_dir, raw_configs, required, pydantic_configs, max_workers, config_cache_dir)
+            return
+
+        run_servers(zip(raw_configs, pydantic_configs), required, max_workers)
+
+        log_http_stats()
+        mod_resolver.close()
+        discord_notifier.close()
+        http_session.close()
 
     except Exception as e:
         # If config loading or top-level fails, log to stderr and exit
@@ -2,34 +2,127 @@
 # Project: DayZ Server Monitor
 # File: cli.py
 # Purpose: Command-line interface for running the monitor with options
+#          Updated: Loads the config directory like monitor.py (load_config no longer exists); `outbox`
+#                   subcommands inspect, retry and flush the Discord outbox.
+#          Updated: --no-config-cache bypasses the compiled config cache.
+#          Run with: python -m scripts.cli [run] [--dry-run] [--mode auto] | python -m scripts.cli outbox stats
 # Author: Tig Campbell-Moore (firstname[at]lastname[dot]com)
 # License: CC BY-NC 4.0 (see LICENSE file)
 
 import argparse
-from src.config_loader import load_config
-from src.logger import setup_logging
+import json
 import logging
-from src.mod_checker import run_mod_check
+import sys
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import monitor
+from src.config_loader import CONFIG_CACHE_DIR, load_configs
+from src.logger import setup_logging
+from src import discord_notifier
+from src import discord_outbox
+from src import http_session
+from src import mod_resolver
+from src import perf_store
+from src import rate_limiter
 
-def parse_args():
+def parse_args(argv=None):
     parser = argparse.ArgumentParser(description="DayZ Server Monitor CLI")
-    parser.add_argument("--config", default="config.yaml", help="Path to config file")
-    parser.add_argument("--dry-run", action="store_true", help="Run without Discord/output write")
-    parser.add_argument("--mode", choices=["async", "threaded", "serial"], help="Force mod check mode")
-    return parser.parse_args()
-
-def main():
-    args = parse_args()
-    config = load_config(args.config)
-    if args.dry_run:
-        config["output"]["to_file"] = False
-        config["output"]["to_discord"] = False
-    if args.mode:
-        config["mod_check_mode"] = args.mode
+    parser.add_argument("--config-dir", default="config", help="Directory containing the YAML config files")
+    parser.add_argument("--no-config-cache", action="store_true", help="Parse and validate the config files, ignoring the config cache")
+    commands = parser.add_subparsers(dest="command")
 
-    setup_logging(config)
+    run = commands.add_parser("run", help="Run one monitor pass (default)")
+    run.add_argument("--dry-run", action="store_true", help="Run without Discord/output write")
+    run.add_argument("--mode", choices=["async", "threaded", "serial", "auto"], help="Force mod check mode")
+
+    outbox = commands.add_parser("outbox", help="Inspect or flush the Discord outbox")
+    actions = outbox.add_subparsers(dest="action", required=True)
+    actions.add_parser("stats", help="Number of queued, sent and failed posts")
+    listing = actions.add_parser("list", help="List posts, oldest first")
+    listing.add_argument("--status", choices=[discord_outbox.PENDING, discord_outbox.SENDING, discord_outbox.SENT, discord_outbox.FAILED],
+                         default=discord_outbox.PENDING, help="Only posts with this status")
+    listing.add_argument("--all", action="store_true", help="Posts of every status")
+    listing.add_argument("--limit", type=int, default=50)
+    listing.add_argument("--payload", action="store_true", help="Show the payloads")
+    flush = actions.add_parser("flush", help="Send every pending post now, ignoring retry delays")
+    flush.add_argument("--retry-failed", action="store_true", help="Also retry posts that ran out of retries")
+    flush.add_argument("--timeout", type=float, default=120.0, help="Give up after this many seconds")
+
+    args = parser.parse_args(argv)
+    if args.command is None:
+        args.command, args.dry_run, args.mode = "run", False, None
+    return args
+
+def run(args, raw_configs, required, pydantic_configs):
+    for config in raw_configs:
+        if args.dry_run:
+            config.setdefault("output", {}).update(to_file=False, to_discord=False)
+        if args.mode:
+            config.setdefault("mods", {})["mod_check_mode"] = args.mode
     logging.info("Starting monitor (CLI mode)")
-    run_mod_check(config)
+    config_for_logging = raw_configs[0] if raw_configs else {}
+    http_session.configure(config_for_logging)
+    perf_store.configure(config_for_logging)
+    rate_limiter.configure(config_for_logging)
+    discord_notifier.configure(config_for_logging)
+    monitor.run_servers(zip(raw_configs, pydantic_configs), required, monitor.get_max_concurrent_servers(config_for_logging))
+    mod_resolver.close()
+    discord_notifier.close()
+    http_session.close()
+
+def _format_time(timestamp):
+    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S") if timestamp else "-"
+
+def outbox_command(args):
+    sender = discord_notifier.get_sender()
+    outbox = sender.outbox
+    if args.action == "stats":
+        counts = outbox.counts()
+        print(f"Outbox {outbox.path}: " + ", ".join(f"{count} {status}" for status, count in counts.items()))
+        return 0
+
+    if args.action == "list":
+        rows = outbox.list(None if args.all else args.status, args.limit)
+        for row in rows:
+            print(
+                f"#{row['id']} {row['status']:<7} part {row['part']}/{row['parts']} attempts={row['attempts']} "
+                f"queued={_format_time(row['created_at'])} next={_format_time(row['next_attempt_at'])} "
+                f"sent={_format_time(row['sent_at'])} webhook=...{row['webhook_url'][-8:]}"
+                + (f" error={row['last_error']}" if row["last_error"] else "")
+            )
+            if args.payload:
+                print("    " + json.dumps(json.loads(row["payload"]), ensure_ascii=False)[:500])
+        if not rows:
+            print("No posts")
+        return 0
+
+    if args.retry_failed:
+        print(f"Retrying {outbox.retry(discord_outbox.FAILED)} failed posts")
+    outbox.reschedule_pending()
+    pending = outbox.count_pending()
+    print(f"Flushing {pending} pending posts")
+    sender.flush(args.timeout)
+    sender.close(0)
+    counts = outbox.counts()
+    left = counts[discord_outbox.PENDING] + counts[discord_outbox.SENDING]
+    print(f"{left} pending, {counts[discord_outbox.FAILED]} failed")
+    return 0 if left == 0 else 1
+
+def main(argv=None):
+    args = parse_args(argv)
+    raw_configs, required, pydantic_configs = load_configs(args.config_dir, None if args.no_config_cache else CONFIG_CACHE_DIR)
+    config = raw_configs[0] if raw_configs else {}
+    setup_logging(config)
+    if args.command == "outbox":
+        # Only the settings: configure() would also start delivering in the background
+        discord_notifier.get_sender().settings = discord_notifier.get_settings(config)
+        return outbox_command(args)
+    run(args, raw_configs, required, pydantic_configs)
+    return 0
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
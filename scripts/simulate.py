@@ -0,0 +1,152 @@
+# DayZ Server Monitor
+# Project: DayZ Server Monitor
+# File: simulate.py
+# Purpose: Offline load simulation: starts the local Steam API and A2S stand-ins (tests/fakes), writes a
+#          config directory with one config per fake server, and runs one monitor pass against them.
+#          Run with: python -m scripts.simulate --servers 500 --mods 10000
+# Author: Tig Campbell-Moore (firstname[at]lastname[dot]com)
+# License: CC BY-NC 4.0 (see LICENSE file)
+
+import argparse
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from tests.fakes.a2s_server import FakeA2SCluster, MAX_MODS_PER_SERVER, is_encodable
+from tests.fakes.steam_server import FakeSteamServer
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate many DayZ servers and mods against local stand-ins")
+    parser.add_argument("--servers", type=int, default=500, help="Number of fake DayZ servers")
+    parser.add_argument("--mods", type=int, default=10000, help="Number of unique workshop IDs across all servers")
+    parser.add_argument("--mods-per-server", type=int, default=60, help=f"Mods reported by each server (max {MAX_MODS_PER_SERVER})")
+    parser.add_argument("--mode", choices=["serial", "threaded", "async", "auto"], default="async", help="mods.mod_check_mode")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Steam stand-in latency")
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of Steam requests answered 429")
+    parser.add_argument("--rate-limit", type=float, default=10.0, help="steam.rate_limit_per_second (0 = unlimited)")
+    parser.add_argument("--max-concurrent-servers", type=int, default=8, help="schedule.max_concurrent_servers")
+    parser.add_argument("--work-dir", help="Where configs, data and logs are written (default: a temporary directory)")
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary work directory")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--no-run", action="store_true", help="Only write the configs and serve until interrupted")
+    return parser.parse_args(argv)
+
+def make_mod_pool(count, rng):
+    """Unique (workshop_id, name) pairs the A2S stand-in can encode."""
+    pool = []
+    seen = set()
+    while len(pool) < count:
+        workshop_id = str(rng.randint(1_000_000_000, 3_999_999_999))
+        name = f"Sim Mod {len(pool) + 1}"
+        if workshop_id in seen or not is_encodable(workshop_id, name):
+            continue
+        seen.add(workshop_id)
+        pool.append((workshop_id, name))
+    return pool
+
+def assign_mods(pool, servers, per_server):
+    """Give each server a window of the pool so that, together, the servers cover every mod."""
+    per_server = max(1, min(per_server, MAX_MODS_PER_SERVER, len(pool)))
+    step = max(1, len(pool) // servers) if servers * per_server >= len(pool) else per_server
+    return [
+        [pool[(index * step + offset) % len(pool)] for offset in range(per_server)]
+        for index in range(servers)
+    ]
+
+def write_configs(config_dir, steam, addresses, args):
+    config_dir.mkdir(parents=True, exist_ok=True)
+    for name in ("config.defaults.yaml", "config.required.yaml"):
+        shutil.copy(ROOT / "config" / name, config_dir / name)
+    (config_dir / "monitor.yaml").write_text(
+        "locale: en_GB\n"
+        "log_dir: logs\n"
+        "logging:\n  enabled: true\n  level: INFO\n  log_dir: logs\n"
+        f"mods:\n  mod_checking_enabled: true\n  mod_check_mode: {args.mode}\n  show_mod_changelog: false\n"
+        f"  changelog_url: \"{steam.changelog_url}\"\n"
+        f"steam:\n  api_url: {steam.url}\n  cache_enabled: false\n  rate_limit_per_second: {args.rate_limit}\n"
+        "query:\n  engine: async\n  timeout_seconds: 3.0\n  max_concurrent_queries: 200\n"
+        f"schedule:\n  max_concurrent_servers: {args.max_concurrent_servers}\n"
+        "output:\n  to_console: false\n  to_file: false\n  to_discord: false\n"
+        "discord:\n  enabled: false\n"
+    )
+    for index, (host, port) in enumerate(addresses, 1):
+        (config_dir / f"sim_{index:04d}.yaml").write_text(
+            f"server_name: sim_{index:04d}\nserver:\n  ip: \"{host}\"\n  port: {port}\n"
+        )
+
+def link_locales(work_dir):
+    target = work_dir / "locales"
+    if target.exists():
+        return
+    try:
+        target.symlink_to(ROOT / "locales", target_is_directory=True)
+    except OSError:
+        shutil.copytree(ROOT / "locales", target)
+
+def main(argv=None):
+    args = parse_args(argv)
+    rng = random.Random(args.seed)
+    work_dir = Path(args.work_dir) if args.work_dir else Path(tempfile.mkdtemp(prefix="dayz_sim_"))
+    work_dir.mkdir(parents=True, exist_ok=True)
+
+    pool = make_mod_pool(args.mods, rng)
+    mod_lists = assign_mods(pool, args.servers, args.mods_per_server)
+    steam = FakeSteamServer(
+        latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000, error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate, seed=args.seed,
+    ).start()
+    cluster = FakeA2SCluster(mod_lists).start()
+    try:
+        write_configs(work_dir / "config", steam, cluster.addresses, args)
+        link_locales(work_dir)
+        covered = len({wid for mods in mod_lists for wid, _ in mods})
+        print(f"{args.servers} fake servers, {covered} unique mods ({len(mod_lists[0])} per server), work dir {work_dir}")
+        print(f"Steam stand-in: {steam.url}")
+
+        if args.no_run:
+            print("Serving until interrupted (Ctrl+C)...")
+            try:
+                while True:
+                    time.sleep(3600)
+            except KeyboardInterrupt:
+                return 0
+
+        env = dict(os.environ, STEAM_API_URL=steam.url)
+        output_path = work_dir / "monitor_output.txt"
+        start = time.perf_counter()
+        with output_path.open("w") as output:
+            result = subprocess.run(
+                [sys.executable, str(ROOT / "monitor.py"), "--config-dir", "config"],
+                cwd=work_dir, env=env, stdout=output, stderr=subprocess.STDOUT,
+            )
+        wall = time.perf_counter() - start
+
+        stats = steam.stats()
+        queries = sum(server.queries for server in cluster.servers)
+        print(f"Monitor pass finished in {wall:.2f}s (exit code {result.returncode})")
+        print(
+            f"Steam stand-in: {stats['requests']} requests for {stats['items']} items, {stats['errors']} errors, "
+            f"{stats['throttled']} throttled, p50 {stats['latency_p50_ms']} ms, p99 {stats['latency_p99_ms']} ms"
+        )
+        print(f"A2S stand-in: {queries} packets received from {args.servers} servers")
+        if args.work_dir or args.keep:
+            print(f"Monitor output: {output_path}")
+        return result.returncode
+    finally:
+        cluster.stop()
+        steam.stop()
+        if not args.work_dir and not args.keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    raise SystemExit(main())
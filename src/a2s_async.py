@@ -0,0 +1,221 @@
+# DayZ Server Monitor
+# Project: DayZ Server Monitor
+# File: a2s_async.py
+# Purpose: Native asyncio implementation of the Steam A2S_INFO / A2S_RULES UDP exchange
+#          (challenge handling, split-packet reassembly) so many servers can be queried from one event loop.
+# Author: Tig Campbell-Moore (firstname[at]lastname[dot]com)
+# License: CC BY-NC 4.0 (see LICENSE file)
+
+import asyncio
+import bz2
+import logging
+import struct
+import zlib
+
+DEFAULT_TIMEOUT = 3.0
+
+SIMPLE_HEADER = b"\xFF\xFF\xFF\xFF"
+SPLIT_HEADER = b"\xFE\xFF\xFF\xFF"
+
+A2S_INFO_REQUEST = SIMPLE_HEADER + b"TSource Engine Query\x00"
+A2S_RULES_REQUEST = SIMPLE_HEADER + b"V"
+NO_CHALLENGE = b"\xFF\xFF\xFF\xFF"
+
+S2C_CHALLENGE = 0x41   # 'A'
+S2A_INFO = 0x49        # 'I'
+S2A_RULES = 0x45       # 'E'
+
+# Servers answer with at most a few challenges; more means something is wrong
+MAX_CHALLENGE_ROUNDS = 3
+
+class A2SError(Exception):
+    """Raised for malformed or unexpected A2S responses."""
+
+class _A2SProtocol(asyncio.DatagramProtocol):
+    def __init__(self):
+        self.transport = None
+        self.packets = asyncio.Queue()
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.packets.put_nowait(data)
+
+    def error_received(self, exc):
+        # e.g. ICMP port unreachable: fail the query right away instead of waiting for the timeout
+        self.packets.put_nowait(exc)
+
+    def connection_lost(self, exc):
+        if exc is not None:
+            self.packets.put_nowait(exc)
+
+class _Reader:
+    """Minimal little-endian reader over a response payload."""
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+
+    def read(self, size):
+        if self.pos + size > len(self.data):
+            raise A2SError("Response truncated")
+        chunk = self.data[self.pos:self.pos + size]
+        self.pos += size
+        return chunk
+
+    def unpack(self, fmt):
+        size = struct.calcsize(fmt)
+        return struct.unpack(fmt, self.read(size))[0]
+
+    def cstring(self):
+        end = self.data.find(b"\x00", self.pos)
+        if end < 0:
+            raise A2SError("Unterminated string in response")
+        value = self.data[self.pos:end]
+        self.pos = end + 1
+        return value
+
+    def remaining(self):
+        return len(self.data) - self.pos
+
+async def _next_packet(protocol):
+    packet = await protocol.packets.get()
+    if isinstance(packet, Exception):
+        raise packet
+    return packet
+
+async def _read_response(protocol):
+    """
+    Read one complete response, reassembling split packets, and return it without the -1 header.
+    """
+    fragments = {}
+    split_id = None
+    total = None
+    while True:
+        packet = await _next_packet(protocol)
+        header = packet[:4]
+        if header == SIMPLE_HEADER:
+            return packet[4:]
+        if header != SPLIT_HEADER:
+            logging.debug(f"[A2S] Ignoring packet with unknown header {header!r}")
+            continue
+
+        reader = _Reader(packet)
+        reader.read(4)
+        packet_id = reader.unpack("<l")
+        packet_total = reader.unpack("<B")
+        number = reader.unpack("<B")
+        if split_id is None:
+            split_id, total = packet_id, packet_total
+        elif packet_id != split_id:
+            logging.debug("[A2S] Ignoring split packet from another response")
+            continue
+        reader.unpack("<h")  # Maximum packet size, not needed for reassembly
+        fragments[number] = reader.data[reader.pos:]
+        if len(fragments) < total:
+            continue
+
+        payload = b"".join(fragments[i] for i in range(total))
+        if split_id & 0x80000000:
+            # Compressed response: decompressed size and CRC32 precede the bzip2 data
+            payload_reader = _Reader(payload)
+            size = payload_reader.unpack("<l")
+            checksum = payload_reader.unpack("<L")
+            payload = bz2.decompress(payload_reader.read(payload_reader.remaining()))
+            if len(payload) != size or zlib.crc32(payload) != checksum:
+                raise A2SError("Compressed response failed size/CRC check")
+        if payload[:4] != SIMPLE_HEADER:
+            raise A2SError("Reassembled response has an invalid header")
+        return payload[4:]
+
+async def _exchange(address, build_request, expected_type, timeout):
+    """
+    Send a request, answer any challenges, and return the response body after the type byte.
+    build_request(challenge) returns the request bytes for a given challenge.
+    """
+    loop = asyncio.get_running_loop()
+    transport, protocol = await asyncio.wait_for(
+        loop.create_datagram_endpoint(_A2SProtocol, remote_addr=address), timeout
+    )
+    try:
+        async def run():
+            challenge = None
+            for _ in range(MAX_CHALLENGE_ROUNDS + 1):
+                transport.sendto(build_request(challenge))
+                response = await _read_response(protocol)
+                if not response:
+                    raise A2SError("Empty response")
+                response_type = response[0]
+                if response_type == S2C_CHALLENGE:
+                    challenge = response[1:5]
+                    continue
+                if response_type != expected_type:
+                    raise A2SError(f"Unexpected response type {response_type:#x}, expected {expected_type:#x}")
+                return response[1:]
+            raise A2SError("Server kept answering with challenges")
+
+        try:
+            return await asyncio.wait_for(run(), timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"A2S query to {address[0]}:{address[1]} timed out after {timeout}s") from None
+    finally:
+        transport.close()
+
+async def arules(address, timeout=DEFAULT_TIMEOUT):
+    """
+    Query A2S_RULES and return the rules as a dict of raw bytes keys/values
+    (same shape as a2s.rules(..., encoding=None), as expected by dayzquery.dayz_rules_decode).
+    """
+    body = await _exchange(
+        address, lambda challenge: A2S_RULES_REQUEST + (challenge or NO_CHALLENGE), S2A_RULES, timeout
+    )
+    reader = _Reader(body)
+    count = reader.unpack("<h")
+    rules = {}
+    for _ in range(count):
+        key = reader.cstring()
+        rules[key] = reader.cstring()
+    return rules
+
+async def ainfo(address, timeout=DEFAULT_TIMEOUT, encoding="utf-8"):
+    """
+    Query A2S_INFO and return the main server info fields as a dict.
+    """
+    body = await _exchange(
+        address, lambda challenge: A2S_INFO_REQUEST + (challenge or b""), S2A_INFO, timeout
+    )
+    reader = _Reader(body)
+
+    def text():
+        return reader.cstring().decode(encoding, errors="replace")
+
+    info = {
+        "protocol": reader.unpack("<B"),
+        "server_name": text(),
+        "map_name": text(),
+        "folder": text(),
+        "game": text(),
+        "app_id": reader.unpack("<H"),
+        "player_count": reader.unpack("<B"),
+        "max_players": reader.unpack("<B"),
+        "bot_count": reader.unpack("<B"),
+        "server_type": chr(reader.unpack("<B")),
+        "platform": chr(reader.unpack("<B")),
+        "password_protected": bool(reader.unpack("<B")),
+        "vac_enabled": bool(reader.unpack("<B")),
+        "version": text(),
+    }
+    if reader.remaining():
+        edf = reader.unpack("<B")
+        if edf & 0x80:
+            info["port"] = reader.unpack("<H")
+        if edf & 0x10:
+            info["steam_id"] = reader.unpack("<Q")
+        if edf & 0x40:
+            info["stv_port"] = reader.unpack("<H")
+            info["stv_name"] = text()
+        if edf & 0x20:
+            info["keywords"] = text()
+        if edf & 0x01:
+            info["game_id"] = reader.unpack("<Q")
+    return info
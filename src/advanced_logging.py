@@ -3,10 +3,19 @@
 # Purpose: Advanced logging with configurable rotation, daily and size-based, compression, and retention per config/server.
 #          Now skips rotation/archiving if the log file is empty.
 #          Supports human-friendly size strings for max_bytes (e.g., 10K, 5M, 1G).
+#          Updated: Log calls decide on rotation from an in-memory byte counter and a cached next daily rotation time;
+#                   the file and the .logrotate state are only consulted once a threshold is crossed.
+#          Updated: Rotation only renames the file; compression (with log_rotation.compress_level) and pruning run on a
+#                   background worker, and rotated logs are listed in a single os.scandir pass.
 # Author: Tig Campbell-Moore (firstname[at]lastname[dot]com)
 # License: CC BY-NC 4.0 (see LICENSE file)
 
+import atexit
+import concurrent.futures
 import logging
+import os
+import threading
+import time
 from pathlib import Path
 import shutil
 import gzip
@@ -16,6 +25,11 @@ from datetime import datetime, timedelta
 import yaml
 
 ROTATE_STATE_FMT = "{basename}.logrotate"
+COMPRESSION_METHODS = ("gz", "bz2", "zip")
+DEFAULT_COMPRESS_LEVEL = 6
+
+_worker_lock = threading.Lock()
+_worker = None
 
 def parse_size(size):
     """
@@ -43,25 +57,26 @@ def parse_size(size):
             raise ValueError(f"Invalid size format: {size}")
     raise ValueError(f"Invalid size type: {type(size)}")
 
-def compress_file(src, method):
+def compress_file(src, method, level=DEFAULT_COMPRESS_LEVEL):
     """
-    Compress the log file using the specified method.
+    Compress the log file using the specified method and level (1 = fastest, 9 = smallest).
     Supports 'gz', 'bz2', 'zip', or returns the original if method is None/unknown.
     """
     src_path = Path(src)
+    level = DEFAULT_COMPRESS_LEVEL if level is None else max(1, min(9, int(level)))
     if method == "gz":
-        with src_path.open("rb") as f_in, gzip.open(str(src_path) + ".gz", "wb") as f_out:
+        with src_path.open("rb") as f_in, gzip.open(str(src_path) + ".gz", "wb", compresslevel=level) as f_out:
             shutil.copyfileobj(f_in, f_out)
         src_path.unlink()
         return str(src_path) + ".gz"
     elif method == "bz2":
-        with src_path.open("rb") as f_in, bz2.open(str(src_path) + ".bz2", "wb") as f_out:
+        with src_path.open("rb") as f_in, bz2.open(str(src_path) + ".bz2", "wb", compresslevel=level) as f_out:
             shutil.copyfileobj(f_in, f_out)
         src_path.unlink()
         return str(src_path) + ".bz2"
     elif method == "zip":
         zip_path = src_path.with_suffix(src_path.suffix + ".zip")
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED, compresslevel=level) as zf:
             zf.write(str(src_path), arcname=src_path.name)
         src_path.unlink()
         return str(zip_path)
@@ -119,6 +134,18 @@ def should_rotate_daily(config, logfile):
             return True
     return False
 
+def next_daily_rotation(rotate_time, last_rotate, now=None):
+    """
+    Timestamp from which should_rotate_daily() is due: today's rotate_time, or tomorrow's if the log
+    was already rotated today.
+    """
+    now = now or datetime.now()
+    rotate_hour, rotate_minute = map(int, rotate_time.split(":"))
+    scheduled = now.replace(hour=rotate_hour, minute=rotate_minute, second=0, microsecond=0)
+    if last_rotate and last_rotate.date() >= now.date():
+        scheduled += timedelta(days=1)
+    return scheduled.timestamp()
+
 def should_rotate_size(config, logfile):
     """
     Determine if the log should be rotated due to max_bytes size limit.
@@ -135,22 +162,32 @@ def should_rotate_size(config, logfile):
     size = logfile_path.stat().st_size
     return size >= max_bytes
 
-def list_rotated_logs(logfile, compression_methods):
+def scan_rotated_logs(logfile, compression_methods=COMPRESSION_METHODS):
     """
-    List all rotated logs, including compressed ones, for pruning.
+    Rotated logs of a logfile (including compressed ones) as (path, ctime) pairs, oldest first,
+    from a single os.scandir pass over the log directory.
     """
     logfile_path = Path(logfile)
-    dirname = logfile_path.parent
     basename = logfile_path.name
     name = logfile_path.stem
+    suffixes = (".log",) + tuple("." + c for c in compression_methods)
     rotated = []
-    for fname in dirname.iterdir():
-        if fname.name.startswith(name) and fname.name != basename:
-            if fname.name.endswith(".log") or any(fname.name.endswith("." + c) for c in compression_methods):
-                rotated.append(fname)
-    rotated.sort(key=lambda f: f.stat().st_ctime)
+    with os.scandir(logfile_path.parent) as entries:
+        for entry in entries:
+            if entry.name.startswith(name) and entry.name != basename and entry.name.endswith(suffixes):
+                try:
+                    rotated.append((Path(entry.path), entry.stat().st_ctime))
+                except FileNotFoundError:
+                    continue
+    rotated.sort(key=lambda item: item[1])
     return rotated
 
+def list_rotated_logs(logfile, compression_methods):
+    """
+    List all rotated logs, including compressed ones, for pruning.
+    """
+    return [path for path, _ in scan_rotated_logs(logfile, compression_methods)]
+
 def prune_rotated_logs(logfile, config):
     """
     Prune oldest rotated logs according to backup_count and min_days.
@@ -158,25 +195,62 @@ def prune_rotated_logs(logfile, config):
     rotation = config.get("log_rotation", {})
     backup_count = rotation.get("backup_count", 7)
     min_days = rotation.get("min_days", 3)
-    compress_method = rotation.get("compress")
-    rotated = list_rotated_logs(logfile, ["gz", "bz2", "zip"])
+    rotated = scan_rotated_logs(logfile, COMPRESSION_METHODS)
+    extra = len(rotated) - backup_count
+    if extra <= 0:
+        return
     now = datetime.now()
-    keep = []
-    for lf in rotated:
-        ctime = datetime.fromtimestamp(lf.stat().st_ctime)
-        age_days = (now - ctime).days
-        if age_days < min_days:
-            keep.append(lf)
-        else:
-            keep.append(lf)
-    extra = len(keep) - backup_count
-    if extra > 0:
-        candidates = [f for f in keep if (now - datetime.fromtimestamp(f.stat().st_ctime)).days >= min_days]
-        for f in sorted(candidates, key=lambda f: f.stat().st_ctime)[:extra]:
-            try:
-                f.unlink()
-            except Exception:
-                pass
+    candidates = [path for path, ctime in rotated if (now - datetime.fromtimestamp(ctime)).days >= min_days]
+    for f in candidates[:extra]:
+        try:
+            f.unlink()
+        except Exception:
+            pass
+
+def archive_rotated_log(rotated_log, logfile, config):
+    """
+    Compress a freshly rotated log and prune old ones; runs on the background worker.
+    """
+    rotation = config.get("log_rotation", {})
+    compress_method = rotation.get("compress")
+    try:
+        if compress_method in COMPRESSION_METHODS:
+            compress_file(str(rotated_log), compress_method, rotation.get("compress_level", DEFAULT_COMPRESS_LEVEL))
+        prune_rotated_logs(logfile, config)
+    except Exception as e:
+        logging.warning(f"[LogRotation] Archiving {rotated_log} failed: {e}")
+
+def _get_worker():
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="log-archive")
+        return _worker
+
+def wait_for_archiving():
+    """
+    Wait until every queued compression/pruning job has finished (also run at exit).
+    """
+    global _worker
+    with _worker_lock:
+        worker, _worker = _worker, None
+    if worker is not None:
+        worker.shutdown(wait=True)
+
+atexit.register(wait_for_archiving)
+
+class CountingFileHandler(logging.FileHandler):
+    """
+    FileHandler that keeps a running count of the bytes in its file, so size checks need no stat().
+    """
+    def __init__(self, filename, encoding="utf-8"):
+        super().__init__(filename, encoding=encoding)
+        self.bytes_written = 0
+
+    def format(self, record):
+        msg = super().format(record)
+        self.bytes_written += len(msg.encode(self.encoding or "utf-8", errors="replace")) + len(self.terminator)
+        return msg
 
 class AdvancedLogger:
     """
@@ -196,6 +270,9 @@ class AdvancedLogger:
         self.date_str = datetime.now().strftime("%Y-%m-%d")
         self.logfile = self.log_dir / f"{config_file}.{logtype}.{self.date_str}.log"
         self._logger = None
+        self._handler = None
+        self._max_bytes = None
+        self._next_rotate_at = None
         self.setup_logger()
 
     def get_configured_level(self):
@@ -214,12 +291,40 @@ class AdvancedLogger:
         self._logger.propagate = False
         log_level = self.get_configured_level()
         self._logger.setLevel(log_level)
-        handler = logging.FileHandler(self.logfile, encoding='utf-8')
+        handler = CountingFileHandler(self.logfile, encoding='utf-8')
         formatter = logging.Formatter('%(asctime)s %(levelname)s %(message)s')
         handler.setFormatter(formatter)
         handler.setLevel(log_level)  # Ensure handler also respects log level
         self._logger.handlers = []
         self._logger.addHandler(handler)
+        self._handler = handler
+        self.refresh_thresholds()
+
+    def refresh_thresholds(self):
+        """
+        Read the current file size, max_bytes and next daily rotation time from disk and config.
+        Log calls then only compare against these cached values.
+        """
+        rotation = self.config.get("log_rotation", {})
+        max_bytes_raw = rotation.get("max_bytes")
+        self._max_bytes = parse_size(max_bytes_raw) if max_bytes_raw else None
+        logfile_path = Path(self.logfile)
+        self._handler.bytes_written = logfile_path.stat().st_size if logfile_path.exists() else 0
+        if rotation.get("daily", False):
+            rotate_time = rotation.get("rotate_time", "00:00")
+            self._next_rotate_at = next_daily_rotation(rotate_time, load_last_rotate(self.logfile))
+        else:
+            self._next_rotate_at = None
+
+    def rotation_due(self):
+        """
+        Whether a threshold may have been crossed: O(1), no filesystem access.
+        """
+        if not self.enabled or self._handler.bytes_written == 0:
+            return False
+        if self._max_bytes and self._handler.bytes_written >= self._max_bytes:
+            return True
+        return self._next_rotate_at is not None and time.time() >= self._next_rotate_at
 
     def rotate_logs(self, force=False):
         """
@@ -227,9 +332,6 @@ class AdvancedLogger:
         Only rotate if the log file exists and is not empty.
         """
         rotation = self.config.get("log_rotation", {})
-        compress_method = rotation.get("compress")
-        backup_count = rotation.get("backup_count", 7)
-        min_days = rotation.get("min_days", 3)
         daily = rotation.get("daily", False)
         rotated = False
 
@@ -239,6 +341,7 @@ class AdvancedLogger:
         # Only rotate if file exists and is not empty
         logfile_path = Path(self.logfile)
         if not logfile_path.exists() or logfile_path.stat().st_size == 0:
+            self.refresh_thresholds()
             return
 
         if should_rotate_size(self.config, self.logfile):
@@ -248,35 +351,45 @@ class AdvancedLogger:
         elif force:
             rotated = True
 
-        if rotated:
+        if not rotated:
+            # The cached counters were off (e.g. the file was rotated or truncated elsewhere)
+            self.refresh_thresholds()
+        else:
             now = datetime.now()
             rotate_suffix = now.strftime("%Y-%m-%d_%H%M%S")
             rotated_log = logfile_path.with_name(logfile_path.name.replace(".log", f".{rotate_suffix}.log"))
+            # A second rotation within the same second must not overwrite the first (or its archive)
+            n = 1
+            while any(Path(f"{rotated_log}{ext}").exists() for ext in ("", ".gz", ".bz2", ".zip")):
+                rotated_log = logfile_path.with_name(logfile_path.name.replace(".log", f".{rotate_suffix}_{n}.log"))
+                n += 1
             self._logger.handlers[0].close()
             logfile_path.rename(rotated_log)
-            rotated_log_path = rotated_log
-            if compress_method in ("gz", "bz2", "zip"):
-                rotated_log_path = Path(compress_file(str(rotated_log), compress_method))
             save_last_rotate(self.logfile, now)
             self.setup_logger()
-            prune_rotated_logs(self.logfile, self.config)
+            # Compressing a large file takes seconds: the caller only pays for the rename
+            _get_worker().submit(archive_rotated_log, rotated_log, self.logfile, self.config)
 
     def info(self, msg):
-        self.rotate_logs()
+        if self.rotation_due():
+            self.rotate_logs()
         if self._logger.isEnabledFor(logging.INFO):
             self._logger.info(msg)
 
     def error(self, msg):
-        self.rotate_logs()
+        if self.rotation_due():
+            self.rotate_logs()
         if self._logger.isEnabledFor(logging.ERROR):
             self._logger.error(msg)
 
     def warning(self, msg):
-        self.rotate_logs()
+        if self.rotation_due():
+            self.rotate_logs()
         if self._logger.isEnabledFor(logging.WARNING):
             self._logger.warning(msg)
 
     def debug(self, msg):
-        self.rotate_logs()
+        if self.rotation_due():
+            self.rotate_logs()
         if self._logger.isEnabledFor(logging.DEBUG):
             self._logger.debug(msg)
@@ -0,0 +1,106 @@
+# DayZ Server Monitor
+# Project: DayZ Server Monitor
+# File: bbcode.py
+# Purpose: BBCode/HTML to Discord markdown converter for mod descriptions and changelogs. Runs the previous
+#          converter's passes in the same order (drop images and links, convert [b]/[u]/[i]/[s], strip the
+#          remaining tags) so the output is unchanged, but each pass only scans up to the last place one of its
+#          matches can end, which keeps every pass linear. Skips blank or formatting-only lines, and can stop
+#          once enough visible lines have been produced.
+# Author: Tig Campbell-Moore (firstname[at]lastname[dot]com)
+# License: CC BY-NC 4.0 (see LICENSE file)
+
+import re
+
+def _last(pattern, flags=0):
+    # Matches from the start of the text to the end of the last occurrence of pattern
+    return re.compile(r'.*' + pattern, flags | re.DOTALL)
+
+_SPAN_FLAGS = re.DOTALL | re.IGNORECASE
+
+# (pattern, replacement, end of the last place a match can end, start of a match that a later closer could complete)
+_PASSES = [
+    # Images and links, with their contents
+    (re.compile(r'\[img\](.*?)\[/img\]', _SPAN_FLAGS), '', _last(r'\[/img\]', re.IGNORECASE),
+     re.compile(r'\[img\]', re.IGNORECASE)),
+    (re.compile(r'\[image\](.*?)\[/image\]', _SPAN_FLAGS), '', _last(r'\[/image\]', re.IGNORECASE),
+     re.compile(r'\[image\]', re.IGNORECASE)),
+    (re.compile(r'\[url(=[^\]]*)?\](.*?)\[/url\]', _SPAN_FLAGS), '', _last(r'\[/url\]', re.IGNORECASE),
+     re.compile(r'\[url[=\]]', re.IGNORECASE)),
+    (re.compile(r'<a\b[^>]*>(.*?)</a>', _SPAN_FLAGS), '', _last(r'</a>', re.IGNORECASE),
+     re.compile(r'<a\b', re.IGNORECASE)),
+    (re.compile(r'<img\b[^>]*>', _SPAN_FLAGS), '', _last(r'>'), re.compile(r'<img\b', re.IGNORECASE)),
+    # Supported formatting, converted to Discord markdown
+    (re.compile(r'\[b\](.*?)\[/b\]', _SPAN_FLAGS), r'**\1**', _last(r'\[/b\]', re.IGNORECASE),
+     re.compile(r'\[b\]', re.IGNORECASE)),
+    (re.compile(r'\[u\](.*?)\[/u\]', _SPAN_FLAGS), r'__\1__', _last(r'\[/u\]', re.IGNORECASE),
+     re.compile(r'\[u\]', re.IGNORECASE)),
+    (re.compile(r'\[i\](.*?)\[/i\]', _SPAN_FLAGS), r'*\1*', _last(r'\[/i\]', re.IGNORECASE),
+     re.compile(r'\[i\]', re.IGNORECASE)),
+    (re.compile(r'\[s\](.*?)\[/s\]', _SPAN_FLAGS), r'~~\1~~', _last(r'\[/s\]', re.IGNORECASE),
+     re.compile(r'\[s\]', re.IGNORECASE)),
+    # Unsupported url/color/list/quote/etc tags, then HTML tags, then any other [tag] or [/tag]
+    (re.compile(
+        r'\[/?(url|color|list|quote|h[1-6]|img|image|spoiler|code|center|size|font|video|audio|flash|table|tr|td|'
+        r'th|hr|li|ol|ul|br|yt|youtube|media|left|right|justify|indent|outdent|sup|sub)(=[^\]]*)?\]', _SPAN_FLAGS),
+     '', _last(r'\]'), re.compile(r'\[')),
+    (re.compile(r'<[^>]+>'), '', _last(r'>'), re.compile(r'<')),
+    (re.compile(r'\[/?[a-zA-Z0-9]+(=[^\]]*)?\]'), '', _last(r'\]'), re.compile(r'\[')),
+]
+
+_FORMATTING_ONLY_RE = re.compile(r'[\*\_\~]+')
+
+def _convert(text):
+    """
+    Run every pass over text. Returns (converted text, open): open is True if a tag or span starts after
+    the last place it could end, so text appended later could still complete it.
+    """
+    is_open = False
+    for pattern, repl, last, start in _PASSES:
+        # A match ends at its first closer, so none can end past the last one; after it, the lazy
+        # `.*?` of each unclosed opener would otherwise rescan the rest of the text
+        end = last.match(text)
+        end = end.end() if end else 0
+        if not is_open and start.search(text, end):
+            is_open = True
+        if end:
+            text = pattern.sub(repl, text[:end]) + text[end:]
+    return text, is_open
+
+def _visible_lines(text):
+    return [
+        line for line in text.splitlines()
+        if (stripped := line.strip()) and not _FORMATTING_ONLY_RE.fullmatch(stripped)
+    ]
+
+def _after_lines(text, count, pos=0):
+    # Offset just after the count-th "\n" from pos, or len(text)
+    for _ in range(count):
+        pos = text.find("\n", pos) + 1
+        if not pos:
+            return len(text)
+    return pos
+
+def bbcode_to_discord_lines(text, limit=None):
+    """
+    Convert BBCode/HTML text to a list of visible Discord markdown lines.
+    If limit is given, only as many leading lines as needed for `limit` visible lines are converted.
+    """
+    if not text:
+        return []
+    if limit is not None:
+        # Convert whole leading lines. Unless a tag or span in them is still open, the rest of the
+        # text cannot change them, so their lines are the first lines of the full conversion.
+        end = 0
+        wanted = 2 * limit
+        while (end := _after_lines(text, wanted, end)) < len(text):
+            converted, is_open = _convert(text[:end])
+            if not is_open:
+                lines = _visible_lines(converted)
+                if len(lines) >= limit:
+                    return lines[:limit]
+            wanted *= 2
+    return _visible_lines(_convert(text)[0])[:limit]
+
+def bbcode_to_discord(text):
+    """Convert common BBCode to Discord markdown. Strip all other BBCode tags, links, images, and blank lines."""
+    return "\n".join(bbcode_to_discord_lines(text))
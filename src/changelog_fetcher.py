@@ -2,29 +2,175 @@
 # Project: DayZ Server Monitor
 # File: changelog_fetcher.py
 # Purpose: Retrieve latest mod changelogs from Steam
+#          Updated: The page is streamed through an incremental HTML parser that stops after the first
+#                   changeLogBlock (no full-page parse tree); changelogs of changed mods are fetched concurrently
+#                   and cached by (workshop ID, time_updated), so each update's changelog is fetched once.
+#          Updated: Pages are limited by changelog_workers only; steamcommunity.com is not the Steam Web API, so
+#                   they no longer take tokens from the API rate limiter.
 # Author: Tig Campbell-Moore (firstname[at]lastname[dot]com)
 # License: CC BY-NC 4.0 (see LICENSE file)
 
-import requests
-from bs4 import BeautifulSoup
+import codecs
+import concurrent.futures
 import logging
+import re
+from html.parser import HTMLParser
+from src import http_session
+from src import steam_cache
 
-def get_workshop_changelog(workshop_id):
-    url = f"https://steamcommunity.com/sharedfiles/filedetails/changelog/{workshop_id}"
+CHANGELOG_URL = "https://steamcommunity.com/sharedfiles/filedetails/changelog/{workshop_id}"
+DEFAULT_WORKERS = 4
+CHUNK_SIZE = 8192
+
+_BLOCK_TAGS = {"p", "div", "li", "ul", "ol", "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "pre", "table", "tr"}
+_VOID_TAGS = {"br", "img", "hr", "input", "meta", "link", "wbr", "source"}
+_WHITESPACE_RE = re.compile(r"\s+")
+
+class ChangelogParser(HTMLParser):
+    """
+    Incremental parser that keeps only the text of the first element with class changeLogBlock.
+    feed() it chunks as they arrive and stop once `done` is set; line breaks come from <br> and block tags.
+    """
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.done = False
+        self._root_tag = None
+        self._root_depth = 0
+        self._parts = []
+
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
+        if self._root_tag is None:
+            classes = (dict(attrs).get("class") or "").split()
+            if "changeLogBlock" in classes:
+                self._root_tag = tag
+                self._root_depth = 1
+            return
+        if tag == self._root_tag:
+            self._root_depth += 1
+        if tag == "br" or tag in _BLOCK_TAGS:
+            self._parts.append("\n")
+
+    def handle_startendtag(self, tag, attrs):
+        if self._root_tag is not None and not self.done and tag == "br":
+            self._parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if self._root_tag is None or self.done or tag in _VOID_TAGS:
+            return
+        if tag in _BLOCK_TAGS:
+            self._parts.append("\n")
+        if tag == self._root_tag:
+            self._root_depth -= 1
+            if self._root_depth == 0:
+                self.done = True
+
+    def handle_data(self, data):
+        if self._root_tag is not None and not self.done:
+            self._parts.append(_WHITESPACE_RE.sub(" ", data))
+
+    @property
+    def found(self):
+        return self._root_tag is not None
+
+    def text(self):
+        """
+        The collected text: one entry per line, trimmed, without blank lines.
+        """
+        lines = (line.strip() for line in "".join(self._parts).split("\n"))
+        return "\n".join(line for line in lines if line)
+
+def parse_changelog(chunks):
+    """
+    Feed text chunks to a ChangelogParser until the first changeLogBlock is complete.
+    Returns the block's text, or None if the page has none.
+    """
+    parser = ChangelogParser()
+    for chunk in chunks:
+        parser.feed(chunk)
+        if parser.done:
+            break
+    parser.close()
+    return parser.text() if parser.found else None
+
+def _iter_text(response):
+    decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(errors="replace")
+    for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+        yield decoder.decode(chunk)
+    yield decoder.decode(b"", final=True)
+
+def get_workshop_changelog(workshop_id, url_template=CHANGELOG_URL):
+    """
+    Fetch the latest changelog entry of a mod from its Workshop changelog page.
+    Only the page up to the end of the first changeLogBlock is downloaded and parsed.
+    Returns the changelog text, or None if it could not be retrieved.
+    """
+    url = url_template.format(workshop_id=workshop_id)
     logging.debug(f"Fetching changelog for mod: {workshop_id}")
 
     try:
-        response = requests.get(url, timeout=10)
-        if not response.ok:
-            logging.warning(f"Bad response for changelog ({response.status_code})")
-            return "No changelog available"
-
-        soup = BeautifulSoup(response.text, 'html.parser')
-        changelog_div = soup.find('div', class_='changeLogBlock')
-        if changelog_div:
-            return changelog_div.get_text(strip=True)
-        return "No changelog available"
+        with http_session.get_session().get(url, timeout=10, stream=True) as response:
+            if not response.ok:
+                logging.warning(f"Bad response for changelog of {workshop_id} ({response.status_code})")
+                return None
+            changelog = parse_changelog(_iter_text(response))
+        if not changelog:
+            logging.debug(f"No changelog block found for mod {workshop_id}")
+        return changelog or None
 
     except Exception as e:
-        logging.error(f"Failed to fetch changelog: {e}")
-        return "No changelog available"
+        logging.error(f"Failed to fetch changelog for {workshop_id}: {e}")
+        return None
+
+class ChangelogFetcher:
+    """
+    Fetches the changelogs of changed mods in the background while a mod check carries on.
+    Changelogs are cached per (workshop ID, time_updated): an update's changelog never changes,
+    so it is fetched at most once however many servers or runs report it.
+    """
+    def __init__(self, config):
+        mods_cfg = config.get("mods", {})
+        self.url_template = mods_cfg.get("changelog_url") or CHANGELOG_URL
+        self.max_workers = max(1, int(mods_cfg.get("changelog_workers", DEFAULT_WORKERS)))
+        self.cache = steam_cache.get_changelog_cache(config)
+        self._executor = None
+
+    def _fetch(self, workshop_id, time_updated):
+        changelog = get_workshop_changelog(workshop_id, self.url_template)
+        if changelog is not None and self.cache is not None:
+            self.cache.put(workshop_id, time_updated, changelog)
+        return changelog
+
+    def submit(self, workshop_id, time_updated):
+        """
+        Return a Future for the changelog text (None if unavailable) of one mod update.
+        """
+        if self.cache is not None:
+            cached = self.cache.get(workshop_id, time_updated)
+            if cached is not None:
+                future = concurrent.futures.Future()
+                future.set_result(cached)
+                return future
+        if self._executor is None:
+            self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="changelog")
+        return self._executor.submit(self._fetch, str(workshop_id), int(time_updated or 0))
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def cancel(self):
+        """
+        Drop the fetches that have not started; those in flight finish (and are cached) in the background.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
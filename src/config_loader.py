@@ -4,17 +4,32 @@
 #          Now supports required fields within nested blocks (e.g. server.ip) and validates against unwanted top-level ip/port.
 #          Updated: Pydantic integration for model validation, returns both raw and parsed configs.
 #          Updated: Supports Docker secrets and environment variable overrides for Steam API Key and Discord Webhook.
+#          Updated: Compiled config cache (data/cache/config.*.pickle) keyed by the config files' mtimes/sizes, the
+#                   secrets and env overrides and the loader/model code: unchanged configs skip YAML parsing,
+#                   merging and validation on startup.
 # Author: Tig Campbell-Moore (firstname[at]lastname[dot]com)
 # License: CC BY-NC 4.0 (see LICENSE file)
 
 from pathlib import Path
 import yaml
 from copy import deepcopy
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
+from src import config_models
 from src.config_models import DayZServerMonitorConfig
-from pydantic import ValidationError
+from pydantic import ValidationError, VERSION as PYDANTIC_VERSION
+import hashlib
 import os
 import logging
+import pickle
+import sys
+
+CONFIG_CACHE_DIR = Path("data/cache")
+CONFIG_CACHE_VERSION = 1
+SECRETS_DIR = Path("/run/secrets")
+# Secrets (Docker secret file or environment) and environment-only overrides applied on top of the YAML files
+SECRET_OVERRIDES = ("STEAM_API_KEY", "DISCORD_WEBHOOK_URL")
+ENV_OVERRIDES = ("STEAM_API_URL",)
+SPECIAL_FILES = ("monitor.yaml", "config.defaults.yaml", "config.required.yaml")
 
 def load_yaml(path: Path) -> Dict[str, Any]:
     """
@@ -83,14 +98,14 @@ def get_secret_or_env(var_name: str) -> str:
     Return the value from Docker secret (file /run/secrets/{var_name}),
     then from environment variable {var_name}, or None.
     """
-    secret_path = Path("/run/secrets") / var_name
+    secret_path = SECRETS_DIR / var_name
     if secret_path.exists():
         return secret_path.read_text(encoding='utf-8').strip()
     return os.environ.get(var_name)
 
 def apply_secrets_and_env_overrides(config: Dict[str, Any]) -> None:
     """
-    Apply Docker secret and environment variable overrides for Steam API key and Discord webhook.
+    Apply Docker secret and environment variable overrides for Steam API key, Steam API URL and Discord webhook.
     Order of precedence: Docker Secret > ENV Variable > Config file value.
     """
     # Steam API Key
@@ -100,6 +115,13 @@ def apply_secrets_and_env_overrides(config: Dict[str, Any]) -> None:
             config["steam"] = {}
         config["steam"]["api_key"] = steam_api_key
 
+    # Steam API URL override (e.g. a local stand-in for load testing); environment only, not a secret
+    steam_api_url = os.environ.get("STEAM_API_URL")
+    if steam_api_url:
+        if "steam" not in config or not isinstance(config["steam"], dict):
+            config["steam"] = {}
+        config["steam"]["api_url"] = steam_api_url
+
     # Discord Webhook (per-server)
     discord_webhook = get_secret_or_env("DISCORD_WEBHOOK_URL")
     if discord_webhook:
@@ -107,16 +129,74 @@ def apply_secrets_and_env_overrides(config: Dict[str, Any]) -> None:
             config["discord"] = {}
         config["discord"]["webhook_url"] = discord_webhook
 
-def load_configs(config_dir: str = "config") -> Tuple[List[Dict[str, Any]], Dict[str, Any], List[DayZServerMonitorConfig]]:
+def config_fingerprint(config_dir_path: Path) -> str:
     """
-    Load configs for all servers, merging defaults, monitor.yaml, and server-specific YAMLs.
-    Special handling for 'server' block: merges global (monitor.yaml) 'server' block with per-server override.
-    Applies Docker secrets and environment variable overrides.
-    Returns: ([raw_server_configs], required_dict, [validated_pydantic_configs])
-    Each validated_pydantic_config is an instance of DayZServerMonitorConfig.
-    If a config fails validation, it is skipped and error is logged.
+    Hash of everything load_configs() depends on: the YAML files (name, mtime, size), the secret files and
+    environment overrides (by content hash, never stored in clear), and the loader/model code and pydantic version.
+    """
+    digest = hashlib.sha256()
+    digest.update(f"{CONFIG_CACHE_VERSION}|{PYDANTIC_VERSION}|{sys.version_info[:2]}|{config_dir_path.resolve()}".encode())
+    for module_file in (__file__, config_models.__file__):
+        st = os.stat(module_file)
+        digest.update(f"|{module_file}:{st.st_mtime_ns}:{st.st_size}".encode())
+    for ypath in sorted(config_dir_path.glob("*.yaml")):
+        st = ypath.stat()
+        digest.update(f"|{ypath.name}:{st.st_mtime_ns}:{st.st_size}".encode())
+    for var_name in SECRET_OVERRIDES:
+        secret_path = SECRETS_DIR / var_name
+        secret = secret_path.read_bytes() if secret_path.exists() else None
+        digest.update(f"|secret:{var_name}:".encode() + (hashlib.sha256(secret).digest() if secret is not None else b"-"))
+    for var_name in SECRET_OVERRIDES + ENV_OVERRIDES:
+        value = os.environ.get(var_name)
+        digest.update(f"|env:{var_name}:".encode() + (hashlib.sha256(value.encode()).digest() if value is not None else b"-"))
+    return digest.hexdigest()
+
+def config_cache_path(config_dir_path: Path, cache_dir: Path) -> Path:
+    """
+    One cache file per config directory.
+    """
+    dir_key = hashlib.sha256(str(config_dir_path.resolve()).encode()).hexdigest()[:12]
+    return Path(cache_dir) / f"config.{dir_key}.pickle"
+
+def read_config_cache(cache_file: Path, fingerprint: str) -> Optional[Dict[str, Any]]:
+    """
+    Return the cached entry if it was built for this fingerprint, else None (missing, stale or unreadable).
+    """
+    try:
+        with cache_file.open("rb") as f:
+            entry = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logging.debug(f"[CONFIG] Ignoring unreadable config cache {cache_file}: {e}")
+        return None
+    if not isinstance(entry, dict) or entry.get("fingerprint") != fingerprint:
+        return None
+    return entry
+
+def write_config_cache(cache_file: Path, entry: Dict[str, Any]) -> None:
+    """
+    Write the cache atomically and readable by the owner only (the merged configs hold the secrets).
+    """
+    tmp = cache_file.with_name(f"{cache_file.name}.{os.getpid()}.tmp")
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, cache_file)
+    except Exception as e:
+        logging.debug(f"[CONFIG] Could not write config cache {cache_file}: {e}")
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+
+def compile_configs(config_dir_path: Path) -> Tuple[List[Dict[str, Any]], Dict[str, Any], List[DayZServerMonitorConfig], List[str]]:
+    """
+    Parse, merge and validate the config directory.
+    Returns: ([raw_server_configs], required_dict, [validated_pydantic_configs], [validation_error_messages])
     """
-    config_dir_path = Path(config_dir)
     defaults: Dict[str, Any] = load_yaml(config_dir_path / "config.defaults.yaml")
     required_yaml: Dict[str, Any] = load_yaml(config_dir_path / "config.required.yaml")
     required: Dict[str, Any] = load_required_with_metadata(required_yaml)
@@ -124,16 +204,15 @@ def load_configs(config_dir: str = "config") -> Tuple[List[Dict[str, Any]], Dict
     yamls = sorted(config_dir_path.glob("*.yaml"))
     server_configs: List[Dict[str, Any]] = []
 
-    monitor_server = monitor.get("server", {})
-
     for ypath in yamls:
         fname = ypath.name
-        if fname in ("monitor.yaml", "config.defaults.yaml", "config.required.yaml"):
+        if fname in SPECIAL_FILES:
             continue
         server: Dict[str, Any] = load_yaml(ypath)
         merged: Dict[str, Any] = {}
-        merge_dicts(merged, deepcopy(defaults))
-        merge_dicts(merged, deepcopy(monitor))
+        # merge_dicts deep-copies whatever it takes from the sources, so they are not copied up front
+        merge_dicts(merged, defaults)
+        merge_dicts(merged, monitor)
         merge_dicts(merged, server)
         # Special handling: merge 'server' block (monitor -> per-server)
         merged['server'] = merge_server_blocks(monitor, server)
@@ -147,8 +226,8 @@ def load_configs(config_dir: str = "config") -> Tuple[List[Dict[str, Any]], Dict
     # Fallback: single-server mode (monitor.yaml only)
     if not server_configs and monitor:
         merged = {}
-        merge_dicts(merged, deepcopy(defaults))
-        merge_dicts(merged, deepcopy(monitor))
+        merge_dicts(merged, defaults)
+        merge_dicts(merged, monitor)
         merged['server'] = merge_server_blocks(monitor, monitor)
         merged["_config_file"] = "monitor.yaml"
 
@@ -159,6 +238,7 @@ def load_configs(config_dir: str = "config") -> Tuple[List[Dict[str, Any]], Dict
 
     # Validate and parse into Pydantic models
     validated_pydantic_configs: List[DayZServerMonitorConfig] = []
+    errors: List[str] = []
     for conf in server_configs:
         try:
             # Remove _config_file before Pydantic validation
@@ -167,8 +247,42 @@ def load_configs(config_dir: str = "config") -> Tuple[List[Dict[str, Any]], Dict
             validated = DayZServerMonitorConfig(**conf_for_model)
             validated_pydantic_configs.append(validated)
         except ValidationError as e:
-            logging.error(f"Config validation error in {conf.get('_config_file', 'unknown')}: {e}")
+            errors.append(f"Config validation error in {conf.get('_config_file', 'unknown')}: {e}")
+
+    return server_configs, required, validated_pydantic_configs, errors
+
+def load_configs(config_dir: str = "config", cache_dir: Optional[Path] = CONFIG_CACHE_DIR) -> Tuple[List[Dict[str, Any]], Dict[str, Any], List[DayZServerMonitorConfig]]:
+    """
+    Load configs for all servers, merging defaults, monitor.yaml, and server-specific YAMLs.
+    Special handling for 'server' block: merges global (monitor.yaml) 'server' block with per-server override.
+    Applies Docker secrets and environment variable overrides.
+    Returns: ([raw_server_configs], required_dict, [validated_pydantic_configs])
+    Each validated_pydantic_config is an instance of DayZServerMonitorConfig.
+    If a config fails validation, it is skipped and error is logged.
+    The result is cached in cache_dir (None disables the cache) and reused while none of its inputs changed.
+    """
+    config_dir_path = Path(config_dir)
+    cache_file = fingerprint = None
+    if cache_dir is not None:
+        try:
+            fingerprint = config_fingerprint(config_dir_path)
+            cache_file = config_cache_path(config_dir_path, cache_dir)
+        except OSError as e:
+            logging.debug(f"[CONFIG] Config cache disabled for this run: {e}")
+
+    entry = read_config_cache(cache_file, fingerprint) if cache_file else None
+    if entry is not None:
+        server_configs, required, validated_pydantic_configs, errors = entry["configs"]
+    else:
+        server_configs, required, validated_pydantic_configs, errors = compile_configs(config_dir_path)
+        if cache_file:
+            write_config_cache(cache_file, {
+                "fingerprint": fingerprint,
+                "configs": (server_configs, required, validated_pydantic_configs, errors),
+            })
 
+    for error in errors:
+        logging.error(error)
     return server_configs, required, validated_pydantic_configs
 
 def validate_required(config: Dict[str, Any], required: Dict[str, Any], logger: Any) -> bool:
@@ -4,7 +4,7 @@
 # Author: Tig Campbell-Moore (firstname[at]lastname[dot]com)
 # License: CC BY-NC 4.0 (see LICENSE file)
 
-from typing import Optional, Literal, Union
+from typing import List, Optional, Literal, Union
 from pydantic import BaseModel, Field, IPvAnyAddress, validator
 
 # ---------- LOGGING ----------
@@ -18,6 +18,7 @@ class LoggingConfig(BaseModel):
     enabled: bool = True
     level: Literal['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL']
     files: LoggingFilesConfig
+    queue: bool = False
 
 # ---------- LOG ROTATION ----------
 class LogRotationConfig(BaseModel):
@@ -28,6 +29,7 @@ class LogRotationConfig(BaseModel):
     daily: bool = True
     rotate_time: str = "00:00"
     compress: Optional[Literal['gz', 'bz2', 'zip']] = "gz"
+    compress_level: int = Field(6, ge=1, le=9)
 
     @validator("max_bytes", pre=True)
     def validate_max_bytes(cls, v):
@@ -64,11 +66,24 @@ class OutputConfig(BaseModel):
 # ---------- MODS ----------
 class ModsConfig(BaseModel):
     mod_checking_enabled: bool = True
-    mod_check_mode: Literal['async', 'threaded', 'serial'] = "async"
+    mod_check_mode: Literal['async', 'threaded', 'serial', 'auto'] = "async"
     show_mod_changelog: bool = True
+    changelog_source: Literal['workshop', 'description'] = "workshop"
+    changelog_workers: int = 4
+    changelog_url: Optional[str] = None
     max_changelog_lines: int = 2
     show_mod_links: bool = True
     report_limit: int = 10
+    steam_batch_size: int = 100
+    async_concurrency: int = 10
+    async_limit_per_host: int = 0
+    async_connect_timeout: float = 5.0
+    async_read_timeout: float = 10.0
+    async_dns_cache_ttl: int = 300
+    async_lookup_deadline_seconds: float = 60.0
+    async_deadline_seconds: Optional[float] = None  # Former name of async_lookup_deadline_seconds
+    auto_probe_rate: float = 0.1
+    auto_concurrency_levels: List[int] = [4, 10, 20]
 
 # ---------- THREADED MODE ----------
 class ThreadedModeConfig(BaseModel):
@@ -77,17 +92,61 @@ class ThreadedModeConfig(BaseModel):
 # ---------- STEAM ----------
 class SteamConfig(BaseModel):
     api_key: Optional[str] = None
+    api_url: Optional[str] = None
+    cache_enabled: bool = True
+    cache_ttl_seconds: int = 120
+    cache_max_entries: int = 20000
+    cache_path: str = "data/cache/steam_workshop.sqlite3"
+    rate_limit_per_second: float = 10.0
+    rate_limit_burst: int = 10
+    max_retries: int = 5
+    backoff_base_seconds: float = 1.0
+    backoff_max_seconds: float = 60.0
+
+# ---------- HTTP ----------
+class HttpConfig(BaseModel):
+    pool_connections: int = 10
+    pool_maxsize: int = 20
+    max_retries: int = 3
+    backoff_factor: float = 0.5
+    status_forcelist: List[int] = [502, 503, 504]
 
 # ---------- DISCORD ----------
 class DiscordConfig(BaseModel):
     enabled: Optional[bool] = None
     webhook_url: Optional[str] = None
+    use_embeds: Optional[bool] = None
+    embed_color: Optional[int] = None
+    max_retries: Optional[int] = None
+    retry_base_seconds: Optional[float] = None
+    retry_max_seconds: Optional[float] = None
+    shutdown_timeout_seconds: Optional[float] = None
+    outbox_path: Optional[str] = None
+    dedup_window_seconds: Optional[float] = None
+    outbox_retention_days: Optional[float] = None
 
 # ---------- SERVER INFO ----------
 class ServerInfoConfig(BaseModel):
     ip: Union[IPvAnyAddress, str]
     port: int
 
+# ---------- SCHEDULE ----------
+class ScheduleConfig(BaseModel):
+    interval_seconds: int = 180
+    max_concurrent_servers: int = 4
+
+# ---------- PERFORMANCE HISTORY ----------
+class PerformanceConfig(BaseModel):
+    retention_days: int = 30
+
+# ---------- SERVER QUERY ----------
+class QueryConfig(BaseModel):
+    engine: Literal['async', 'dayzquery'] = "async"
+    host: Optional[str] = None
+    port: Optional[int] = None
+    timeout_seconds: float = 3.0
+    max_concurrent_queries: int = 100
+
 # ---------- REBOOT ----------
 class RebootConfig(BaseModel):
     base_time: str
@@ -110,6 +169,10 @@ class DayZServerMonitorConfig(BaseModel):
     mods: Optional[ModsConfig] = None
     threaded_mode: Optional[ThreadedModeConfig] = None
     steam: Optional[SteamConfig] = None
+    http: Optional[HttpConfig] = None
     discord: Optional[DiscordConfig] = None
     server: Optional[ServerInfoConfig] = None
+    query: Optional[QueryConfig] = None
     reboot: Optional[RebootConfig] = None
+    schedule: Optional[ScheduleConfig] = None
+    performance: Optional[PerformanceConfig] = None
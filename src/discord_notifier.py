@@ -1,25 +1,407 @@
 # DayZ Server Monitor
 # Project: DayZ Server Monitor
 # File: discord_notifier.py
-# Purpose: Send output summaries to a configured Discord channel using a webhook
+# Purpose: Deliver output summaries to a configured Discord webhook. Long summaries are split at line boundaries
+#          into several messages (or embeds), written to a durable outbox (discord_outbox.py) with deduplication,
+#          and sent by a background sender per webhook that follows Discord's rate-limit buckets (X-RateLimit-*
+#          headers, 429 retry_after) and retries failures, so checks never wait on Discord. Whatever is undelivered
+#          at exit is sent by the next run.
 # Author: Tig Campbell-Moore (firstname[at]lastname[dot]com)
 # License: CC BY-NC 4.0 (see LICENSE file)
 
-import requests
+import atexit
 import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from src import discord_outbox
+from src import http_session
+from src import rate_limiter
 
-def send_discord_webhook(webhook_url: str, message: str) -> None:
-    data = {"content": message}
+# Discord API limits
+MESSAGE_LIMIT = 2000
+EMBED_DESCRIPTION_LIMIT = 4096
+EMBEDS_PER_MESSAGE = 10
+EMBED_TOTAL_LIMIT = 6000
+
+DEFAULT_DISCORD_SETTINGS = {
+    "use_embeds": False,             # Post summaries as embeds (4096 chars each, up to 10 per message)
+    "embed_color": 0x5865F2,         # Sidebar colour of embeds
+    "max_retries": 10,               # Retries of a failed post (5xx, connection error) before it is given up
+    "retry_base_seconds": 10.0,      # First retry delay of a failed post, doubled per retry
+    "retry_max_seconds": 900.0,      # Upper bound for the retry delay
+    "shutdown_timeout_seconds": 10,  # How long the monitor waits at exit for queued posts to go out
+    "outbox_path": str(discord_outbox.OUTBOX_FILE),
+    "dedup_window_seconds": 86400,   # A change summary with the same key is not queued again within this window
+    "outbox_retention_days": 7,      # Sent and failed posts are kept this long for inspection
+}
+# How often a worker checks on a post that another process is sending
+CLAIM_POLL_SECONDS = 1.0
+
+def get_settings(config):
+    discord_cfg = config.get("discord") or {}
+    settings = dict(DEFAULT_DISCORD_SETTINGS)
+    settings.update({k: v for k, v in discord_cfg.items() if k in DEFAULT_DISCORD_SETTINGS and v is not None})
+    return settings
+
+def _wrap_line(line, limit):
+    """
+    Split a single line longer than limit, preferring the last space before the limit.
+    """
+    pieces = []
+    while len(line) > limit:
+        cut = line.rfind(" ", 0, limit + 1)
+        if cut <= 0:
+            cut = limit
+        pieces.append(line[:cut].rstrip())
+        line = line[cut:].lstrip()
+    pieces.append(line)
+    return pieces
+
+def split_message(text, limit=MESSAGE_LIMIT):
+    """
+    Split text into chunks of at most `limit` characters, breaking between lines.
+    Only a line that is itself longer than the limit is broken inside, at a space where possible.
+    """
+    chunks, lines, size = [], [], 0
+    for line in (text or "").split("\n"):
+        for piece in _wrap_line(line, limit):
+            added = len(piece) + (1 if lines else 0)
+            if lines and size + added > limit:
+                chunks.append("\n".join(lines))
+                lines, size, added = [], 0, len(piece)
+            lines.append(piece)
+            size += added
+    if lines:
+        chunks.append("\n".join(lines))
+    # Discord rejects empty messages; a chunk may also start or end on blank lines from the split
+    return [chunk.strip("\n") for chunk in chunks if chunk.strip()]
+
+def build_payloads(message, settings=None):
+    """
+    Turn a summary into the list of webhook payloads that deliver it, in order.
+    """
+    settings = settings or DEFAULT_DISCORD_SETTINGS
+    if not settings.get("use_embeds"):
+        return [{"content": chunk} for chunk in split_message(message, MESSAGE_LIMIT)]
+
+    payloads, embeds, size = [], [], 0
+    for chunk in split_message(message, EMBED_DESCRIPTION_LIMIT):
+        if embeds and (len(embeds) >= EMBEDS_PER_MESSAGE or size + len(chunk) > EMBED_TOTAL_LIMIT):
+            payloads.append({"embeds": embeds})
+            embeds, size = [], 0
+        embeds.append({"description": chunk, "color": int(settings.get("embed_color") or 0)})
+        size += len(chunk)
+    if embeds:
+        payloads.append({"embeds": embeds})
+    return payloads
+
+class WebhookRateLimits:
+    """
+    Tracks Discord's rate-limit buckets from response headers. A webhook maps to the bucket named in
+    X-RateLimit-Bucket (its URL until the first response); a bucket with no requests remaining
+    holds its webhooks until X-RateLimit-Reset-After has passed. A global 429 holds every webhook.
+    """
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._routes = {}
+        self._buckets = {}
+        self._global_until = 0.0
+
+    def wait_time(self, webhook_url):
+        """
+        Seconds to wait before posting to this webhook.
+        """
+        with self._lock:
+            now = self._clock()
+            wait = self._global_until - now
+            bucket = self._buckets.get(self._routes.get(webhook_url, webhook_url))
+            if bucket is not None and bucket[0] <= 0:
+                wait = max(wait, bucket[1] - now)
+            return max(0.0, wait)
+
+    def update(self, webhook_url, headers):
+        """
+        Record the bucket state from the X-RateLimit-* headers of a response.
+        """
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset_after = headers.get("X-RateLimit-Reset-After")
+        with self._lock:
+            bucket_id = headers.get("X-RateLimit-Bucket") or self._routes.get(webhook_url, webhook_url)
+            self._routes[webhook_url] = bucket_id
+            if remaining is None or reset_after is None:
+                return
+            try:
+                self._buckets[bucket_id] = (int(remaining), self._clock() + float(reset_after))
+            except ValueError:
+                pass
+
+    def throttled(self, webhook_url, headers, body=None):
+        """
+        Record a 429 and return how many seconds to wait before retrying.
+        The JSON body's retry_after is preferred, then Retry-After, then X-RateLimit-Reset-After.
+        """
+        body = body if isinstance(body, dict) else {}
+        retry_after = body.get("retry_after")
+        if not isinstance(retry_after, (int, float)):
+            retry_after = rate_limiter.parse_retry_after(headers.get("Retry-After"))
+        if retry_after is None:
+            retry_after = rate_limiter.parse_retry_after(headers.get("X-RateLimit-Reset-After"))
+        retry_after = float(retry_after) if retry_after is not None else 1.0
+        is_global = bool(body.get("global")) or str(headers.get("X-RateLimit-Global", "")).lower() == "true"
+        self.update(webhook_url, headers)
+        with self._lock:
+            until = self._clock() + retry_after
+            if is_global:
+                self._global_until = max(self._global_until, until)
+            else:
+                bucket_id = self._routes.get(webhook_url, webhook_url)
+                self._buckets[bucket_id] = (0, until)
+        return retry_after
+
+def _json_body(resp):
     try:
-        resp = requests.post(webhook_url, json=data, timeout=10)
-        if resp.status_code == 204:
-            logging.info("✅ Discord summary message sent.")
-        else:
-            logging.error(f"❌ Discord webhook returned status {resp.status_code}: {resp.text}")
+        return resp.json()
+    except ValueError:
+        return None
+
+def retry_delay(attempt, settings=None):
+    """
+    Delay before retry number `attempt` (0-based) of a failed post: doubling from retry_base_seconds.
+    """
+    settings = settings or DEFAULT_DISCORD_SETTINGS
+    return min(float(settings["retry_max_seconds"]), float(settings["retry_base_seconds"]) * (2 ** attempt))
+
+def post_once(webhook_url, payload, limits):
+    """
+    Make one post and record the rate-limit headers. Returns (outcome, error) where outcome is
+    "sent", "throttled" (429; limits says when to try again), "retry" (5xx or connection error) or "failed".
+    """
+    try:
+        # No transport-level re-sends: a post that may have been delivered is retried through the outbox, or not at all
+        resp = http_session.get_session(retry_posts=False).post(webhook_url, json=payload, timeout=10)
     except Exception as e:
-        logging.error(f"❌ Exception during Discord webhook operation: {e}")
+        return "retry", str(e)
+    if resp.status_code == 429:
+        retry_after = limits.throttled(webhook_url, resp.headers, _json_body(resp))
+        return "throttled", f"rate limited for {retry_after:.1f}s"
+    limits.update(webhook_url, resp.headers)
+    if resp.status_code in (200, 204):
+        return "sent", None
+    error = f"status {resp.status_code}: {resp.text[:200]}"
+    return ("retry" if resp.status_code >= 500 else "failed"), error
+
+def post_payload(webhook_url, payload, limits, settings=None):
+    """
+    Post one payload in the calling thread, waiting for the webhook's rate-limit bucket and retrying
+    429s and server errors. Returns True once Discord has accepted it.
+    """
+    settings = settings or DEFAULT_DISCORD_SETTINGS
+    max_retries = int(settings["max_retries"])
+    attempt = 0
+    while True:
+        wait = limits.wait_time(webhook_url)
+        if wait > 0:
+            time.sleep(wait)
+        outcome, error = post_once(webhook_url, payload, limits)
+        if outcome == "sent":
+            return True
+        if outcome == "failed" or attempt >= max_retries:
+            logging.error(f"❌ Discord webhook post failed: {error}")
+            return False
+        if outcome == "retry":
+            delay = retry_delay(attempt, settings)
+            logging.warning(f"[Discord] Webhook post failed ({error}); retrying in {delay:.1f}s")
+            time.sleep(delay)
+        attempt += 1
+
+def deliver(webhook_url, payloads, limits, settings=None):
+    """
+    Post the payloads of one summary in order; stops at the first one that cannot be delivered.
+    """
+    for index, payload in enumerate(payloads, start=1):
+        if not post_payload(webhook_url, payload, limits, settings):
+            logging.error(f"❌ Discord summary not fully sent ({index - 1}/{len(payloads)} messages delivered)")
+            return False
+    parts = f" ({len(payloads)} messages)" if len(payloads) > 1 else ""
+    logging.info(f"✅ Discord summary message sent{parts}.")
+    return True
+
+class DiscordSender:
+    """
+    Drains the outbox in the background: one worker thread per webhook that posts its oldest pending
+    message, so posts to a webhook keep their order and a rate-limited or failing webhook never holds up
+    the others (or the mod checks). A post that fails is retried later with a backoff; the outbox keeps it
+    across restarts until it is sent or runs out of retries.
+    """
+    def __init__(self, outbox=None, settings=None):
+        self.limits = WebhookRateLimits()
+        self.settings = dict(settings or DEFAULT_DISCORD_SETTINGS)
+        self._outbox = outbox
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._workers = {}
+        self._stop = threading.Event()
+        self._started = False
 
-def dispatch_discord(config: dict, message: str) -> None:
+    @property
+    def outbox(self):
+        if self._outbox is None:
+            self._outbox = discord_outbox.get_outbox(self.settings["outbox_path"])
+        return self._outbox
+
+    def wake(self, webhook_url=None):
+        """
+        Make sure a worker is draining the given webhook (or every webhook with pending posts).
+        """
+        urls = [webhook_url] if webhook_url else self.outbox.pending_webhooks()
+        with self._lock:
+            self._started = True
+            for url in urls:
+                worker = self._workers.get(url)
+                if worker is None:
+                    event = threading.Event()
+                    thread = threading.Thread(
+                        target=self._run, args=(url, event, self._stop), name="discord-sender", daemon=True
+                    )
+                    worker = self._workers[url] = (event, thread)
+                    thread.start()
+                worker[0].set()
+
+    def _run(self, webhook_url, event, stop):
+        try:
+            while not stop.is_set():
+                event.clear()
+                row = self.outbox.head(webhook_url)
+                if row is None:
+                    with self._lock:
+                        # Exit unless a post was queued since head() looked
+                        if not event.is_set():
+                            if self._workers.get(webhook_url, (None,))[0] is event:
+                                del self._workers[webhook_url]
+                            return
+                    continue
+                now = time.time()
+                if row["status"] == discord_outbox.SENDING and row["lease_until"] > now:
+                    # Being sent by another process (e.g. a previous run still draining): wait for its outcome
+                    event.wait(min(row["lease_until"] - now, CLAIM_POLL_SECONDS))
+                    continue
+                delay = max(row["next_attempt_at"] - now, self.limits.wait_time(webhook_url))
+                if delay > 0 or stop.is_set():
+                    event.wait(delay)
+                    continue
+                if not self.outbox.claim(row["id"]):
+                    continue
+                self._attempt(row)
+                with self._lock:
+                    self._changed.notify_all()
+        except Exception as e:
+            logging.error(f"❌ Exception during Discord webhook operation: {e}")
+            with self._lock:
+                if self._workers.get(webhook_url, (None,))[0] is event:
+                    del self._workers[webhook_url]
+
+    def _attempt(self, row):
+        webhook_url = row["webhook_url"]
+        outcome, error = post_once(webhook_url, row["payload"], self.limits)
+        if outcome == "sent":
+            self.outbox.mark_sent(row["id"])
+            if row["part"] == row["parts"]:
+                parts = f" ({row['parts']} messages)" if row["parts"] > 1 else ""
+                logging.info(f"✅ Discord summary message sent{parts}.")
+        elif outcome == "throttled":
+            self.outbox.release(row["id"])
+            logging.warning(f"[Discord] Webhook rate limited; retrying in {self.limits.wait_time(webhook_url):.1f}s")
+        elif outcome == "retry" and row["attempts"] < int(self.settings["max_retries"]):
+            delay = retry_delay(row["attempts"], self.settings)
+            self.outbox.reschedule(row["id"], delay, error)
+            logging.warning(f"[Discord] Webhook post failed ({error}); retrying in {delay:.0f}s")
+        else:
+            failed = self.outbox.mark_failed(row["id"], error)
+            logging.error(f"❌ Discord message {row['part']}/{row['parts']} (outbox #{row['id']}) failed: {error}")
+            if failed > 1:
+                logging.error(f"❌ The remaining {failed - 1} messages of that summary were not sent")
+
+    def flush(self, timeout=None):
+        """
+        Wait until no pending post is due before the timeout runs out (all of them when timeout is None).
+        Returns False if the timeout ran out first.
+        """
+        self.wake()
+        end = None if timeout is None else time.time() + timeout
+        with self._lock:
+            while self.outbox.count_pending(end):
+                remaining = 0.5 if end is None else min(0.5, end - time.time())
+                if remaining <= 0:
+                    return False
+                self._changed.wait(remaining)
+        return True
+
+    def close(self, timeout=None):
+        """
+        Give queued posts up to `timeout` seconds to go out, then stop the workers. Whatever is left
+        stays in the outbox for the next run; the next wake() starts new workers.
+        """
+        if not self._started:
+            return
+        if not self.flush(timeout):
+            logging.info(f"[Discord] {self.outbox.count_pending()} messages left in the outbox; they are sent on the next run")
+        with self._lock:
+            stop, self._stop = self._stop, threading.Event()
+            workers, self._workers = list(self._workers.values()), {}
+            self._started = False
+        stop.set()
+        for event, _ in workers:
+            event.set()
+        for _, thread in workers:
+            thread.join(timeout=1)
+
+_sender = DiscordSender()
+atexit.register(lambda: _sender.close(float(_sender.settings["shutdown_timeout_seconds"])))
+
+def get_sender():
+    return _sender
+
+def configure(config):
+    """
+    Apply the process-wide parts of the `discord:` config block (outbox, retries, shutdown timeout)
+    and resume delivering posts a previous run left in the outbox.
+    """
+    settings = get_settings(config)
+    _sender.settings = settings
+    if not Path(settings["outbox_path"]).exists():
+        return
+    try:
+        outbox = _sender.outbox
+        pruned = outbox.prune(float(settings["outbox_retention_days"]) * 86400)
+        if pruned:
+            logging.debug(f"[Discord] Pruned {pruned} old outbox entries")
+        if outbox.count_pending():
+            _sender.wake()
+    except sqlite3.Error as e:
+        logging.error(f"❌ Could not open the Discord outbox {settings['outbox_path']}: {e}")
+
+def close(timeout=None):
+    """
+    Give queued posts up to shutdown_timeout_seconds to be delivered and stop the sender.
+    """
+    _sender.close(float(_sender.settings["shutdown_timeout_seconds"]) if timeout is None else timeout)
+
+def send_discord_webhook(webhook_url: str, message: str, settings: dict = None) -> bool:
+    """
+    Deliver a message synchronously (bypassing the outbox), split into as many posts as it needs.
+    """
+    settings = settings or DEFAULT_DISCORD_SETTINGS
+    return deliver(webhook_url, build_payloads(message, settings), _sender.limits, settings)
+
+def dispatch_discord(config: dict, message: str, dedup_key: str = None) -> None:
+    """
+    Write a summary to the outbox for background delivery to the configured webhook; returns immediately.
+    With a dedup_key, a summary with the same key queued within discord.dedup_window_seconds is not queued
+    again; without one, only an identical summary that is still pending is skipped.
+    """
     if not config.get("discord", {}).get("enabled", False):
         logging.info("📭 Discord integration disabled.")
         return
@@ -29,4 +411,23 @@ def dispatch_discord(config: dict, message: str) -> None:
         logging.error("🔒 Discord webhook_url is missing in config.")
         return
 
-    send_discord_webhook(webhook_url, message)
+    settings = get_settings(config)
+    payloads = build_payloads(message, settings)
+    if not payloads:
+        logging.info("📭 Discord summary is empty; nothing to send.")
+        return
+    try:
+        first = not _sender._started
+        queued = _sender.outbox.enqueue(webhook_url, payloads, dedup_key, float(settings["dedup_window_seconds"]))
+    except sqlite3.Error as e:
+        # Still deliver this one, just without the outbox's durability
+        logging.error(f"❌ Could not write to the Discord outbox, sending directly: {e}")
+        threading.Thread(
+            target=deliver, args=(webhook_url, payloads, _sender.limits, settings), name="discord-direct", daemon=True
+        ).start()
+        return
+    if not queued:
+        logging.info("📭 Discord summary already queued or recently sent; not queued again.")
+        return
+    # The first dispatch of a process also picks up whatever earlier runs left in the outbox
+    _sender.wake(None if first else webhook_url)
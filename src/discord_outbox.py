@@ -0,0 +1,271 @@
+# DayZ Server Monitor
+# Project: DayZ Server Monitor
+# File: discord_outbox.py
+# Purpose: Durable Discord outbox (SQLite in WAL mode). Every webhook post is written here before it is sent and
+#          stays until Discord accepts it, so notifications survive webhook outages, restarts and crashes.
+#          Posts of a webhook are delivered in insertion order; failed posts are rescheduled with a backoff and
+#          summaries that are already queued (or were recently sent) are not queued twice.
+#          Updated: a post is claimed (status sending, with a lease) before it is sent, so overlapping processes
+#                   never send the same post; an expired lease is reclaimed. When a part of a multi-message
+#                   summary is given up, its later parts are failed with it.
+#          Updated: connections are opened by steam_cache.open_connection (shared WAL setup).
+# Author: Tig Campbell-Moore (firstname[at]lastname[dot]com)
+# License: CC BY-NC 4.0 (see LICENSE file)
+
+import hashlib
+import json
+import threading
+import time
+from pathlib import Path
+from src import steam_cache
+
+OUTBOX_FILE = Path("data/discord/outbox.sqlite3")
+
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+# Statuses of posts that still have to go out (a sending post returns to pending if its attempt fails)
+QUEUED = (PENDING, SENDING)
+
+# How long a claimed post is reserved for the process sending it (webhook posts time out after 10 s)
+LEASE_SECONDS = 60.0
+
+_outboxes = {}
+_outboxes_lock = threading.Lock()
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS outbox ("
+    "id INTEGER PRIMARY KEY AUTOINCREMENT, webhook_url TEXT NOT NULL, payload TEXT NOT NULL, "
+    "dedup_key TEXT NOT NULL, dedup_until REAL, part INTEGER NOT NULL DEFAULT 1, parts INTEGER NOT NULL DEFAULT 1, "
+    "status TEXT NOT NULL DEFAULT 'pending', attempts INTEGER NOT NULL DEFAULT 0, created_at REAL NOT NULL, "
+    "next_attempt_at REAL NOT NULL, sent_at REAL, last_error TEXT, lease_until REAL)",
+    "CREATE INDEX IF NOT EXISTS idx_outbox_status_webhook ON outbox(status, webhook_url, id)",
+    "CREATE INDEX IF NOT EXISTS idx_outbox_dedup_key ON outbox(dedup_key)",
+)
+
+_COLUMNS = (
+    "id", "webhook_url", "payload", "dedup_key", "part", "parts", "status",
+    "attempts", "created_at", "next_attempt_at", "sent_at", "last_error", "lease_until",
+)
+
+def content_key(webhook_url, payloads):
+    """
+    Deduplication key of a summary without an explicit key: the webhook and the exact payloads.
+    """
+    digest = hashlib.sha256(json.dumps([webhook_url, payloads], sort_keys=True).encode("utf-8")).hexdigest()
+    return f"content:{digest}"
+
+class Outbox:
+    """
+    Queue of webhook posts in one SQLite file. Each thread gets its own connection, so the monitor's
+    server workers, the background sender and the CLI can use the same file concurrently.
+    """
+    def __init__(self, path=OUTBOX_FILE):
+        self.path = Path(path)
+        self._local = threading.local()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = steam_cache.open_connection(self.path, _SCHEMA)
+            # Outboxes created before posts were claimed
+            if "lease_until" not in {row[1] for row in conn.execute("PRAGMA table_info(outbox)")}:
+                conn.execute("ALTER TABLE outbox ADD COLUMN lease_until REAL")
+            self._local.conn = conn
+        return conn
+
+    def _rows(self, query, params=()):
+        rows = self._connect().execute(f"SELECT {', '.join(_COLUMNS)} FROM outbox {query}", params)
+        return [dict(zip(_COLUMNS, row)) for row in rows]
+
+    def enqueue(self, webhook_url, payloads, dedup_key=None, dedup_window=0.0, now=None):
+        """
+        Queue the payloads of one summary. Returns the number of posts queued: 0 if the same summary is
+        still queued, or if it has an explicit dedup_key and was queued within the last dedup_window seconds.
+        """
+        now = now or time.time()
+        key = dedup_key or content_key(webhook_url, payloads)
+        dedup_until = now + dedup_window if dedup_key else None
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            duplicate = conn.execute(
+                "SELECT 1 FROM outbox WHERE dedup_key = ? AND webhook_url = ? AND (status IN (?, ?) OR dedup_until >= ?) LIMIT 1",
+                (key, webhook_url, *QUEUED, now),
+            ).fetchone()
+            if duplicate:
+                conn.execute("COMMIT")
+                return 0
+            conn.executemany(
+                "INSERT INTO outbox (webhook_url, payload, dedup_key, dedup_until, part, parts, created_at, next_attempt_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (webhook_url, json.dumps(payload), key, dedup_until, part, len(payloads), now, now)
+                    for part, payload in enumerate(payloads, start=1)
+                ],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return len(payloads)
+
+    def head(self, webhook_url):
+        """
+        The oldest queued post of a webhook (posts of a webhook go out strictly in order), or None.
+        A post with status sending is being sent by this or another process until its lease_until.
+        """
+        rows = self._rows("WHERE status IN (?, ?) AND webhook_url = ? ORDER BY id LIMIT 1", (*QUEUED, webhook_url))
+        if not rows:
+            return None
+        row = rows[0]
+        row["payload"] = json.loads(row["payload"])
+        return row
+
+    def claim(self, row_id, lease=LEASE_SECONDS, now=None):
+        """
+        Reserve a post for sending: returns False if it was sent, given up or claimed (with a lease that has
+        not expired) by someone else since it was read.
+        """
+        now = now or time.time()
+        cursor = self._connect().execute(
+            "UPDATE outbox SET status = ?, lease_until = ? "
+            "WHERE id = ? AND (status = ? OR (status = ? AND lease_until < ?))",
+            (SENDING, now + lease, row_id, PENDING, SENDING, now),
+        )
+        return cursor.rowcount == 1
+
+    def pending_webhooks(self):
+        rows = self._connect().execute("SELECT DISTINCT webhook_url FROM outbox WHERE status IN (?, ?)", QUEUED)
+        return [url for (url,) in rows]
+
+    def count_pending(self, due_before=None):
+        """
+        Number of posts still to go out (pending or being sent), optionally only those due before the given time.
+        """
+        if due_before is None:
+            query, params = "SELECT COUNT(*) FROM outbox WHERE status IN (?, ?)", QUEUED
+        else:
+            query, params = "SELECT COUNT(*) FROM outbox WHERE status IN (?, ?) AND next_attempt_at <= ?", (*QUEUED, due_before)
+        (count,) = self._connect().execute(query, params).fetchone()
+        return count
+
+    def mark_sent(self, row_id, now=None):
+        self._connect().execute(
+            "UPDATE outbox SET status = ?, sent_at = ?, attempts = attempts + 1, last_error = NULL, lease_until = NULL "
+            "WHERE id = ?",
+            (SENT, now or time.time(), row_id),
+        )
+
+    def reschedule(self, row_id, delay, error, now=None):
+        """
+        Count a failed attempt and try the post again after `delay` seconds.
+        """
+        self._connect().execute(
+            "UPDATE outbox SET status = ?, attempts = attempts + 1, next_attempt_at = ?, last_error = ?, lease_until = NULL "
+            "WHERE id = ?",
+            (PENDING, (now or time.time()) + delay, error, row_id),
+        )
+
+    def release(self, row_id):
+        """
+        Return a claimed post to the queue without counting an attempt (e.g. it was rate limited).
+        """
+        self._connect().execute(
+            "UPDATE outbox SET status = ?, lease_until = NULL WHERE id = ? AND status = ?", (PENDING, row_id, SENDING)
+        )
+
+    def mark_failed(self, row_id, error):
+        """
+        Give up a post, and the later parts of its summary: they would not make sense without it.
+        Returns how many posts were given up.
+        """
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT dedup_key, part, parts FROM outbox WHERE id = ?", (row_id,)).fetchone()
+            conn.execute(
+                "UPDATE outbox SET status = ?, attempts = attempts + 1, last_error = ?, lease_until = NULL WHERE id = ?",
+                (FAILED, error, row_id),
+            )
+            failed = 1
+            if row is not None and row[1] < row[2]:
+                # The parts of a summary were inserted together, with consecutive ids
+                cursor = conn.execute(
+                    "UPDATE outbox SET status = ?, last_error = ?, lease_until = NULL "
+                    "WHERE id > ? AND id <= ? AND dedup_key = ? AND status IN (?, ?)",
+                    (FAILED, f"part {row[1]}/{row[2]} failed", row_id, row_id + row[2] - row[1], row[0], *QUEUED),
+                )
+                failed += cursor.rowcount
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return failed
+
+    def retry(self, status=FAILED, now=None):
+        """
+        Make posts with the given status pending again, due now; returns how many.
+        """
+        cursor = self._connect().execute(
+            "UPDATE outbox SET status = ?, attempts = 0, next_attempt_at = ? WHERE status = ?",
+            (PENDING, now or time.time(), status),
+        )
+        return cursor.rowcount
+
+    def reschedule_pending(self, now=None):
+        """
+        Make every pending post due now (e.g. for a manual flush); returns how many.
+        """
+        cursor = self._connect().execute(
+            "UPDATE outbox SET next_attempt_at = ? WHERE status = ? AND next_attempt_at > ?",
+            (now or time.time(), PENDING, now or time.time()),
+        )
+        return cursor.rowcount
+
+    def counts(self):
+        """
+        Number of posts per status.
+        """
+        rows = self._connect().execute("SELECT status, COUNT(*) FROM outbox GROUP BY status")
+        counts = {PENDING: 0, SENDING: 0, SENT: 0, FAILED: 0}
+        counts.update(dict(rows))
+        return counts
+
+    def list(self, status=None, limit=50):
+        """
+        Posts with the given status (all when None), oldest first.
+        """
+        if status is None:
+            return self._rows("ORDER BY id LIMIT ?", (limit,))
+        return self._rows("WHERE status = ? ORDER BY id LIMIT ?", (status, limit))
+
+    def prune(self, older_than, now=None):
+        """
+        Delete sent and failed posts older than `older_than` seconds whose deduplication window is over.
+        """
+        now = now or time.time()
+        cursor = self._connect().execute(
+            "DELETE FROM outbox WHERE status NOT IN (?, ?) AND created_at < ? AND (dedup_until IS NULL OR dedup_until < ?)",
+            (*QUEUED, now - older_than, now),
+        )
+        return cursor.rowcount
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+def get_outbox(path=None):
+    """
+    Return the shared Outbox for a database file (default data/discord/outbox.sqlite3).
+    """
+    path = Path(path or OUTBOX_FILE).resolve()
+    with _outboxes_lock:
+        outbox = _outboxes.get(path)
+        if outbox is None:
+            outbox = Outbox(path)
+            _outboxes[path] = outbox
+        return outbox
@@ -0,0 +1,140 @@
+# DayZ Server Monitor
+# Project: DayZ Server Monitor
+# File: http_session.py
+# Purpose: Shared, thread-safe requests.Session with connection pooling, keep-alive and retry/backoff policy.
+#          Used by steam_api, changelog_fetcher and discord_notifier. Exposes connection-reuse counters.
+#          Updated: 429 responses are returned to the caller (Steam throttling is handled by rate_limiter.py).
+#          Updated: requests/urllib3 are imported when the first session is built, not at startup.
+#          Updated: get_session(retry_posts=False) returns a second pool that never re-sends a POST once it may have
+#                   reached the server (Discord webhooks, which the outbox retries itself).
+# Author: Tig Campbell-Moore (firstname[at]lastname[dot]com)
+# License: CC BY-NC 4.0 (see LICENSE file)
+
+import logging
+import threading
+
+DEFAULT_HTTP_SETTINGS = {
+    "pool_connections": 10,     # Number of distinct hosts kept in the pool
+    "pool_maxsize": 20,         # Keep-alive connections kept per host
+    "max_retries": 3,           # Retries for connection errors and 502/503/504
+    "backoff_factor": 0.5,      # Exponential backoff between retries (0.5s, 1s, 2s, ...)
+    "status_forcelist": [502, 503, 504],
+}
+
+_lock = threading.Lock()
+# retry_posts -> session
+_sessions = {}
+_settings = dict(DEFAULT_HTTP_SETTINGS)
+# Counters from pools that have already been closed/discarded
+_closed_stats = {"requests": 0, "connections": 0}
+
+def configure(config):
+    """
+    Apply the `http:` config block. Rebuilds the shared session if the pool/retry settings changed.
+    """
+    http_cfg = config.get("http") or {}
+    settings = dict(DEFAULT_HTTP_SETTINGS)
+    settings.update({k: v for k, v in http_cfg.items() if k in DEFAULT_HTTP_SETTINGS and v is not None})
+    global _settings
+    with _lock:
+        if settings == _settings:
+            return
+        _settings = settings
+        _close_locked()
+    logging.debug(f"[HTTP] Session settings: {settings}")
+
+def _build_session(settings, retry_posts=True):
+    # Imported on first use: a run that sends nothing over HTTP does not pay for loading requests
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    class _Retry(Retry):
+        # 429 is not retried here: a blocking sleep inside one thread would bypass the shared Steam rate limiter
+        RETRY_AFTER_STATUS_CODES = frozenset({413, 503})
+
+    retry = _Retry(
+        total=settings["max_retries"],
+        backoff_factor=settings["backoff_factor"],
+        status_forcelist=settings["status_forcelist"],
+        # Steam lookups are POSTs and safe to repeat; otherwise a POST is only retried if it was never sent
+        allowed_methods=None if retry_posts else Retry.DEFAULT_ALLOWED_METHODS,
+        raise_on_status=False,
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=settings["pool_connections"],
+        pool_maxsize=settings["pool_maxsize"],
+        max_retries=retry,
+        pool_block=False,
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Connection": "keep-alive"})
+    return session
+
+def get_session(retry_posts=True):
+    """
+    Return the process-wide pooled session, creating it on first use.
+    With retry_posts=False, a POST is not re-sent after a read error or a 502/503/504 (connection errors
+    before the request was sent are still retried): for requests that are not safe to repeat.
+    """
+    session = _sessions.get(retry_posts)
+    if session is None:
+        with _lock:
+            session = _sessions.get(retry_posts)
+            if session is None:
+                session = _sessions[retry_posts] = _build_session(_settings, retry_posts)
+    return session
+
+def _iter_pools(session):
+    seen = set()
+    for adapter in session.adapters.values():
+        if id(adapter) in seen:
+            continue
+        seen.add(id(adapter))
+        pools = adapter.poolmanager.pools
+        with pools.lock:
+            yield from list(pools._container.values())
+
+def _pool_counters(session):
+    requests_made = 0
+    connections = 0
+    for pool in _iter_pools(session):
+        requests_made += pool.num_requests
+        connections += pool.num_connections
+    return requests_made, connections
+
+def get_stats():
+    """
+    Return connection-reuse counters for the shared session:
+    requests sent, connections opened, and requests served on an already-open connection.
+    """
+    with _lock:
+        requests_made = _closed_stats["requests"]
+        connections = _closed_stats["connections"]
+        for session in _sessions.values():
+            live_requests, live_connections = _pool_counters(session)
+            requests_made += live_requests
+            connections += live_connections
+    return {
+        "requests": requests_made,
+        "connections": connections,
+        "reused": max(requests_made - connections, 0),
+    }
+
+def _close_locked():
+    for session in _sessions.values():
+        live_requests, live_connections = _pool_counters(session)
+        _closed_stats["requests"] += live_requests
+        _closed_stats["connections"] += live_connections
+        session.close()
+    _sessions.clear()
+
+def close():
+    """
+    Close the shared sessions and all pooled connections (counters are kept).
+    """
+    with _lock:
+        _close_locked()
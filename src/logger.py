@@ -1,12 +1,20 @@
 # Project: DayZ Server Monitor
 # File: logger.py
 # Purpose: Setup logging system including log level and log splitting with strict per-level routing
+#          Updated: Optional queue mode (logging.queue): callers only enqueue records and a single listener thread
+#                   formats and writes them; the queue is drained on exit.
 # Author: Tig Campbell-Moore (firstname[at]lastname[dot]com)
 # License: CC BY-NC 4.0 (see LICENSE file)
 
+import atexit
 import logging
+import queue
+import threading
 from pathlib import Path
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+_listener_lock = threading.Lock()
+_listener = None
 
 class LevelFilter(logging.Filter):
     """
@@ -18,6 +26,37 @@ class LevelFilter(logging.Filter):
     def filter(self, record):
         return record.levelno == self.level
 
+class _EnqueueHandler(QueueHandler):
+    """
+    QueueHandler that leaves the work to the listener thread: only the message is merged with its
+    arguments (they may change after the call); exception tracebacks are formatted by the listener.
+    """
+    def prepare(self, record):
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+def stop_queue_logging():
+    """
+    Drain the log queue and stop the listener thread. The real handlers are put back on the root
+    logger, so anything logged afterwards (e.g. by other exit handlers) is still written.
+    """
+    global _listener
+    with _listener_lock:
+        listener, _listener = _listener, None
+    if listener is None:
+        return
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        if isinstance(handler, _EnqueueHandler):
+            root.removeHandler(handler)
+    listener.stop()
+    for handler in listener.handlers:
+        root.addHandler(handler)
+
+atexit.register(stop_queue_logging)
+
 def setup_logging(config):
     """
     Initialize the logging subsystem using the provided config.
@@ -26,6 +65,7 @@ def setup_logging(config):
     - No message duplication between log files.
     - Console output is at the configured level or higher.
     - Debug log file is only active if loglevel is set to DEBUG.
+    - With logging.queue, the handlers run on one listener thread fed by a queue.
     """
     if not config.get("logging", {}).get("enabled", False):
         return
@@ -43,6 +83,7 @@ def setup_logging(config):
     log_dir.mkdir(parents=True, exist_ok=True)
 
     # Remove all handlers to avoid duplicates on re-init
+    stop_queue_logging()
     for handler in logging.root.handlers[:]:
         logging.root.removeHandler(handler)
 
@@ -55,7 +96,7 @@ def setup_logging(config):
     console_handler = logging.StreamHandler()
     console_handler.setFormatter(formatter)
     console_handler.setLevel(log_level)
-    logger.addHandler(console_handler)
+    handlers = [console_handler]
 
     # Per-level file handlers (no duplication)
     for level_name, filename in log_files.items():
@@ -72,6 +113,18 @@ def setup_logging(config):
         handler.setLevel(level)
         handler.setFormatter(formatter)
         handler.addFilter(LevelFilter(level))
-        logger.addHandler(handler)
+        handlers.append(handler)
+
+    if log_config.get("queue", False):
+        global _listener
+        log_queue = queue.SimpleQueue()
+        listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        listener.start()
+        with _listener_lock:
+            _listener = listener
+        logger.addHandler(_EnqueueHandler(log_queue))
+    else:
+        for handler in handlers:
+            logger.addHandler(handler)
 
     logging.info("Logging initialized (per-level, non-duplicating, debug log only if debug level).")
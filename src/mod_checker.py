@@ -2,29 +2,33 @@
 # File: mod_checker.py
 #
 # Mod check and reporting logic for DayZ Server Monitor.
-# Supports serial, threaded, and async processing models.
-# Reports changelogs for added/updated mods if configured, with truncation.
+# Supports serial, threaded, and async processing models, or `auto` to pick one per run from past fetch times.
+# Reports changelogs for added/updated mods if configured, with truncation: the latest Workshop changelog entry
+# (changelog_source: workshop, fetched concurrently and cached) or the mod description.
+# Lookup results are diffed and rendered as they stream in, while other lookups are still in flight.
+# Discord summaries of any length are queued for background delivery, split across several messages as needed.
+# They go through a durable outbox; a change summary is keyed by its changes so it is never queued twice.
 # NEVER outputs links to Discord, file, or console.
 # Cleans changelog: removes unsupported BBCode, stray tags, blank/formatting lines, links, and images.
 #
 # (C) Tig Campbell-Moore, rTiGd2/dayz_server_monitor contributors
 # License: CC BY-NC 4.0
 
+import hashlib
 import logging
 import time
-import json
 import re
+from functools import lru_cache
 from datetime import datetime, timedelta
-from pathlib import Path
 from src import server_query
 from src import output_handler
 from src.templates import TemplateLoader
 from src import discord_notifier
-from src import steam_api
-
-from src.modes import serial_mode as serial_mode
-from src.modes import threaded_mode as threaded_mode
-from src.modes import async_mode as async_mode
+from src import mod_resolver
+from src import changelog_fetcher
+from src import mode_selector
+from src import perf_store
+from src.bbcode import bbcode_to_discord, bbcode_to_discord_lines
 
 from src.server_monitor_tracker import (
     update_performance,
@@ -33,7 +37,7 @@ from src.server_monitor_tracker import (
     load_mod_tracking,
 )
 
-PERF_LOG_FILE = Path("data/performance/performance_log.json")
+PERF_LOG_STREAM = "performance_log"
 
 def get_mod_attr(mod, key, default=None):
     if isinstance(mod, dict):
@@ -62,40 +66,19 @@ def get_mod_changelog(mod):
             return getattr(mod, key)
     return ""
 
-def bbcode_to_discord(text):
-    """Convert common BBCode to Discord markdown. Strip all other BBCode tags, links, images, and blank lines."""
-    if not text:
-        return ""
-    # Remove [img], [image], [url] tags and their content
-    text = re.sub(r'\[img\](.*?)\[/img\]', '', text, flags=re.DOTALL | re.IGNORECASE)
-    text = re.sub(r'\[image\](.*?)\[/image\]', '', text, flags=re.DOTALL | re.IGNORECASE)
-    text = re.sub(r'\[url(=[^\]]*)?\](.*?)\[/url\]', '', text, flags=re.DOTALL | re.IGNORECASE)
-    # Remove HTML links and images
-    text = re.sub(r'<a\b[^>]*>(.*?)</a>', '', text, flags=re.DOTALL | re.IGNORECASE)
-    text = re.sub(r'<img\b[^>]*>', '', text, flags=re.DOTALL | re.IGNORECASE)
-    # Convert supported tags to Discord markdown
-    text = re.sub(r'\[b\](.*?)\[/b\]', r'**\1**', text, flags=re.DOTALL | re.IGNORECASE)
-    text = re.sub(r'\[u\](.*?)\[/u\]', r'__\1__', text, flags=re.DOTALL | re.IGNORECASE)
-    text = re.sub(r'\[i\](.*?)\[/i\]', r'*\1*', text, flags=re.DOTALL | re.IGNORECASE)
-    text = re.sub(r'\[s\](.*?)\[/s\]', r'~~\1~~', text, flags=re.DOTALL | re.IGNORECASE)
-    # Remove unsupported url/color/list/quote/etc tags
-    text = re.sub(r'\[/?(url|color|list|quote|h[1-6]|img|image|spoiler|code|center|size|font|video|audio|flash|table|tr|td|th|hr|li|ol|ul|br|yt|youtube|media|left|right|justify|indent|outdent|sup|sub)(=[^\]]*)?\]', '', text, flags=re.DOTALL | re.IGNORECASE)
-    # Remove HTML tags
-    text = re.sub(r'<[^>]+>', '', text)
-    # Remove any other [tag] or [/tag]
-    text = re.sub(r'\[/?[a-zA-Z0-9]+(=[^\]]*)?\]', '', text)
-    # Remove lines containing only whitespace or only formatting (e.g. after stripping tags)
-    lines = [l for l in text.splitlines() if l.strip() and not re.match(r'^[\*\_\~]+$', l.strip())]
-    return "\n".join(lines)
+_MOD_NAME_TAG_RE = re.compile(r'\[/?[a-z]+(=[^\]]*)?\]', re.IGNORECASE)
+
+@lru_cache(maxsize=1024)
+def _mod_name_prefix_re(plain_mod_name):
+    return re.compile(r"^(\[b\]|\[u\])*" + re.escape(plain_mod_name) + r"(\[/u\]|\[/b\])*", re.IGNORECASE)
 
 def format_changelog_with_modname(changelog, mod_name):
     if not changelog or not mod_name:
         return bbcode_to_discord(changelog or "")
-    plain_mod_name = re.sub(r'\[/?[a-z]+(=[^\]]*)?\]', '', mod_name, flags=re.IGNORECASE)
+    plain_mod_name = _MOD_NAME_TAG_RE.sub('', mod_name)
     decorated_name = f"__**{plain_mod_name}**__"
     changelog_strip = changelog.lstrip()
-    modname_regex = r"^(\[b\]|\[u\])*" + re.escape(plain_mod_name) + r"(\[/u\]|\[/b\])*"
-    match = re.match(modname_regex, changelog_strip, flags=re.IGNORECASE)
+    match = _mod_name_prefix_re(plain_mod_name).match(changelog_strip)
     if match:
         end = match.end()
         rest = changelog_strip[end:].lstrip(": \n")
@@ -104,9 +87,63 @@ def format_changelog_with_modname(changelog, mod_name):
     else:
         return bbcode_to_discord(changelog)
 
-def run_mod_check(config, templates=None):
+def render_changelog(description, mod_name, max_changelog_lines):
+    """
+    Clean a Steam description/changelog and truncate it to max_changelog_lines for output.
+    """
+    if not description:
+        return ""
+    # One extra line is enough to know the changelog needs truncating; the rest is never converted
+    changelog_lines = bbcode_to_discord_lines(description, limit=max_changelog_lines + 1)
+    if len(changelog_lines) > max_changelog_lines:
+        changelog_text = "\n".join(changelog_lines[:max_changelog_lines])
+        changelog_text += "\n[...] (truncated)"
+    else:
+        changelog_text = "\n".join(changelog_lines)
+    return format_changelog_with_modname(changelog_text, mod_name)
+
+def render_workshop_changelog(changelog, max_changelog_lines):
+    """
+    Truncate a Workshop changelog (plain text from the changelog page) to max_changelog_lines for output.
+    """
+    lines = changelog.splitlines()
+    if len(lines) > max_changelog_lines:
+        return "\n".join(lines[:max_changelog_lines]) + "\n[...] (truncated)"
+    return "\n".join(lines)
+
+def build_change_message(kind, mod, description, max_changelog_lines, changelog=None):
+    """
+    Build the report entry for an added ("new") or updated mod.
+    The Workshop changelog is used when given, otherwise the changelog is rendered from description;
+    pass None for both when changelogs are disabled.
+    """
+    name = mod["name"]
+    time_updated = mod.get("time_updated", 0)
+    local_time = datetime.fromtimestamp(time_updated).strftime("%Y-%m-%d %H:%M:%S") if time_updated else ""
+    discord_time = f"<t:{int(time_updated)}:F>" if time_updated else ""
+    changelog_text = ""
+    if changelog:
+        changelog_text = render_workshop_changelog(changelog, max_changelog_lines)
+    elif description is not None:
+        changelog_text = render_changelog(description, name, max_changelog_lines)
+    return {
+        "type": kind,
+        "title": name,
+        "local_time": local_time,
+        "discord_time": discord_time,
+        "changelog_text": changelog_text
+    }
+
+def run_mod_check(config, templates=None, query_result=None, resolved_mods=None):
+    """
+    Check one server's mods and report changes.
+    query_result optionally carries a pre-fetched server query ((info, mods) or the raised exception),
+    e.g. from the cycle-wide asyncio query stage in monitor.py; otherwise the server is queried here.
+    resolved_mods optionally carries the cycle-wide Steam lookups (workshop ID -> record) shared by all servers.
+    """
     mods_cfg = config.get("mods", {})
     show_mod_changelog = mods_cfg.get("show_mod_changelog", True)
+    changelog_source = mods_cfg.get("changelog_source", "workshop").lower()
     max_changelog_lines = mods_cfg.get("max_changelog_lines", 10)
     mod_checking_enabled = mods_cfg.get("mod_checking_enabled", True)
     mod_check_mode = mods_cfg.get("mod_check_mode", "serial").lower()
@@ -133,20 +170,25 @@ def run_mod_check(config, templates=None):
         templates = TemplateLoader(locale)
 
     start_time = time.perf_counter()
-    ip = config["server"]["ip"]
-    port = config["server"]["port"]
+    ip, port = server_query.get_query_target(config)
 
     server_name = config.get("server_name", config.get("_config_file", "unnamed_server").replace(".yaml", ""))
 
     try:
-        info, mods = server_query.query_server(ip, port)
+        if query_result is None:
+            _, query_timeout = server_query.get_query_settings(config)
+            info, mods = server_query.query_server(ip, port, timeout=query_timeout)
+        elif isinstance(query_result, BaseException):
+            raise query_result
+        else:
+            info, mods = query_result
     except TimeoutError:
         logging.error(f"Server query timed out at {ip}:{port}")
-        output_handler.output_messages.append(f"❌ Failed to query server: Timed out at {ip}:{port}")
+        output_handler.add_message(f"❌ Failed to query server: Timed out at {ip}:{port}")
         return [], {}
     except Exception as e:
         logging.exception(f"Server query failed: {e}")
-        output_handler.output_messages.append(f"❌ Failed to query server: {e}")
+        output_handler.add_message(f"❌ Failed to query server: {e}")
         return [], {}
 
     # Compute next reboot time (used in summary)
@@ -165,49 +207,105 @@ def run_mod_check(config, templates=None):
             next_reboot = base + timedelta(days=1)
 
     # === Parallel processing model selection ===
-    logging.info(f"[mod_checker] Using mod_check_mode: {mod_check_mode}")
-    if mod_check_mode == "serial":
-        mod_results = serial_mode.run(config, info, mods)
-    elif mod_check_mode == "threaded":
-        mod_results = threaded_mode.run(config, info, mods)
-    elif mod_check_mode == "async":
-        mod_results = async_mode.run(config, info, mods)
+    # Results are diffed against the previous state (and changed mods rendered) as they stream in,
+    # while the remaining lookups are still in flight
+    previous_mods_dict = load_mod_tracking(server_name)
+    fetch_stats = {}
+    if resolved_mods is not None:
+        # Lookups were already done once for the whole cycle
+        mod_check_mode = "shared"
+        logging.info("[mod_checker] Using cycle-wide shared mod lookups")
+        mod_results = mod_resolver.results_for_server(resolved_mods, mods)
     else:
-        logging.warning(f"[mod_checker] Unknown mod_check_mode '{mod_check_mode}', defaulting to serial")
-        mod_results = serial_mode.run(config, info, mods)
-
-    # Build current_mods_dict from mod_results (no changelogs stored)
+        mod_check_mode, run_config = mod_resolver.choose_mode(
+            config, len(mods), lambda: load_performance_stats(server_name, mode_selector.HISTORY_SIZE), server_name
+        )
+        logging.info(f"[mod_checker] Using mod_check_mode: {mod_check_mode}")
+        mod_results = mod_resolver.iter_mod_details(run_config, info, mods, mod_check_mode)
+    fetch_start = time.perf_counter()
+
+    # current_mods_dict holds what is tracked (no changelogs stored); changed maps workshop ID -> "new"/"updated".
+    # Messages are only rendered while the number of changes is within report_limit; with
+    # changelog_source: workshop, their changelog pages are fetched in the background meanwhile.
+    # Once report_limit is exceeded only the count is reported, so what was rendered or queued is dropped.
     current_mods_dict = {}
-    for base_mod, mod_res in zip(mods, mod_results):
+    cache_hits = 0
+    changed = {}
+    change_messages = {}
+    pending_changelogs = {}
+    fetcher = None
+    if show_mod_changelog and changelog_source == "workshop":
+        fetcher = changelog_fetcher.ChangelogFetcher(config)
+    for mod_res in mod_results:
         if not mod_res or not mod_res.get("workshop_id"):
             continue
         wid = str(mod_res["workshop_id"])
-        current_mods_dict[wid] = {
+        if mod_res.get("cached"):
+            cache_hits += 1
+        mod = {
             "name": mod_res.get("title", get_mod_name(mod_res)),
             "workshop_id": wid,
             "time_updated": mod_res.get("time_updated", 0),
         }
+        current_mods_dict[wid] = mod
+        prev = previous_mods_dict.get(wid)
+        if prev is None:
+            changed[wid] = "new"
+        elif mod["time_updated"] > prev.get("time_updated", 0):
+            changed[wid] = "updated"
+        else:
+            continue
+        if len(changed) > report_limit:
+            if fetcher is not None:
+                fetcher.cancel()
+                fetcher = None
+            pending_changelogs.clear()
+            change_messages.clear()
+            continue
+        description = mod_res.get("description", "") if show_mod_changelog else None
+        if fetcher is not None:
+            pending_changelogs[wid] = (description, fetcher.submit(wid, mod["time_updated"]))
+        else:
+            change_messages[wid] = build_change_message(changed[wid], mod, description, max_changelog_lines)
+
+    # Lookup time only: the Workshop changelog pages below do not depend on the mod check mode.
+    # Cache hits cost no request, so `auto` compares modes by the mods actually fetched from Steam.
+    if resolved_mods is None:
+        workshop_ids = {str(mod["workshop_id"]) for mod in mods if mod.get("workshop_id")}
+        fetch_stats = {
+            "fetch_seconds": time.perf_counter() - fetch_start,
+            "fetched_count": len(workshop_ids) - cache_hits,
+            "concurrency": mode_selector.get_concurrency(run_config, mod_check_mode),
+        }
 
-    previous_mods_dict = load_mod_tracking(server_name)
-    prev_wids = set(previous_mods_dict.keys())
-    curr_wids = set(current_mods_dict.keys())
-
-    added_mods = curr_wids - prev_wids
-    removed_mods = prev_wids - curr_wids
-
-    updated_mods = []
-    for wid in curr_wids & prev_wids:
-        prev = previous_mods_dict[wid]
-        curr = current_mods_dict[wid]
-        if curr.get("time_updated", 0) > prev.get("time_updated", 0):
-            updated_mods.append(wid)
+    if fetcher is not None:
+        # A mod without a retrievable Workshop changelog falls back to its description
+        for wid, (description, future) in pending_changelogs.items():
+            change_messages[wid] = build_change_message(
+                changed[wid], current_mods_dict[wid], description, max_changelog_lines, future.result()
+            )
+        fetcher.close()
+
+    # A mod the server still reports but whose lookup failed (e.g. Steam kept throttling) keeps its last
+    # known state rather than showing up as removed; a new one is reported once a lookup succeeds
+    unresolved = [
+        str(mod["workshop_id"]) for mod in mods
+        if mod.get("workshop_id") and str(mod["workshop_id"]) not in current_mods_dict
+    ]
+    carried = [wid for wid in unresolved if wid in previous_mods_dict]
+    for wid in carried:
+        current_mods_dict[wid] = previous_mods_dict[wid]
+    if unresolved:
+        logging.warning(
+            f"[mod_checker] {len(unresolved)} mods on {server_name} could not be looked up; "
+            f"kept the last known state of {len(carried)}"
+        )
+    removed_mods = set(previous_mods_dict) - set(current_mods_dict)
 
     changes_detected = False
     mod_messages = []
 
-    n_added = len(added_mods)
-    n_updated = len(updated_mods)
-    total_changes = n_added + n_updated
+    total_changes = len(changed)
 
     if total_changes > report_limit:
         msg = {
@@ -220,77 +318,13 @@ def run_mod_check(config, templates=None):
         }
         mod_messages = [msg]
         changes_detected = True
-    else:
-        # Report all ADDED mods (with changelog lookup/output if enabled)
-        for wid in added_mods:
-            mod = current_mods_dict[wid]
-            name = mod["name"]
-            time_updated = mod.get("time_updated", 0)
-            local_time = datetime.fromtimestamp(time_updated).strftime("%Y-%m-%d %H:%M:%S") if time_updated else ""
-            discord_time = f"<t:{int(time_updated)}:F>" if time_updated else ""
-            changelog_text = ""
-            if show_mod_changelog:
-                # Lookup changelog live from Steam API
-                try:
-                    steam_info = steam_api.get_mod_info(wid)
-                    changelog = steam_info.get("description", "")
-                except Exception:
-                    changelog = ""
-                if changelog:
-                    changelog = bbcode_to_discord(changelog)
-                    changelog_lines = changelog.splitlines()
-                    # Remove blank lines after BBCode/HTML strip
-                    changelog_lines = [line for line in changelog_lines if line.strip()]
-                    if len(changelog_lines) > max_changelog_lines:
-                        changelog_text = "\n".join(changelog_lines[:max_changelog_lines])
-                        changelog_text += "\n[...] (truncated)"
-                    else:
-                        changelog_text = "\n".join(changelog_lines)
-                    changelog_text = format_changelog_with_modname(changelog_text, name)
-            msg = {
-                "type": "new",
-                "title": name,
-                "local_time": local_time,
-                "discord_time": discord_time,
-                "changelog_text": changelog_text
-            }
-            mod_messages.append(msg)
-            changes_detected = True
-
-        # Report all UPDATED mods (with changelog lookup/output if enabled)
-        for wid in updated_mods:
-            mod = current_mods_dict[wid]
-            name = mod["name"]
-            time_updated = mod.get("time_updated", 0)
-            local_time = datetime.fromtimestamp(time_updated).strftime("%Y-%m-%d %H:%M:%S") if time_updated else ""
-            discord_time = f"<t:{int(time_updated)}:F>" if time_updated else ""
-            changelog_text = ""
-            if show_mod_changelog:
-                # Lookup changelog live from Steam API
-                try:
-                    steam_info = steam_api.get_mod_info(wid)
-                    changelog = steam_info.get("description", "")
-                except Exception:
-                    changelog = ""
-                if changelog:
-                    changelog = bbcode_to_discord(changelog)
-                    changelog_lines = changelog.splitlines()
-                    changelog_lines = [line for line in changelog_lines if line.strip()]
-                    if len(changelog_lines) > max_changelog_lines:
-                        changelog_text = "\n".join(changelog_lines[:max_changelog_lines])
-                        changelog_text += "\n[...] (truncated)"
-                    else:
-                        changelog_text = "\n".join(changelog_lines)
-                    changelog_text = format_changelog_with_modname(changelog_text, name)
-            msg = {
-                "type": "updated",
-                "title": name,
-                "local_time": local_time,
-                "discord_time": discord_time,
-                "changelog_text": changelog_text
-            }
-            mod_messages.append(msg)
-            changes_detected = True
+    elif changed:
+        # ADDED mods first, then UPDATED ones, each in the server's mod order
+        order = {wid: index for index, wid in enumerate(str(mod.get("workshop_id")) for mod in mods)}
+        for kind in ("new", "updated"):
+            wids = sorted((wid for wid, change in changed.items() if change == kind), key=lambda wid: order.get(wid, 0))
+            mod_messages.extend(change_messages[wid] for wid in wids)
+        changes_detected = True
 
     # Report REMOVED mods
     if show_removed_mods:
@@ -322,6 +356,8 @@ def run_mod_check(config, templates=None):
     performance_stats = {
         "duration_seconds": duration,
         "check_mode": mod_check_mode,
+        **fetch_stats,
+        "unresolved": len(unresolved),
         "mod_count": len(current_mods_dict),
         "timestamp": datetime.now().isoformat()
     }
@@ -346,14 +382,28 @@ def run_mod_check(config, templates=None):
         discord_summary_message = build_summary_with_mods(
             config, templates, mod_messages, server_info=server_info, mods=mods, next_reboot=next_reboot, output_to_discord=True, server_name=server_name
         )
-        if len(discord_summary_message) > 2000:
-            discord_summary_message = f"Too many mod changes to display. ({total_changes} mods updated/added.)"
         if changes_detected or not silent_on_no_changes:
-            discord_notifier.dispatch_discord(config, discord_summary_message)
+            output_handler.publish(
+                discord_notifier.dispatch_discord,
+                config, discord_summary_message, change_key(server_name, changed, current_mods_dict, removed_mods)
+            )
 
     save_mod_tracking(server_name, current_mods_dict)
 
-    return list(curr_wids), performance_stats
+    return list(current_mods_dict), performance_stats
+
+def change_key(server_name, changed, current_mods_dict, removed_mods):
+    """
+    Deduplication key of a change summary: the server plus exactly which mod versions changed.
+    The same changes are then never announced twice, e.g. when a run is repeated before its tracking was saved.
+    Returns None when nothing changed.
+    """
+    if not changed and not removed_mods:
+        return None
+    changes = sorted(f"{kind}:{wid}:{current_mods_dict[wid].get('time_updated', 0)}" for wid, kind in changed.items())
+    changes += sorted(f"removed:{wid}" for wid in removed_mods)
+    digest = hashlib.sha256("\n".join(changes).encode("utf-8")).hexdigest()
+    return f"{server_name}:{digest}"
 
 def build_summary_with_mods(config, templates, mod_messages, server_info, mods, next_reboot, output_to_discord=False, server_name=None):
     summary_lines = []
@@ -410,34 +460,22 @@ def build_summary_with_mods(config, templates, mod_messages, server_info, mods,
 
 def log_performance(duration):
     """Append performance log entry for this run."""
-    PERF_LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
     perf_entry = {
         "timestamp": datetime.now().isoformat(),
         "duration_seconds": round(duration, 2)
     }
-    if PERF_LOG_FILE.exists():
-        try:
-            with PERF_LOG_FILE.open("r") as f:
-                records = json.load(f)
-        except Exception:
-            records = []
-    else:
-        records = []
-    records.append(perf_entry)
-    with PERF_LOG_FILE.open("w") as f:
-        json.dump(records, f, indent=2)
+    try:
+        perf_store.append(PERF_LOG_STREAM, perf_entry)
+    except Exception as e:
+        logging.warning(f"Could not write performance log: {e}")
 
 def summarize_performance(last_N=20):
     """Summarize recent performance logs and log average run time."""
-    if not PERF_LOG_FILE.exists():
-        return
     try:
-        with PERF_LOG_FILE.open("r") as f:
-            records = json.load(f)
+        recent = perf_store.tail(PERF_LOG_STREAM, last_N)
     except Exception:
         logging.warning("Could not read performance log.")
         return
-    recent = records[-last_N:] if len(records) > last_N else records
     if not recent:
         return
     avg = sum(rec["duration_seconds"] for rec in recent) / len(recent)
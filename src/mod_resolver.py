@@ -0,0 +1,139 @@
+# DayZ Server Monitor
+# Project: DayZ Server Monitor
+# File: mod_resolver.py
+# Purpose: Mod check mode dispatch and the per-cycle resolution stage: the union of workshop IDs
+#          reported by every server in a cycle is looked up once and shared by each server's diff and report.
+#          Updated: resolves `mod_check_mode: auto` from the recorded fetch times (see mode_selector.py).
+#          Updated: close() releases the shared async engine (event loop and pooled sessions).
+#          Updated: iter_mod_details() streams results from the modes as their batches complete.
+#          Updated: mode modules are imported on first use (async mode pulls in aiohttp).
+#          Updated: cycle performance records count the mods fetched from Steam (fetched_count), not cache hits.
+# Author: Tig Campbell-Moore (firstname[at]lastname[dot]com)
+# License: CC BY-NC 4.0 (see LICENSE file)
+
+import importlib
+import logging
+import sys
+import time
+from datetime import datetime
+from src import steam_api
+from src import perf_store
+from src import mode_selector
+
+# Imported by _get_runner on first use, so a run only loads the modes (and their dependencies) it needs
+MODES = {
+    "serial": "src.modes.serial_mode",
+    "threaded": "src.modes.threaded_mode",
+    "async": "src.modes.async_mode",
+}
+
+# Performance stream of the cycle-wide resolution stage
+CYCLE_PERF_STREAM = "cycle_resolver"
+
+def get_mod_check_mode(config):
+    return config.get("mods", {}).get("mod_check_mode", "serial").lower()
+
+def choose_mode(config, mod_count, load_history, label=""):
+    """
+    Return (mode, config) for the next lookup. For `auto`, the mode and concurrency level are picked
+    from the records returned by load_history() and applied to a copy of config.
+    """
+    mode = get_mod_check_mode(config)
+    if mode != "auto":
+        return mode, config
+    try:
+        records = load_history()
+    except Exception as e:
+        logging.warning(f"[Auto] Could not load performance history: {e}")
+        records = []
+    arm, run_config = mode_selector.choose(config, records, mod_count, label)
+    return arm.mode, run_config
+
+def _get_runner(mode):
+    module_name = MODES.get(mode)
+    if module_name is None:
+        logging.warning(f"[mod_checker] Unknown mod_check_mode '{mode}', defaulting to serial")
+        module_name = MODES["serial"]
+    return importlib.import_module(module_name)
+
+def fetch_mod_details(config, info, mods, mode=None):
+    """
+    Look up Steam details for the given mods with the configured (or given) mod check mode.
+    """
+    return _get_runner(mode or get_mod_check_mode(config)).run(config, info, mods)
+
+def iter_mod_details(config, info, mods, mode=None):
+    """
+    Like fetch_mod_details, but yields each record as soon as its batch completes (in completion order),
+    so callers can start diffing and rendering while the other lookups are still in flight.
+    """
+    return _get_runner(mode or get_mod_check_mode(config)).iter_results(config, info, mods)
+
+def close():
+    """
+    Release resources the modes keep between runs (the async engine's loop and sessions).
+    """
+    async_mode = sys.modules.get(MODES["async"])
+    if async_mode is not None:
+        async_mode.close()
+
+def collect_cycle_mods(query_results):
+    """
+    Return one mod entry per unique workshop ID across all successful server query results.
+    """
+    seen = set()
+    mods = []
+    for result in query_results:
+        if not isinstance(result, tuple):
+            continue
+        _, server_mods = result
+        for mod in server_mods:
+            workshop_id = mod.get("workshop_id")
+            if workshop_id and str(workshop_id) not in seen:
+                seen.add(str(workshop_id))
+                mods.append(mod)
+    return mods
+
+def resolve_cycle(config, query_results):
+    """
+    Resolve every workshop ID seen in this cycle exactly once.
+    Returns a dict of workshop ID -> metadata record, or None if there was nothing to resolve.
+    """
+    servers = [result for result in query_results if isinstance(result, tuple)]
+    mods = collect_cycle_mods(servers)
+    if not mods:
+        return None
+
+    total_refs = sum(len(server_mods) for _, server_mods in servers)
+    mode, run_config = choose_mode(
+        config, len(mods), lambda: perf_store.tail(CYCLE_PERF_STREAM, mode_selector.HISTORY_SIZE), "cycle"
+    )
+    start_time = time.perf_counter()
+    records = fetch_mod_details(run_config, None, mods, mode)
+    fetch_seconds = time.perf_counter() - start_time
+    resolved = {str(record["workshop_id"]): record for record in records if record and record.get("workshop_id")}
+    cache_hits = sum(1 for record in resolved.values() if record.get("cached"))
+    logging.info(
+        f"[Resolver] Resolved {len(resolved)}/{len(mods)} unique workshop IDs for {len(servers)} servers "
+        f"({total_refs} mod references) in {fetch_seconds:.2f}s using mode '{mode}'"
+    )
+    try:
+        perf_store.append(CYCLE_PERF_STREAM, {
+            "fetch_seconds": fetch_seconds,
+            "check_mode": mode,
+            "concurrency": mode_selector.get_concurrency(run_config, mode),
+            "mod_count": len(mods),
+            "fetched_count": len(mods) - cache_hits,
+            "servers": len(servers),
+            "timestamp": datetime.now().isoformat(),
+        })
+    except Exception as e:
+        logging.warning(f"[Resolver] Could not record cycle performance: {e}")
+    return resolved
+
+def results_for_server(resolved, mods):
+    """
+    Pick the shared records for one server's mods, in the server's mod order.
+    """
+    workshop_ids = steam_api.collect_workshop_ids(mods, "SHARED")
+    return [resolved[wid] for wid in workshop_ids if wid in resolved]
@@ -0,0 +1,139 @@
+# DayZ Server Monitor
+# Project: DayZ Server Monitor
+# File: mode_selector.py
+# Purpose: `mod_check_mode: auto`. Picks the mod check mode and concurrency level for a run from the
+#          recorded performance history (fetch time of recent runs with a similar mod count), trying each
+#          candidate once and then re-probing a random alternative now and then (epsilon-greedy).
+#          Updated: runs are compared by the mods they fetched from Steam, not counting cache hits; a run that
+#                   served most of its mods from the cache is not a sample.
+# Author: Tig Campbell-Moore (firstname[at]lastname[dot]com)
+# License: CC BY-NC 4.0 (see LICENSE file)
+
+import logging
+import random
+from collections import namedtuple
+from statistics import median
+
+Arm = namedtuple("Arm", ["mode", "concurrency"])
+
+DEFAULT_PROBE_RATE = 0.1
+DEFAULT_CONCURRENCY_LEVELS = [4, 10, 20]
+DEFAULT_ASYNC_CONCURRENCY = 10
+DEFAULT_THREADED_WORKERS = 10
+# History records read per decision, and the newest records per candidate used for its estimate
+HISTORY_SIZE = 100
+SAMPLES_PER_ARM = 5
+# Runs within this factor of the current mod count count as "similar"
+SIMILAR_MOD_COUNT_FACTOR = 2.0
+
+def get_concurrency(config, mode):
+    """
+    Return the concurrency level the given mode runs with under this config.
+    """
+    if mode == "threaded":
+        return int(config.get("threaded_mode", {}).get("max_workers", DEFAULT_THREADED_WORKERS))
+    if mode == "async":
+        return int(config.get("mods", {}).get("async_concurrency", DEFAULT_ASYNC_CONCURRENCY))
+    return 1
+
+def get_arms(config):
+    """
+    Candidate (mode, concurrency) pairs: serial, plus threaded and async at each configured level.
+    """
+    mods_cfg = config.get("mods", {})
+    levels = sorted({int(n) for n in mods_cfg.get("auto_concurrency_levels") or DEFAULT_CONCURRENCY_LEVELS if int(n) > 0})
+    arms = [Arm("serial", 1)]
+    arms += [Arm("threaded", n) for n in levels]
+    arms += [Arm("async", n) for n in levels]
+    return arms
+
+def apply(config, arm):
+    """
+    Return a copy of config that runs the given arm.
+    """
+    mods_cfg = dict(config.get("mods", {}), mod_check_mode=arm.mode)
+    threaded_cfg = dict(config.get("threaded_mode", {}))
+    if arm.mode == "async":
+        mods_cfg["async_concurrency"] = arm.concurrency
+    elif arm.mode == "threaded":
+        threaded_cfg["max_workers"] = arm.concurrency
+    return dict(config, mods=mods_cfg, threaded_mode=threaded_cfg)
+
+def _samples(records, arm):
+    """
+    (fetched mod count, fetch_seconds) of the newest history records that ran this arm.
+    Records from before fetched_count was recorded use their mod_count. A run that served most of its
+    mods from the cache timed few or no requests, so it would make the arm look fast and is skipped.
+    """
+    samples = []
+    for record in reversed(records):
+        if record.get("check_mode") != arm.mode or record.get("concurrency") != arm.concurrency:
+            continue
+        fetch_seconds = record.get("fetch_seconds")
+        if not isinstance(fetch_seconds, (int, float)):
+            continue
+        mod_count = int(record.get("mod_count") or 0)
+        fetched = int(record.get("fetched_count", mod_count) or 0)
+        if fetched == 0 or fetched * SIMILAR_MOD_COUNT_FACTOR < mod_count:
+            continue
+        samples.append((fetched, float(fetch_seconds)))
+        if len(samples) >= SAMPLES_PER_ARM:
+            break
+    return samples
+
+def _rounds(mod_count, arm, batch_size):
+    """
+    Sequential request rounds an arm needs: batches spread over its concurrency level.
+    """
+    batches = max(1, -(-mod_count // batch_size))
+    return -(-batches // max(1, arm.concurrency))
+
+def estimate(records, arm, mod_count, batch_size=100):
+    """
+    Expected fetch time of an arm for mod_count mods, or None if it has never been run.
+    Uses runs that fetched a similar number of mods when there are any, otherwise scales the runs
+    by request rounds for the mods each one fetched.
+    """
+    samples = _samples(records, arm)
+    if not samples:
+        return None
+    mod_count = max(1, mod_count)
+    similar = [
+        seconds for count, seconds in samples
+        if 1 / SIMILAR_MOD_COUNT_FACTOR <= count / mod_count <= SIMILAR_MOD_COUNT_FACTOR
+    ]
+    if similar:
+        return median(similar)
+    rounds = _rounds(mod_count, arm, batch_size)
+    return median(seconds * rounds / _rounds(count, arm, batch_size) for count, seconds in samples)
+
+def select(config, records, mod_count, rng=random):
+    """
+    Pick the arm for the next run: any arm without history first, otherwise the fastest estimate,
+    except that with probability mods.auto_probe_rate a random other arm is re-probed.
+    Returns (arm, reason, estimates).
+    """
+    arms = get_arms(config)
+    batch_size = max(1, int(config.get("mods", {}).get("steam_batch_size", 100)))
+    estimates = {arm: estimate(records, arm, mod_count, batch_size) for arm in arms}
+    untried = [arm for arm in arms if estimates[arm] is None]
+    if untried:
+        return untried[0], "explore", estimates
+    best = min(arms, key=lambda arm: estimates[arm])
+    probe_rate = float(config.get("mods", {}).get("auto_probe_rate", DEFAULT_PROBE_RATE))
+    others = [arm for arm in arms if arm != best]
+    if others and rng.random() < probe_rate:
+        return rng.choice(others), "probe", estimates
+    return best, "best", estimates
+
+def choose(config, records, mod_count, label="", rng=random):
+    """
+    Resolve `auto` for one run: returns (arm, config for that arm).
+    """
+    arm, reason, estimates = select(config, records, mod_count, rng)
+    expected = estimates.get(arm)
+    expected_text = f", expected {expected:.2f}s" if expected is not None else ""
+    logging.info(
+        f"[Auto] {label + ': ' if label else ''}{mod_count} mods -> {arm.mode} x{arm.concurrency} ({reason}{expected_text})"
+    )
+    return arm, apply(config, arm)
@@ -1,55 +1,234 @@
 # DayZ Server Monitor
 # Project: DayZ Server Monitor
 # File: modes/async_mode.py
-# Purpose: Mod metadata lookup using asyncio + aiohttp
+# Purpose: Mod metadata lookup using asyncio + aiohttp (one batch per request)
+#          Updated: connection limit from mods.async_concurrency
+#          Updated: requests go through the shared rate limiter and retry 429s with backoff
+#          Updated: one background event loop and pooled session per connector settings, reused by every
+#                   server and cycle; configurable per-host limit, timeouts, DNS cache and a per-lookup deadline
+#          Updated: the deadline option is async_lookup_deadline_seconds (async_deadline_seconds still honoured):
+#                   it bounds one lookup, i.e. one server's mods, or a whole cycle's when lookups are shared
+#          Updated: iter_results() yields each batch's results as it completes on the engine loop
 # Author: Tig Campbell-Moore (firstname[at]lastname[dot]com)
 # License: CC BY-NC 4.0 (see LICENSE file)
 
+import atexit
 import logging
 import asyncio
+import queue
+import threading
+import time
+from collections import namedtuple
 import aiohttp
 from aiohttp import ClientTimeout
+from src import steam_api
+from src import steam_cache
+from src import rate_limiter
 
-STEAM_API_URL = "https://api.steampowered.com/ISteamRemoteStorage/GetPublishedFileDetails/v1/"
+EngineSettings = namedtuple("EngineSettings", ["limit", "limit_per_host", "connect_timeout", "read_timeout", "dns_cache_ttl"])
 
-async def fetch_mod(session, mod):
-    workshop_id = mod.get('workshop_id')
-    if not workshop_id:
-        return None
+DEFAULT_ENGINE_SETTINGS = {
+    "async_concurrency": 10,         # Concurrent Steam requests (connector limit)
+    "async_limit_per_host": 0,       # Concurrent requests per host (0 = only the overall limit)
+    "async_connect_timeout": 5.0,    # Seconds to establish a connection
+    "async_read_timeout": 10.0,      # Seconds to wait for each read of a response
+    "async_dns_cache_ttl": 300,      # Seconds resolved hosts are cached (0 disables the DNS cache)
+    "async_lookup_deadline_seconds": 60.0,  # Per-lookup deadline; outstanding batches are then cancelled (0 = none)
+}
+# Former name of async_lookup_deadline_seconds
+LEGACY_DEADLINE_KEY = "async_deadline_seconds"
 
+def get_engine_settings(config):
+    """
+    Return (EngineSettings, deadline seconds or None) from the mods: block.
+    """
+    mods_cfg = config.get("mods", {})
+    values = {key: mods_cfg.get(key, default) for key, default in DEFAULT_ENGINE_SETTINGS.items()}
+    # The defaults always carry the new key, so an explicitly configured old one takes precedence
+    if mods_cfg.get(LEGACY_DEADLINE_KEY) is not None:
+        values["async_lookup_deadline_seconds"] = mods_cfg[LEGACY_DEADLINE_KEY]
+    settings = EngineSettings(
+        limit=max(1, int(values["async_concurrency"])),
+        limit_per_host=max(0, int(values["async_limit_per_host"])),
+        connect_timeout=float(values["async_connect_timeout"]),
+        read_timeout=float(values["async_read_timeout"]),
+        dns_cache_ttl=max(0, int(values["async_dns_cache_ttl"])),
+    )
+    deadline = float(values["async_lookup_deadline_seconds"] or 0)
+    return settings, (deadline if deadline > 0 else None)
+
+class AsyncEngine:
+    """
+    A background event loop thread holding one aiohttp session per connector settings.
+    Servers checked from any worker thread submit their lookups to it, so connections, DNS lookups
+    and the loop itself are reused across servers and cycles.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._sessions = {}
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="async-steam", daemon=True)
+                self._thread.start()
+            return self._loop
+
+    def session(self, settings):
+        """
+        Return the session for these settings (call on the engine loop).
+        """
+        session = self._sessions.get(settings)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=settings.limit,
+                limit_per_host=settings.limit_per_host,
+                use_dns_cache=settings.dns_cache_ttl > 0,
+                ttl_dns_cache=settings.dns_cache_ttl or None,
+            )
+            timeout = ClientTimeout(total=None, sock_connect=settings.connect_timeout, sock_read=settings.read_timeout)
+            session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+            self._sessions[settings] = session
+        return session
+
+    def submit(self, coro):
+        """
+        Schedule a coroutine on the engine loop; returns a concurrent.futures.Future.
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    def run(self, coro):
+        """
+        Run a coroutine on the engine loop and wait for its result from the calling thread.
+        """
+        return self.submit(coro).result()
+
+    async def _close_sessions(self):
+        sessions, self._sessions = list(self._sessions.values()), {}
+        for session in sessions:
+            await session.close()
+
+    def close(self):
+        """
+        Close every session and stop the loop; the next run starts a fresh one.
+        """
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._close_sessions(), loop).result(timeout=10)
+        except Exception as e:
+            logging.warning(f"[ASYNC] Error closing sessions: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+        loop.close()
+
+_engine = AsyncEngine()
+atexit.register(_engine.close)
+
+def get_engine():
+    return _engine
+
+def close():
+    _engine.close()
+
+async def fetch_batch(session, batch, api_url=None):
     try:
-        data = {'itemcount': 1, 'publishedfileids[0]': workshop_id}
-        async with session.post(STEAM_API_URL, data=data) as resp:
-            result = await resp.json()
-            response = result.get('response', {})
-            details_list = response.get('publishedfiledetails', [])
-            if not details_list or not isinstance(details_list, list):
-                logging.warning(f"[ASYNC] No details found for {workshop_id}")
-                return None
-            details = details_list[0]
-            return {
-                "workshop_id": workshop_id,
-                "title": details.get('title', 'Unknown'),
-                "time_updated": details.get('time_updated', 0)
-            }
+        data = steam_api.build_batch_payload(batch)
+        limiter = rate_limiter.get_limiter()
+        attempt = 0
+        while True:
+            await limiter.acquire_async()
+            async with session.post(api_url or steam_api.STEAM_API_URL, data=data) as resp:
+                if resp.status == 429:
+                    rate_limiter.throttled(attempt, resp.headers.get("Retry-After"), f"batch of {len(batch)} mods")
+                    attempt += 1
+                    continue
+                resp.raise_for_status()
+                result = await resp.json()
+            details = steam_api.parse_batch_response(result)
+            if not details:
+                logging.warning(f"[ASYNC] No details found for batch of {len(batch)} mods")
+            return details
     except Exception as e:
-        logging.exception(f"[ASYNC] Failed for {workshop_id}: {e}")
-        return None
-
-async def process(mods):
-    timeout = ClientTimeout(total=10)
-    connector = aiohttp.TCPConnector(limit=10)
-    async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
-        tasks = [fetch_mod(session, mod) for mod in mods]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        filtered_results = []
-        for r in results:
-            if isinstance(r, Exception):
-                logging.exception(f"[ASYNC] Task raised exception: {r}")
-            elif r:
-                filtered_results.append(r)
-        return filtered_results
+        logging.exception(f"[ASYNC] Failed for batch of {len(batch)} mods: {e}")
+        return {}
 
-def run(config, info, mods):
+async def process(batches, api_url=None, settings=None, deadline=None, on_batch=None):
+    """
+    Fetch all batches on the engine's session for these settings, calling on_batch(batch, details)
+    as each one completes. Batches still outstanding at the deadline are cancelled; returns their count.
+    """
+    session = _engine.session(settings or get_engine_settings({})[0])
+    tasks = {asyncio.ensure_future(fetch_batch(session, batch, api_url)): batch for batch in batches}
+    loop = asyncio.get_running_loop()
+    end = loop.time() + deadline if deadline else None
+    pending = set(tasks)
+    try:
+        while pending:
+            timeout = None if end is None else max(0.0, end - loop.time())
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                break
+            for task in done:
+                if task.exception() is not None:
+                    logging.error(f"[ASYNC] Task raised exception: {task.exception()}")
+                elif task.result() and on_batch is not None:
+                    on_batch(tasks[task], task.result())
+    finally:
+        # Also reached when the consumer goes away and this coroutine is cancelled
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+    return len(pending)
+
+def iter_results(config, info, mods):
+    """
+    Yield mod results as they become available: cached ones first, then each batch as it completes.
+    """
     logging.info("[ASYNC] Running with %d mods", len(mods))
-    return asyncio.run(process(mods))
+    workshop_ids = steam_api.collect_workshop_ids(mods, "ASYNC")
+    cache = steam_cache.get_cache(config)
+    details, missing = steam_api.lookup_cached(workshop_ids, cache)
+    for workshop_id, mod_info in details.items():
+        yield steam_api.mod_result(workshop_id, mod_info)
+    batches = steam_api.chunked(missing, steam_api.get_batch_size(config))
+    if not batches:
+        return
+
+    settings, deadline = get_engine_settings(config)
+    completed = queue.Queue()
+    start = time.perf_counter()
+    future = _engine.submit(process(
+        batches, steam_api.get_api_url(config), settings, deadline,
+        on_batch=lambda batch, fetched: completed.put((batch, fetched)),
+    ))
+    future.add_done_callback(lambda _: completed.put(None))
+    try:
+        while True:
+            item = completed.get()
+            if item is None:
+                break
+            batch, fetched = item
+            steam_api.store_cached(cache, fetched)
+            for workshop_id in batch:
+                if workshop_id in fetched:
+                    yield steam_api.mod_result(workshop_id, fetched[workshop_id])
+        cancelled = future.result()
+        if cancelled:
+            logging.warning(
+                f"[ASYNC] Deadline of {deadline:.0f}s reached after {time.perf_counter() - start:.1f}s: "
+                f"cancelled {cancelled}/{len(batches)} batches, results are partial"
+            )
+    finally:
+        if not future.done():
+            future.cancel()
+
+def run(config, info, mods):
+    return steam_api.in_order(mods, iter_results(config, info, mods))
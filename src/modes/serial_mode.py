@@ -1,33 +1,46 @@
 # DayZ Server Monitor
 # Project: DayZ Server Monitor
 # File: modes/serial_mode.py
-# Purpose: Mod metadata lookup in serial mode (single-threaded)
+# Purpose: Mod metadata lookup in serial mode (single-threaded, one batch at a time)
+#          Updated: iter_results() yields each batch's results as soon as it is fetched
 # Author: Tig Campbell-Moore (firstname[at]lastname[dot]com)
 # License: CC BY-NC 4.0 (see LICENSE file)
 
 import logging
 from src import steam_api
+from src import steam_cache
 
-def run(config, info, mods):
+def iter_results(config, info, mods):
+    """
+    Yield mod results as they become available: cached ones first, then one fetched batch at a time.
+    """
     logging.info("[SERIAL] Running SERIAL mode with %d mods", len(mods))
 
-    results = []
-    for i, mod in enumerate(mods, 1):
-        workshop_id = mod.get("workshop_id")
-        if not workshop_id:
-            logging.warning(f"[SERIAL] Skipping mod with missing ID at index {i}")
-            continue
+    workshop_ids = steam_api.collect_workshop_ids(mods, "SERIAL")
+    batch_size = steam_api.get_batch_size(config)
+    cache = steam_cache.get_cache(config)
+    api_url = steam_api.get_api_url(config)
 
+    details, missing = steam_api.lookup_cached(workshop_ids, cache)
+    for workshop_id, mod_info in details.items():
+        yield steam_api.mod_result(workshop_id, mod_info)
+    resolved = len(details)
+    for batch in steam_api.chunked(missing, batch_size):
         try:
-            logging.debug(f"[SERIAL] Fetching mod info for {workshop_id}")
-            mod_info = steam_api.get_mod_info(workshop_id)
-            results.append({
-                "workshop_id": workshop_id,
-                "title": mod_info.get('title', 'Unknown'),
-                "time_updated": mod_info.get('time_updated', 0)
-            })
+            logging.debug(f"[SERIAL] Fetching mod info for {len(batch)} mods")
+            fetched = steam_api.fetch_batch(batch, api_url)
         except Exception as e:
-            logging.exception(f"[SERIAL] Failed for mod {workshop_id}: {e}")
+            logging.exception(f"[SERIAL] Failed for batch of {len(batch)} mods: {e}")
+            continue
+        steam_api.store_cached(cache, fetched)
+        for workshop_id in batch:
+            if workshop_id in fetched:
+                resolved += 1
+                yield steam_api.mod_result(workshop_id, fetched[workshop_id])
+            else:
+                logging.warning(f"[SERIAL] No details found for {workshop_id}")
 
-    logging.info("[SERIAL] Completed %d mods.", len(results))
-    return results
+    logging.info("[SERIAL] Completed %d mods.", resolved)
+
+def run(config, info, mods):
+    return steam_api.in_order(mods, iter_results(config, info, mods))
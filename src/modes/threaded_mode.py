@@ -1,41 +1,58 @@
 # DayZ Server Monitor
 # Project: DayZ Server Monitor
 # File: modes/threaded_mode.py
-# Purpose: Mod metadata lookup using multithreading for parallelism
+# Purpose: Mod metadata lookup using multithreading for parallelism (one batch per task)
+#          Updated: iter_results() yields each batch's results as it completes
 # Author: Tig Campbell-Moore (firstname[at]lastname[dot]com)
 # License: CC BY-NC 4.0 (see LICENSE file)
 
 import logging
 import concurrent.futures
 from src import steam_api
+from src import steam_cache
 
-def fetch(mod):
-    workshop_id = mod.get('workshop_id')
-    if not workshop_id:
-        logging.warning("[THREADED] Skipping mod with missing ID")
-        return None
+def fetch(batch, api_url=None):
     try:
-        mod_info = steam_api.get_mod_info(workshop_id)
-        return {
-            "workshop_id": workshop_id,
-            "title": mod_info.get("title", "Unknown"),
-            "time_updated": mod_info.get("time_updated", 0)
-        }
+        return steam_api.fetch_batch(batch, api_url)
     except Exception as e:
-        logging.exception(f"[THREADED] Error for mod {workshop_id}: {e}")
-        return None
+        logging.exception(f"[THREADED] Error for batch of {len(batch)} mods: {e}")
+        return {}
 
-def run(config, info, mods):
+def iter_results(config, info, mods):
+    """
+    Yield mod results as they become available: cached ones first, then each batch as it completes.
+    """
     logging.info("[THREADED] Running with %d mods", len(mods))
-    results = []
     max_workers = config.get("threaded_mode", {}).get("max_workers", 10)
 
-    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = [executor.submit(fetch, mod) for mod in mods]
+    workshop_ids = steam_api.collect_workshop_ids(mods, "THREADED")
+    cache = steam_cache.get_cache(config)
+    details, missing = steam_api.lookup_cached(workshop_ids, cache)
+    batches = steam_api.chunked(missing, steam_api.get_batch_size(config))
+    api_url = steam_api.get_api_url(config)
+
+    for workshop_id, mod_info in details.items():
+        yield steam_api.mod_result(workshop_id, mod_info)
+    resolved = len(details)
+    if not batches:
+        logging.info("[THREADED] Completed %d mods", resolved)
+        return
+
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+    futures = {executor.submit(fetch, batch, api_url): batch for batch in batches}
+    try:
         for future in concurrent.futures.as_completed(futures):
-            result = future.result()
-            if result:
-                results.append(result)
+            fetched = future.result()
+            steam_api.store_cached(cache, fetched)
+            for workshop_id in futures[future]:
+                if workshop_id in fetched:
+                    resolved += 1
+                    yield steam_api.mod_result(workshop_id, fetched[workshop_id])
+    finally:
+        # A consumer that stops early does not wait for the remaining batches
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    logging.info("[THREADED] Completed %d mods", resolved)
 
-    logging.info("[THREADED] Completed %d mods", len(results))
-    return results
+def run(config, info, mods):
+    return steam_api.in_order(mods, iter_results(config, info, mods))
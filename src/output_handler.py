@@ -2,27 +2,79 @@
 # Project: DayZ Server Monitor
 # File: output_handler.py
 # Purpose: Handle and store all output messages for file, console, and Discord
+#          Updated: A server's finished output (console summary, Discord post) goes through publish(), so servers
+#                   checked concurrently can release it in config order (see monitor.run_servers).
 # Author: Tig Campbell-Moore (firstname[at]lastname[dot]com)
 # License: CC BY-NC 4.0 (see LICENSE file)
 
 import logging
+import threading
+from contextlib import contextmanager
 
-output_messages = []
+# Output buffers are per thread, so servers checked concurrently never mix their messages
+_local = threading.local()
+
+def get_output_messages():
+    """
+    Return the output buffer of the current thread (one buffer per server run).
+    """
+    messages = getattr(_local, "messages", None)
+    if messages is None:
+        messages = []
+        _local.messages = messages
+    return messages
+
+@contextmanager
+def output_buffer(deferred=None):
+    """
+    Give the current thread a fresh, isolated output buffer for the duration of the block.
+    With a deferred list, publish() collects actions into it instead of running them; release() runs them later.
+    """
+    previous = (getattr(_local, "messages", None), getattr(_local, "deferred", None))
+    _local.messages = []
+    _local.deferred = deferred
+    try:
+        yield _local.messages
+    finally:
+        _local.messages, _local.deferred = previous
+
+def publish(action, *args):
+    """
+    Emit finished output: call action(*args) now, or collect it if the current output buffer is deferred.
+    """
+    deferred = getattr(_local, "deferred", None)
+    if deferred is None:
+        action(*args)
+    else:
+        deferred.append((action, args))
+
+def release(deferred):
+    """
+    Run the actions a deferred output buffer collected, in order. A failing action does not stop the rest.
+    """
+    for action, args in deferred:
+        try:
+            action(*args)
+        except Exception:
+            logging.exception("Failed to publish server output")
+
+def add_message(message):
+    get_output_messages().append(message)
 
 def send_output(config, message):
-    # Store all messages in output_messages for use by summary/discord/etc.
-    output_messages.append(message)
+    # Store all messages in the output buffer for use by summary/discord/etc.
+    add_message(message)
 
     # Only output to console/file if enabled in config
     if config['output'].get("to_console", False):
-        logging.info(message)
+        publish(logging.info, message)
 
     # If output to file, use the main logging system—do not write files directly here
     # This preserves the new logging policy: all output is routed through logging
     # If a dedicated file output is needed, this must be handled by a FileHandler in logger.py
 
 def get_all_output():
-    return "\n".join(output_messages)
+    return "\n".join(get_output_messages())
 
 def build_summary(config, templates, server_info=None, next_reboot=None):
     """
@@ -33,7 +85,7 @@ def build_summary(config, templates, server_info=None, next_reboot=None):
     if templates is None:
         raise ValueError("templates argument to build_summary cannot be None. Pass a valid TemplateLoader instance.")
 
-    body = "\n".join(output_messages)
+    body = "\n".join(get_output_messages())
     summary = templates.format("discord", "summary.txt", body=body)
 
     extra_lines = []
@@ -0,0 +1,237 @@
+# DayZ Server Monitor
+# Project: DayZ Server Monitor
+# File: perf_store.py
+# Purpose: Append-only performance history. Each stream (one per server, plus the global run log) is a
+#          directory of daily JSON Lines segments; segments older than the retention window are compacted
+#          into one downsampled aggregate line per day and check mode. Reads only touch the tail they need.
+# Author: Tig Campbell-Moore (firstname[at]lastname[dot]com)
+# License: CC BY-NC 4.0 (see LICENSE file)
+
+import json
+import logging
+import os
+import threading
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+PERFORMANCE_DIR = Path("data/performance")
+AGGREGATES_FILE = "aggregates.jsonl"
+SEGMENT_SUFFIX = ".jsonl"
+DEFAULT_RETENTION_DAYS = 30
+TAIL_BLOCK_SIZE = 8192
+
+_lock = threading.Lock()
+_retention_days = DEFAULT_RETENTION_DAYS
+# Streams already migrated this process, and the day each stream was last compacted
+_prepared = set()
+_compacted = {}
+
+def configure(config):
+    """
+    Apply the `performance:` config block (retention_days).
+    """
+    perf_cfg = config.get("performance") or {}
+    global _retention_days
+    _retention_days = max(1, int(perf_cfg.get("retention_days", DEFAULT_RETENTION_DAYS)))
+
+def stream_dir(stream):
+    return PERFORMANCE_DIR / stream
+
+def _segment_path(stream, day):
+    return stream_dir(stream) / f"{day.isoformat()}{SEGMENT_SUFFIX}"
+
+def _segments(stream):
+    """
+    Return (day, path) for every daily segment of a stream, oldest first.
+    """
+    directory = stream_dir(stream)
+    if not directory.is_dir():
+        return []
+    segments = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if not entry.name.endswith(SEGMENT_SUFFIX) or entry.name == AGGREGATES_FILE:
+                continue
+            try:
+                day = date.fromisoformat(entry.name[:-len(SEGMENT_SUFFIX)])
+            except ValueError:
+                continue
+            segments.append((day, Path(entry.path)))
+    segments.sort()
+    return segments
+
+def _append_lines(path, records):
+    """
+    Append records as JSON lines with a single O_APPEND write, so concurrent writers never interleave.
+    """
+    data = "".join(json.dumps(record, default=str) + "\n" for record in records).encode("utf-8")
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, data)
+    finally:
+        os.close(fd)
+
+def _record_day(record, default):
+    try:
+        return datetime.fromisoformat(str(record.get("timestamp"))).date()
+    except (TypeError, ValueError):
+        return default
+
+def _migrate_legacy(stream):
+    """
+    Move a legacy JSON array log (data/performance/<stream>.json) into daily segments, once.
+    """
+    legacy = PERFORMANCE_DIR / f"{stream}.json"
+    if not legacy.exists():
+        return
+    try:
+        with legacy.open("r") as f:
+            records = json.load(f)
+    except Exception as e:
+        logging.warning(f"[Perf] Could not read legacy performance log {legacy}: {e}")
+        records = []
+    today = date.today()
+    by_day = {}
+    for record in records if isinstance(records, list) else []:
+        if isinstance(record, dict):
+            by_day.setdefault(_record_day(record, today), []).append(record)
+    stream_dir(stream).mkdir(parents=True, exist_ok=True)
+    for day in sorted(by_day):
+        _append_lines(_segment_path(stream, day), by_day[day])
+    legacy.rename(legacy.with_name(legacy.name + ".migrated"))
+    logging.info(f"[Perf] Migrated {sum(len(r) for r in by_day.values())} records from {legacy} to {stream_dir(stream)}")
+
+def _aggregate(day, records):
+    """
+    Downsample one day of records: one line per check mode with run count and avg/min/max of numeric fields.
+    """
+    groups = {}
+    for record in records:
+        groups.setdefault(record.get("check_mode"), []).append(record)
+    aggregates = []
+    for check_mode, group in groups.items():
+        aggregate = {"date": day.isoformat(), "check_mode": check_mode, "runs": len(group)}
+        fields = {}
+        for record in group:
+            for key, value in record.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    fields.setdefault(key, []).append(value)
+        for key, values in fields.items():
+            aggregate[key] = {
+                "avg": sum(values) / len(values),
+                "min": min(values),
+                "max": max(values),
+            }
+        aggregates.append(aggregate)
+    return aggregates
+
+def _read_segment(path):
+    records = []
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            record = _parse_line(line, path)
+            if record is not None:
+                records.append(record)
+    return records
+
+def _parse_line(line, path):
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        return json.loads(line)
+    except ValueError:
+        # A torn write from a crash only loses that one record
+        logging.warning(f"[Perf] Skipping unreadable line in {path}")
+        return None
+
+def compact(stream, retention_days=None, today=None):
+    """
+    Replace segments older than the retention window with daily aggregates in aggregates.jsonl.
+    """
+    retention_days = retention_days or _retention_days
+    today = today or date.today()
+    cutoff = today - timedelta(days=retention_days)
+    compacted = 0
+    for day, path in _segments(stream):
+        if day >= cutoff:
+            break
+        try:
+            aggregates = _aggregate(day, _read_segment(path))
+            if aggregates:
+                _append_lines(stream_dir(stream) / AGGREGATES_FILE, aggregates)
+            path.unlink()
+            compacted += 1
+        except OSError as e:
+            logging.warning(f"[Perf] Could not compact {path}: {e}")
+    if compacted:
+        logging.info(f"[Perf] Compacted {compacted} daily segments of '{stream}' older than {retention_days} days")
+    return compacted
+
+def _prepare(stream):
+    """
+    Migrate the legacy log once per process and compact at most once per day per stream.
+    """
+    today = date.today()
+    with _lock:
+        if stream not in _prepared:
+            _migrate_legacy(stream)
+            _prepared.add(stream)
+        if _compacted.get(stream) != today:
+            compact(stream, today=today)
+            _compacted[stream] = today
+
+def append(stream, record):
+    """
+    Append one record to today's segment of a stream.
+    """
+    _prepare(stream)
+    stream_dir(stream).mkdir(parents=True, exist_ok=True)
+    _append_lines(_segment_path(stream, date.today()), [record])
+
+def _tail_lines(path, count):
+    """
+    Return up to the last `count` complete lines of a file, reading backwards in blocks.
+    """
+    with path.open("rb") as f:
+        end = f.seek(0, os.SEEK_END)
+        data = b""
+        while end > 0 and data.count(b"\n") <= count:
+            size = min(TAIL_BLOCK_SIZE, end)
+            end -= size
+            f.seek(end)
+            data = f.read(size) + data
+    lines = data.splitlines()
+    if end > 0:
+        # The first line read may start mid-record
+        lines = lines[1:]
+    return lines[-count:]
+
+def tail(stream, count=20):
+    """
+    Return the last `count` records of a stream, oldest first, reading only the newest segments.
+    """
+    _prepare(stream)
+    if count <= 0:
+        return []
+    records = []
+    for _, path in reversed(_segments(stream)):
+        try:
+            lines = _tail_lines(path, count - len(records))
+        except OSError as e:
+            logging.warning(f"[Perf] Could not read {path}: {e}")
+            continue
+        parsed = [record for record in (_parse_line(line.decode("utf-8", "replace"), path) for line in lines) if record is not None]
+        records = parsed + records
+        if len(records) >= count:
+            break
+    return records[-count:]
+
+def load_aggregates(stream):
+    """
+    Return the daily aggregates of compacted history, oldest first.
+    """
+    path = stream_dir(stream) / AGGREGATES_FILE
+    if not path.exists():
+        return []
+    return _read_segment(path)
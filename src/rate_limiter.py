@@ -0,0 +1,182 @@
+# DayZ Server Monitor
+# Project: DayZ Server Monitor
+# File: rate_limiter.py
+# Purpose: Process-wide token bucket shared by every Steam Web API caller (serial, threaded and async modes
+#          and single-mod lookups; Workshop changelog pages are on another host and are not limited here).
+#          Callers reserve a slot and wait their turn, so concurrent threads and coroutines together stay at
+#          the configured rate. A 429 pauses the whole bucket for Retry-After (or an exponential backoff)
+#          before anyone sends again.
+# Author: Tig Campbell-Moore (firstname[at]lastname[dot]com)
+# License: CC BY-NC 4.0 (see LICENSE file)
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+DEFAULT_RATE_SETTINGS = {
+    "rate_limit_per_second": 10.0,  # Sustained Steam requests per second for the whole process (0 disables)
+    "rate_limit_burst": 10,         # Requests that may go out back to back after an idle period
+    "max_retries": 5,               # Retries of a throttled (429) request before the batch is given up
+    "backoff_base_seconds": 1.0,    # First backoff when Steam sends no Retry-After, doubled per retry
+    "backoff_max_seconds": 60.0,    # Upper bound for any single backoff, including Retry-After
+}
+
+class RateLimitExceeded(Exception):
+    """A request was still throttled after the configured number of retries."""
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. acquire() reserves the next free slot and sleeps until it; the bucket may go
+    into debt, so waiting callers are served in reservation order at exactly `rate` per second.
+    """
+    def __init__(self, rate, burst, clock=time.monotonic):
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._tokens = float(self.burst)
+        self._updated = clock()
+        self._paused_until = 0.0
+        self.waits = 0
+        self.pauses = 0
+
+    def reserve(self):
+        """
+        Take one token and return how many seconds the caller must wait before sending.
+        """
+        if self.rate <= 0:
+            with self._lock:
+                return max(0.0, self._paused_until - self._clock())
+        with self._lock:
+            now = self._clock()
+            # Nothing accrues while paused; the bucket restarts empty when the pause ends
+            start = max(now, self._paused_until)
+            if start > self._updated:
+                self._tokens = min(self.burst, self._tokens + (start - self._updated) * self.rate)
+                self._updated = start
+            self._tokens -= 1
+            wait = self._updated - now
+            if self._tokens < 0:
+                wait += -self._tokens / self.rate
+            if wait > 0:
+                self.waits += 1
+            return max(0.0, wait)
+
+    def acquire(self):
+        """
+        Wait for a slot. A caller whose wait was interrupted by a pause takes a fresh slot after it.
+        """
+        waited = 0.0
+        while True:
+            pauses = self.pauses
+            wait = self.reserve()
+            if wait > 0:
+                time.sleep(wait)
+                waited += wait
+            if self.pauses == pauses:
+                return waited
+
+    async def acquire_async(self):
+        waited = 0.0
+        while True:
+            pauses = self.pauses
+            wait = self.reserve()
+            if wait > 0:
+                await asyncio.sleep(wait)
+                waited += wait
+            if self.pauses == pauses:
+                return waited
+
+    def pause(self, seconds):
+        """
+        Hold every caller for `seconds` (e.g. Retry-After). Waiting callers re-queue behind the pause,
+        so their earlier slots are forgiven; one request may go out as soon as it ends.
+        """
+        with self._lock:
+            now = self._clock()
+            until = now + max(0.0, seconds)
+            if until > self._paused_until:
+                self._paused_until = until
+                self._tokens = 1.0
+                self._updated = max(self._updated, until)
+                self.pauses += 1
+
+_lock = threading.Lock()
+_settings = dict(DEFAULT_RATE_SETTINGS)
+_limiter = None
+
+def configure(config):
+    """
+    Apply the rate limit settings from the `steam:` config block.
+    """
+    steam_cfg = config.get("steam") or {}
+    settings = dict(DEFAULT_RATE_SETTINGS)
+    settings.update({k: v for k, v in steam_cfg.items() if k in DEFAULT_RATE_SETTINGS and v is not None})
+    global _settings, _limiter
+    with _lock:
+        if settings == _settings and _limiter is not None:
+            return
+        _settings = settings
+        _limiter = TokenBucket(settings["rate_limit_per_second"], settings["rate_limit_burst"])
+    logging.debug(f"[RateLimit] Steam settings: {settings}")
+
+def get_limiter():
+    """
+    Return the process-wide Steam token bucket, creating it on first use.
+    """
+    global _limiter
+    limiter = _limiter
+    if limiter is None:
+        with _lock:
+            if _limiter is None:
+                _limiter = TokenBucket(_settings["rate_limit_per_second"], _settings["rate_limit_burst"])
+            limiter = _limiter
+    return limiter
+
+def max_retries():
+    return int(_settings["max_retries"])
+
+def parse_retry_after(value):
+    """
+    Return the Retry-After header (delta seconds or HTTP date) in seconds, or None if absent/invalid.
+    """
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+def backoff_seconds(attempt, retry_after=None):
+    """
+    Delay before retry number `attempt` (0-based): Retry-After when given, otherwise exponential with
+    jitter, both capped at backoff_max_seconds.
+    """
+    cap = float(_settings["backoff_max_seconds"])
+    if retry_after is not None:
+        return min(cap, retry_after)
+    delay = min(cap, float(_settings["backoff_base_seconds"]) * (2 ** attempt))
+    return delay * random.uniform(0.5, 1.0)
+
+def throttled(attempt, retry_after_header, what):
+    """
+    Handle a 429 for retry number `attempt`: pause the shared bucket for the backoff delay.
+    Raises RateLimitExceeded once the retries are used up.
+    """
+    if attempt >= max_retries():
+        raise RateLimitExceeded(f"{what} still throttled after {attempt} retries")
+    delay = backoff_seconds(attempt, parse_retry_after(retry_after_header))
+    logging.warning(f"[RateLimit] Steam throttled {what}; pausing requests for {delay:.1f}s (retry {attempt + 1}/{max_retries()})")
+    get_limiter().pause(delay)
@@ -0,0 +1,83 @@
+# DayZ Server Monitor
+# Project: DayZ Server Monitor
+# File: scheduler.py
+# Purpose: In-process scheduler for daemon mode. Runs jobs at per-key intervals until stopped,
+#          so warm state (configs, caches, HTTP pools) survives between monitoring cycles.
+# Author: Tig Campbell-Moore (firstname[at]lastname[dot]com)
+# License: CC BY-NC 4.0 (see LICENSE file)
+
+import logging
+import threading
+import time
+
+class Scheduler:
+    """
+    Keeps a next-run time per key and calls run_due(keys) with every key that is due.
+    stop() and wake() may be called from signal handlers or other threads.
+    """
+    def __init__(self):
+        self._jobs = {}
+        self._event = threading.Event()
+        self._stopping = False
+
+    def schedule(self, key, interval_seconds, delay_seconds=0):
+        """
+        Add or replace a job; it first runs after delay_seconds, then every interval_seconds.
+        """
+        interval = max(1, int(interval_seconds))
+        self._jobs[key] = {"interval": interval, "next_run": time.monotonic() + delay_seconds}
+
+    def clear(self):
+        self._jobs.clear()
+
+    def stop(self):
+        """
+        Request shutdown; the loop exits once the current cycle has finished.
+        """
+        self._stopping = True
+        self._event.set()
+
+    def wake(self):
+        """
+        Interrupt the current wait so the loop re-evaluates its jobs.
+        """
+        self._event.set()
+
+    @property
+    def stopping(self):
+        return self._stopping
+
+    def _advance(self, key, now):
+        job = self._jobs.get(key)
+        if job is None:
+            return
+        next_run = job["next_run"] + job["interval"]
+        if next_run <= now:
+            # The cycle overran one or more intervals: skip the missed runs instead of bursting
+            missed = int((now - next_run) // job["interval"]) + 1
+            next_run += missed * job["interval"]
+            logging.warning(f"[Scheduler] Job {key} overran its {job['interval']}s interval, skipped {missed} run(s)")
+        job["next_run"] = next_run
+
+    def run(self, run_due, on_wake=None):
+        """
+        Loop until stop() is called. on_wake is called (before due jobs) whenever wake() interrupted a wait.
+        """
+        while not self._stopping:
+            now = time.monotonic()
+            due = [key for key, job in self._jobs.items() if job["next_run"] <= now]
+            if due:
+                try:
+                    run_due(due)
+                except Exception:
+                    logging.exception("[Scheduler] Unhandled exception during scheduled run")
+                now = time.monotonic()
+                for key in due:
+                    self._advance(key, now)
+                continue
+
+            timeout = min((job["next_run"] for job in self._jobs.values()), default=now + 60) - now
+            if self._event.wait(max(timeout, 0)):
+                self._event.clear()
+                if not self._stopping and on_wake:
+                    on_wake()
@@ -1,45 +1,49 @@
 # DayZ Server Monitor
 # File: server_monitor_tracker.py
-# Purpose: Track mod state and performance per server using JSON in data/tracking and data/performance.
+# Purpose: Track mod state and performance per server in data/tracking and data/performance.
+#          Updated: Mod tracking is a versioned SQLite store of change events (tracking_store.py).
+#          Updated: Performance history is an append-only store (perf_store.py) instead of one rewritten JSON array.
 # Author: Tig Campbell-Moore, Copilot
 # License: CC BY-NC 4.0
 
-from pathlib import Path
-import json
 import logging
+from src import perf_store
+from src import tracking_store
 
-TRACKING_DIR = Path("data/tracking")
-PERFORMANCE_DIR = Path("data/performance")
+TRACKING_DIR = tracking_store.TRACKING_DIR
+PERFORMANCE_DIR = perf_store.PERFORMANCE_DIR
 
-def _tracking_file(server_name):
-    TRACKING_DIR.mkdir(parents=True, exist_ok=True)
-    return TRACKING_DIR / f"{server_name}_mods.json"
-
-def _performance_file(server_name):
-    PERFORMANCE_DIR.mkdir(parents=True, exist_ok=True)
-    return PERFORMANCE_DIR / f"{server_name}_perf.json"
+def _performance_stream(server_name):
+    return f"{server_name}_perf"
 
 def save_mod_tracking(server_name, mods_dict):
-    """Save the mod tracking info as a JSON dictionary keyed by workshop_id."""
-    path = _tracking_file(server_name)
+    """Save the mod tracking info (dict keyed by workshop_id); only changes since the last save are written."""
     try:
-        with path.open("w") as f:
-            json.dump(mods_dict, f, indent=2)
+        return tracking_store.get_store().record(server_name, mods_dict)
     except Exception as e:
         logging.error(f"Failed to save mod tracking for {server_name}: {e}")
+        return []
 
 def load_mod_tracking(server_name):
     """Load the mod tracking info, returning a dict keyed by workshop_id."""
-    path = _tracking_file(server_name)
-    if not path.exists():
-        return {}
     try:
-        with path.open("r") as f:
-            return json.load(f)
+        return tracking_store.get_store().load_state(server_name)
     except Exception as e:
         logging.error(f"Failed to load mod tracking for {server_name}: {e}")
         return {}
 
+def mod_changes_since(server_name, since):
+    """Return the names of mods (added, removed, updated) on a server since `since` (epoch seconds)."""
+    changes = {"added": set(), "removed": set(), "updated": set()}
+    try:
+        events = tracking_store.get_store().changes_since(server_name, since)
+    except Exception as e:
+        logging.error(f"Failed to read mod changes for {server_name}: {e}")
+        events = []
+    for event in events:
+        changes[event["event"]].add(event["name"] or event["workshop_id"])
+    return changes["added"], changes["removed"], changes["updated"]
+
 def detect_mod_changes(server_name, current_mod_names):
     """Detect added/removed mods by mod name (for summary purposes)."""
     prev = load_mod_tracking(server_name)
@@ -50,33 +54,16 @@ def detect_mod_changes(server_name, current_mod_names):
     return added, removed
 
 def update_performance(server_name, stats):
-    """Append a performance record for a server to its JSON log."""
-    path = _performance_file(server_name)
-    if path.exists():
-        try:
-            with path.open("r") as f:
-                records = json.load(f)
-        except Exception as e:
-            logging.warning(f"Corrupt or unreadable performance log for {server_name}: {e}")
-            records = []
-    else:
-        records = []
-    records.append(stats)
+    """Append a performance record for a server to its log."""
     try:
-        with path.open("w") as f:
-            json.dump(records, f, indent=2)
+        perf_store.append(_performance_stream(server_name), stats)
     except Exception as e:
         logging.error(f"Failed to update performance log for {server_name}: {e}")
 
 def load_performance_stats(server_name, last_N=20):
     """Load the last N performance stats for a server."""
-    path = _performance_file(server_name)
-    if not path.exists():
-        return []
     try:
-        with path.open("r") as f:
-            records = json.load(f)
+        return perf_store.tail(_performance_stream(server_name), last_N)
     except Exception as e:
         logging.warning(f"Could not read performance stats for {server_name}: {e}")
         return []
-    return records[-last_N:] if len(records) > last_N else records
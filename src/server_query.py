@@ -2,23 +2,43 @@
 # Project: DayZ Server Monitor
 # File: server_query.py
 # Purpose: Query DayZ server and extract mod and system metadata
+#          Updated: Asyncio A2S engine (a2s_async.py) for querying many servers from one event loop.
+#          Updated: query.host / query.port override the A2S query target (defaults: server.ip / server.port).
+#          Updated: dayzquery (and python-a2s) are imported on the first query.
 # Author: Tig Campbell-Moore (firstname[at]lastname[dot]com)
 # License: CC BY-NC 4.0 (see LICENSE file)
 
-import dayzquery # type: ignore
+import asyncio
 import logging
+from src import a2s_async
 
-def query_server(ip, port):
-    server_address = (ip, port)
-    try:
-        ruleset = dayzquery.dayz_rules(server_address)
-    except TimeoutError:
-        logging.error(f"Timed out querying DayZ server at {ip}:{port}")
-        raise
-    except Exception as e:
-        logging.exception(f"Failed to query DayZ server: {e}")
-        raise
+DEFAULT_TIMEOUT = a2s_async.DEFAULT_TIMEOUT
+DEFAULT_MAX_CONCURRENT_QUERIES = 100
+
+def get_query_settings(config):
+    """
+    Return (engine, timeout_seconds) from the `query:` config block.
+    """
+    query_cfg = config.get("query") or {}
+    engine = str(query_cfg.get("engine", "async")).lower()
+    timeout = float(query_cfg.get("timeout_seconds", DEFAULT_TIMEOUT))
+    return engine, timeout
 
+def get_query_target(config):
+    """
+    Return the (host, port) to send A2S queries to: query.host/query.port, falling back to server.ip/server.port.
+    Either may be None if not configured.
+    """
+    query_cfg = config.get("query") or {}
+    server_cfg = config.get("server") or {}
+    host = query_cfg.get("host") or server_cfg.get("ip")
+    port = query_cfg.get("port") or server_cfg.get("port")
+    return (str(host) if host is not None else None), (int(port) if port is not None else None)
+
+def build_result(ruleset):
+    """
+    Convert decoded DayZ rules into the (info, mods) structures used by mod_checker.
+    """
     info = {
         "island": getattr(ruleset, "island", "Unknown"),
         "platform": getattr(ruleset, "platform", "Unknown"),
@@ -28,6 +48,60 @@ def query_server(ip, port):
     }
 
     mods = [{'name': mod.name, 'workshop_id': str(mod.workshop_id)} for mod in getattr(ruleset, "mods", [])]
+    return info, mods
+
+def query_server(ip, port, timeout=DEFAULT_TIMEOUT):
+    import dayzquery # type: ignore
+    server_address = (ip, port)
+    try:
+        ruleset = dayzquery.dayz_rules(server_address, timeout)
+    except TimeoutError:
+        logging.error(f"Timed out querying DayZ server at {ip}:{port}")
+        raise
+    except Exception as e:
+        logging.exception(f"Failed to query DayZ server: {e}")
+        raise
 
+    info, mods = build_result(ruleset)
     logging.debug(f"Queried server: {info['platform']} on {info['island']} with {len(mods)} mods.")
     return info, mods
+
+async def query_server_async(ip, port, timeout=DEFAULT_TIMEOUT):
+    """
+    Asyncio equivalent of query_server, using the native A2S engine.
+    """
+    import dayzquery # type: ignore
+    try:
+        rules = await a2s_async.arules((ip, port), timeout)
+        ruleset = dayzquery.dayz_rules_decode(rules)
+    except TimeoutError:
+        logging.error(f"Timed out querying DayZ server at {ip}:{port}")
+        raise
+    except Exception as e:
+        logging.error(f"Failed to query DayZ server at {ip}:{port}: {e!r}")
+        raise
+
+    info, mods = build_result(ruleset)
+    logging.debug(f"Queried server: {info['platform']} on {info['island']} with {len(mods)} mods.")
+    return info, mods
+
+async def query_servers_async(targets, max_concurrent=DEFAULT_MAX_CONCURRENT_QUERIES):
+    """
+    Query many servers concurrently. targets is a list of (ip, port, timeout).
+    Returns a list aligned with targets holding (info, mods) or the raised exception.
+    """
+    semaphore = asyncio.Semaphore(max(1, max_concurrent))
+
+    async def query_one(ip, port, timeout):
+        async with semaphore:
+            return await query_server_async(ip, port, timeout)
+
+    return await asyncio.gather(*(query_one(*target) for target in targets), return_exceptions=True)
+
+def query_servers(targets, max_concurrent=DEFAULT_MAX_CONCURRENT_QUERIES):
+    """
+    Blocking wrapper around query_servers_async: one event loop for every server in the cycle.
+    """
+    if not targets:
+        return []
+    return asyncio.run(query_servers_async(targets, max_concurrent))
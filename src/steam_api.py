@@ -2,27 +2,210 @@
 # Project: DayZ Server Monitor
 # File: steam_api.py
 # Purpose: Fetch mod metadata from Steam Workshop
+#          Updated: Batched GetPublishedFileDetails lookups shared by all mod check modes.
+#          Updated: Lookups consult the persistent workshop cache (steam_cache.py) before the network.
+#          Updated: Results carry the full metadata record (description and raw Steam fields).
+#          Updated: Requests go through the pooled keep-alive session (http_session.py).
+#          Updated: The API URL can be overridden (steam.api_url / STEAM_API_URL), e.g. for a local stand-in.
+#          Updated: Requests go through the shared rate limiter and retry 429s with backoff (rate_limiter.py).
+#          Updated: in_order() helper for modes that stream results as batches complete.
+#          Updated: Failed or unresolved lookups (no details, time_updated 0) are not cached.
+#          Updated: Results served from the cache are flagged ('cached'), so fetch timings can leave them out.
+#          Updated: get_mod_info_batch() and get_mod_info() take the API URL too (pass get_api_url(config)).
 # Author: Tig Campbell-Moore (firstname[at]lastname[dot]com)
 # License: CC BY-NC 4.0 (see LICENSE file)
 
-import requests
 import logging
+from src import http_session
+from src import rate_limiter
 
 STEAM_API_URL = "https://api.steampowered.com/ISteamRemoteStorage/GetPublishedFileDetails/v1/"
 
-def get_mod_info(workshop_id, api_key=None):
-    data = {'itemcount': 1, 'publishedfileids[0]': workshop_id}
+# Number of publishedfileids sent per GetPublishedFileDetails request (mods.steam_batch_size)
+DEFAULT_BATCH_SIZE = 100
+
+def get_batch_size(config):
+    """
+    Return the configured Steam lookup batch size (mods.steam_batch_size), at least 1.
+    """
+    size = config.get("mods", {}).get("steam_batch_size", DEFAULT_BATCH_SIZE)
     try:
-        response = requests.post(STEAM_API_URL, data=data, timeout=10)
-        response.raise_for_status()
-    except Exception as e:
-        logging.exception(f"Failed to fetch Steam info for mod {workshop_id}: {e}")
-        raise
+        return max(1, int(size))
+    except (TypeError, ValueError):
+        logging.warning(f"Invalid mods.steam_batch_size '{size}', using {DEFAULT_BATCH_SIZE}")
+        return DEFAULT_BATCH_SIZE
+
+def get_api_url(config):
+    """
+    Return the GetPublishedFileDetails URL: steam.api_url (set from STEAM_API_URL if present) or the Steam default.
+    """
+    return (config.get("steam") or {}).get("api_url") or STEAM_API_URL
+
+def chunked(items, size):
+    """
+    Split a list into consecutive chunks of at most `size` items.
+    """
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+def collect_workshop_ids(mods, tag):
+    """
+    Return the unique workshop IDs of the given mods (as strings), preserving order.
+    Mods without a workshop ID are logged and skipped.
+    """
+    workshop_ids = []
+    seen = set()
+    for i, mod in enumerate(mods, 1):
+        workshop_id = mod.get("workshop_id")
+        if not workshop_id:
+            logging.warning(f"[{tag}] Skipping mod with missing ID at index {i}")
+            continue
+        workshop_id = str(workshop_id)
+        if workshop_id not in seen:
+            seen.add(workshop_id)
+            workshop_ids.append(workshop_id)
+    return workshop_ids
 
-    details = response.json().get('response', {}).get('publishedfiledetails', [{}])[0]
+def build_batch_payload(workshop_ids):
+    """
+    Build the form payload for one GetPublishedFileDetails request.
+    """
+    data = {'itemcount': len(workshop_ids)}
+    for i, workshop_id in enumerate(workshop_ids):
+        data[f'publishedfileids[{i}]'] = workshop_id
+    return data
 
+def parse_batch_response(payload):
+    """
+    Parse a GetPublishedFileDetails JSON response into a dict keyed by workshop ID.
+    """
+    details_list = payload.get('response', {}).get('publishedfiledetails', [])
+    if not isinstance(details_list, list):
+        return {}
+    results = {}
+    for details in details_list:
+        workshop_id = details.get('publishedfileid')
+        if workshop_id is None:
+            continue
+        results[str(workshop_id)] = details_to_info(details)
+    return results
+
+def details_to_info(details):
+    """
+    Convert one raw publishedfiledetails entry into the mod info dict used throughout the monitor.
+    The raw Steam fields are kept under 'raw'.
+    """
     return {
         'title': details.get('title', 'Unknown'),
         'time_updated': details.get('time_updated', 0),
-        'description': details.get('description', '')
+        'description': details.get('description', ''),
+        'raw': details
+    }
+
+def mod_result(workshop_id, mod_info):
+    """
+    Build the per-mod metadata record returned by the mod check modes.
+    """
+    return {
+        "workshop_id": workshop_id,
+        "title": mod_info.get('title', 'Unknown'),
+        "time_updated": mod_info.get('time_updated', 0),
+        "description": mod_info.get('description', ''),
+        "raw": mod_info.get('raw', {}),
+        "cached": mod_info.get('cached', False)
     }
+
+def in_order(mods, results):
+    """
+    Return streamed mod results (from any completion order) in the order of the server's mod list.
+    """
+    by_id = {result["workshop_id"]: result for result in results}
+    ordered = []
+    for mod in mods:
+        result = by_id.pop(str(mod.get("workshop_id")), None)
+        if result is not None:
+            ordered.append(result)
+    return ordered
+
+def is_resolved(mod_info):
+    """
+    True if Steam returned the item's details (result 1 with an update time), not a failed or unknown lookup.
+    """
+    raw = mod_info.get('raw') or {}
+    return raw.get('result', 1) == 1 and bool(mod_info.get('time_updated'))
+
+def lookup_cached(workshop_ids, cache):
+    """
+    Split workshop IDs into (details served from cache, IDs still to fetch). Cached details are marked 'cached'.
+    """
+    if cache is None:
+        return {}, list(workshop_ids)
+    cached = {wid: dict(details_to_info(raw), cached=True) for wid, raw in cache.get_many(workshop_ids).items()}
+    # Entries written before unresolved lookups were skipped are refetched
+    cached = {wid: info for wid, info in cached.items() if is_resolved(info)}
+    missing = [wid for wid in workshop_ids if wid not in cached]
+    if cached:
+        logging.debug(f"Steam cache: {len(cached)} hits, {len(missing)} misses")
+    return cached, missing
+
+def store_cached(cache, details):
+    """
+    Write freshly fetched details to the cache (no-op when caching is disabled). Failed or unresolved
+    lookups are not cached, so the next run asks Steam again instead of hiding an update for a TTL.
+    """
+    if cache is None or not details:
+        return
+    resolved = {wid: info.get('raw', info) for wid, info in details.items() if is_resolved(info)}
+    if resolved:
+        cache.put_many(resolved)
+
+def fetch_batch(workshop_ids, api_url=None):
+    """
+    Fetch details for up to one batch of workshop IDs in a single request.
+    Waits for the shared rate limiter and retries throttled (429) requests with backoff.
+    Raises on HTTP/network errors, or RateLimitExceeded when the retries run out.
+    """
+    data = build_batch_payload(workshop_ids)
+    limiter = rate_limiter.get_limiter()
+    attempt = 0
+    while True:
+        limiter.acquire()
+        response = http_session.get_session().post(api_url or STEAM_API_URL, data=data, timeout=10)
+        if response.status_code != 429:
+            break
+        rate_limiter.throttled(attempt, response.headers.get("Retry-After"), f"batch of {len(workshop_ids)} mods")
+        attempt += 1
+    response.raise_for_status()
+    return parse_batch_response(response.json())
+
+def get_mod_info_batch(workshop_ids, batch_size=DEFAULT_BATCH_SIZE, cache=None, api_url=None):
+    """
+    Fetch details for many workshop IDs, `batch_size` IDs per request, from api_url (get_api_url(config)).
+    Cached entries are served without a request when a cache is given.
+    Returns a dict keyed by workshop ID; IDs from a failed batch are left out.
+    """
+    results, missing = lookup_cached([str(wid) for wid in workshop_ids], cache)
+    fetched = {}
+    for batch in chunked(missing, batch_size):
+        try:
+            fetched.update(fetch_batch(batch, api_url))
+        except Exception as e:
+            logging.exception(f"Failed to fetch Steam info for {len(batch)} mods: {e}")
+    store_cached(cache, fetched)
+    results.update(fetched)
+    return results
+
+def get_mod_info(workshop_id, api_key=None, cache=None, api_url=None):
+    """
+    Fetch details for one workshop ID from api_url (get_api_url(config)), or from the cache when given.
+    """
+    workshop_id = str(workshop_id)
+    details, missing = lookup_cached([workshop_id], cache)
+    if missing:
+        try:
+            details = fetch_batch(missing, api_url)
+        except Exception as e:
+            logging.exception(f"Failed to fetch Steam info for mod {workshop_id}: {e}")
+            raise
+        store_cached(cache, details)
+
+    return details.get(workshop_id) or details_to_info({})
@@ -0,0 +1,249 @@
+# DayZ Server Monitor
+# Project: DayZ Server Monitor
+# File: steam_cache.py
+# Purpose: Persistent Steam Workshop metadata cache (SQLite in WAL mode) shared by all monitor processes.
+#          Entries are keyed by workshop ID, expire after a TTL and are evicted oldest-first above a size bound.
+#          Updated: Workshop changelogs are cached in the same file, keyed by (workshop ID, time_updated).
+#          Updated: the default TTL (120 s) is shorter than the default 180 s check interval.
+#          Updated: open_connection() is the WAL connection setup shared by every SQLite store (tracking, outbox).
+# Author: Tig Campbell-Moore (firstname[at]lastname[dot]com)
+# License: CC BY-NC 4.0 (see LICENSE file)
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+CACHE_FILE = Path("data/cache/steam_workshop.sqlite3")
+# Below the default schedule interval (180 s), so every scheduled check sees fresh details
+DEFAULT_TTL_SECONDS = 120
+DEFAULT_MAX_ENTRIES = 20000
+
+# SQLite limits the number of bound parameters per statement; stay well below it
+_QUERY_CHUNK = 500
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+_ITEMS_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS workshop_items ("
+    "workshop_id TEXT PRIMARY KEY, data TEXT NOT NULL, fetched_at REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS idx_workshop_items_fetched_at ON workshop_items(fetched_at)",
+)
+
+_CHANGELOGS_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS changelogs ("
+    "workshop_id TEXT NOT NULL, time_updated INTEGER NOT NULL, text TEXT NOT NULL, fetched_at REAL NOT NULL, "
+    "PRIMARY KEY (workshop_id, time_updated))",
+)
+
+def open_connection(path, schema=()):
+    """
+    Open a SQLite connection to path (creating its directory) and apply the schema statements.
+    Autocommit, so writers use explicit BEGIN IMMEDIATE transactions; WAL mode plus a busy timeout
+    lets threads with their own connection and overlapping monitor processes share the file.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), timeout=30, isolation_level=None, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=30000")
+    for statement in schema:
+        conn.execute(statement)
+    return conn
+
+class WorkshopCache:
+    """
+    On-disk cache of Steam Workshop details keyed by workshop ID.
+    Each thread gets its own SQLite connection; WAL mode plus a busy timeout lets
+    overlapping monitor processes read and write the same file safely.
+    Cache failures are logged and treated as misses, never as run failures.
+    """
+    def __init__(self, path=CACHE_FILE, ttl_seconds=DEFAULT_TTL_SECONDS, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._local = threading.local()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = open_connection(self.path, _ITEMS_SCHEMA)
+        return conn
+
+    def get_many(self, workshop_ids):
+        """
+        Return a dict of unexpired cached details for the given workshop IDs.
+        """
+        workshop_ids = [str(wid) for wid in workshop_ids]
+        if not workshop_ids:
+            return {}
+        cutoff = time.time() - self.ttl_seconds
+        results = {}
+        try:
+            conn = self._connect()
+            for i in range(0, len(workshop_ids), _QUERY_CHUNK):
+                chunk = workshop_ids[i:i + _QUERY_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = conn.execute(
+                    f"SELECT workshop_id, data FROM workshop_items WHERE fetched_at >= ? AND workshop_id IN ({placeholders})",
+                    [cutoff, *chunk],
+                )
+                for workshop_id, data in rows:
+                    results[workshop_id] = json.loads(data)
+        except (sqlite3.Error, ValueError) as e:
+            logging.warning(f"[SteamCache] Read from {self.path} failed, treating as cache miss: {e}")
+            return {}
+        return results
+
+    def put_many(self, details):
+        """
+        Store (or refresh) details for many workshop IDs in one transaction.
+        """
+        if not details:
+            return
+        now = time.time()
+        rows = [(str(wid), json.dumps(info), now) for wid, info in details.items()]
+        try:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO workshop_items (workshop_id, data, fetched_at) VALUES (?, ?, ?)", rows
+                )
+                self._evict(conn)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            logging.warning(f"[SteamCache] Write to {self.path} failed: {e}")
+
+    def _evict(self, conn):
+        """
+        Drop the oldest entries above max_entries (must run inside a write transaction).
+        """
+        if not self.max_entries:
+            return
+        (count,) = conn.execute("SELECT COUNT(*) FROM workshop_items").fetchone()
+        if count <= self.max_entries:
+            return
+        conn.execute(
+            "DELETE FROM workshop_items WHERE workshop_id IN ("
+            "SELECT workshop_id FROM workshop_items ORDER BY fetched_at ASC LIMIT ?)",
+            (count - self.max_entries,),
+        )
+        logging.debug(f"[SteamCache] Evicted {count - self.max_entries} entries from {self.path}")
+
+    def purge_expired(self):
+        """
+        Delete all entries older than the TTL.
+        """
+        cutoff = time.time() - self.ttl_seconds
+        try:
+            self._connect().execute("DELETE FROM workshop_items WHERE fetched_at < ?", (cutoff,))
+        except sqlite3.Error as e:
+            logging.warning(f"[SteamCache] Purge of {self.path} failed: {e}")
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+class ChangelogCache:
+    """
+    Workshop changelog text keyed by (workshop ID, time_updated), in the same SQLite file as the details.
+    A given update's changelog never changes, so entries do not expire; the oldest are evicted above max_entries.
+    Cache failures are logged and treated as misses.
+    """
+    def __init__(self, path=CACHE_FILE, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self._local = threading.local()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = open_connection(self.path, _CHANGELOGS_SCHEMA)
+        return conn
+
+    def get(self, workshop_id, time_updated):
+        """
+        Return the cached changelog of one mod update, or None.
+        """
+        try:
+            row = self._connect().execute(
+                "SELECT text FROM changelogs WHERE workshop_id = ? AND time_updated = ?",
+                (str(workshop_id), int(time_updated or 0)),
+            ).fetchone()
+        except sqlite3.Error as e:
+            logging.warning(f"[SteamCache] Changelog read from {self.path} failed, treating as cache miss: {e}")
+            return None
+        return row[0] if row else None
+
+    def put(self, workshop_id, time_updated, text):
+        try:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO changelogs (workshop_id, time_updated, text, fetched_at) VALUES (?, ?, ?, ?)",
+                    (str(workshop_id), int(time_updated or 0), text, time.time()),
+                )
+                if self.max_entries:
+                    conn.execute(
+                        "DELETE FROM changelogs WHERE rowid IN ("
+                        "SELECT rowid FROM changelogs ORDER BY fetched_at DESC LIMIT -1 OFFSET ?)",
+                        (self.max_entries,),
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            logging.warning(f"[SteamCache] Changelog write to {self.path} failed: {e}")
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+def get_changelog_cache(config):
+    """
+    Return the shared ChangelogCache for this config, or None if caching is disabled (steam.cache_enabled).
+    """
+    steam_cfg = config.get("steam") or {}
+    if not steam_cfg.get("cache_enabled", True):
+        return None
+    path = steam_cfg.get("cache_path") or str(CACHE_FILE)
+    max_entries = steam_cfg.get("cache_max_entries", DEFAULT_MAX_ENTRIES)
+    key = ("changelogs", path, max_entries)
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = ChangelogCache(path, max_entries)
+            _caches[key] = cache
+        return cache
+
+def get_cache(config):
+    """
+    Return the shared WorkshopCache for this config, or None if caching is disabled (steam.cache_enabled).
+    """
+    steam_cfg = config.get("steam") or {}
+    if not steam_cfg.get("cache_enabled", True):
+        return None
+    path = steam_cfg.get("cache_path") or str(CACHE_FILE)
+    ttl_seconds = steam_cfg.get("cache_ttl_seconds", DEFAULT_TTL_SECONDS)
+    max_entries = steam_cfg.get("cache_max_entries", DEFAULT_MAX_ENTRIES)
+    key = (path, ttl_seconds, max_entries)
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = WorkshopCache(path, ttl_seconds, max_entries)
+            _caches[key] = cache
+        return cache
@@ -0,0 +1,190 @@
+# DayZ Server Monitor
+# Project: DayZ Server Monitor
+# File: tracking_store.py
+# Purpose: Versioned per-server mod tracking (SQLite in WAL mode). The current state is one row per
+#          server and workshop ID; every run writes only the delta as added/removed/updated events,
+#          which are indexed by server/time and workshop ID so "what changed since T" needs no replay.
+#          Updated: the legacy snapshot import runs in its own transaction and tolerates another process
+#                   importing (and renaming) the same file concurrently.
+#          Updated: connections are opened by steam_cache.open_connection (shared WAL setup).
+# Author: Tig Campbell-Moore (firstname[at]lastname[dot]com)
+# License: CC BY-NC 4.0 (see LICENSE file)
+
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+from src import steam_cache
+
+TRACKING_DIR = Path("data/tracking")
+TRACKING_FILE = TRACKING_DIR / "tracking.sqlite3"
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS mod_state ("
+    "server TEXT NOT NULL, workshop_id TEXT NOT NULL, name TEXT, time_updated INTEGER NOT NULL DEFAULT 0, "
+    "PRIMARY KEY (server, workshop_id))",
+    "CREATE TABLE IF NOT EXISTS mod_events ("
+    "id INTEGER PRIMARY KEY AUTOINCREMENT, server TEXT NOT NULL, workshop_id TEXT NOT NULL, "
+    "event TEXT NOT NULL, name TEXT, time_updated INTEGER, previous_time_updated INTEGER, recorded_at REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS idx_mod_events_server_time ON mod_events(server, recorded_at)",
+    "CREATE INDEX IF NOT EXISTS idx_mod_events_workshop_id ON mod_events(workshop_id, recorded_at)",
+)
+
+_EVENT_COLUMNS = ("server", "workshop_id", "event", "name", "time_updated", "previous_time_updated", "recorded_at")
+
+class TrackingStore:
+    """
+    Mod state and change history for every server in one SQLite file.
+    Each thread gets its own connection; writes for a server run in a single transaction.
+    """
+    def __init__(self, path=TRACKING_FILE):
+        self.path = Path(path)
+        self._local = threading.local()
+        self._imported = set()
+        self._import_lock = threading.Lock()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = steam_cache.open_connection(self.path, _SCHEMA)
+        return conn
+
+    def _import_legacy(self, conn, server):
+        """
+        Seed the state of a server from its legacy <server>_mods.json snapshot, once.
+        """
+        with self._import_lock:
+            if server in self._imported:
+                return
+            self._imported.add(server)
+        legacy = self.path.parent / f"{server}_mods.json"
+        if not legacy.exists():
+            return
+        # Another process (an overlapping run, the CLI) may be importing the same file: the count and the
+        # insert are serialized by the write lock, and whoever comes second finds the rows already there
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            (count,) = conn.execute("SELECT COUNT(*) FROM mod_state WHERE server = ?", (server,)).fetchone()
+            if count == 0:
+                with legacy.open("r") as f:
+                    mods = json.load(f)
+                rows = [
+                    (server, str(wid), mod.get("name"), int(mod.get("time_updated") or 0))
+                    for wid, mod in mods.items() if isinstance(mod, dict)
+                ]
+                conn.executemany(
+                    "INSERT OR REPLACE INTO mod_state (server, workshop_id, name, time_updated) VALUES (?, ?, ?, ?)", rows
+                )
+                logging.info(f"[Tracking] Imported {len(rows)} mods for {server} from {legacy}")
+            conn.execute("COMMIT")
+        except FileNotFoundError:
+            # Imported and renamed by another process since exists() looked
+            conn.execute("ROLLBACK")
+            return
+        except Exception as e:
+            conn.execute("ROLLBACK")
+            logging.warning(f"[Tracking] Could not import legacy tracking file {legacy}: {e}")
+            return
+        try:
+            legacy.rename(legacy.with_name(legacy.name + ".migrated"))
+        except FileNotFoundError:
+            pass
+
+    def _read_state(self, conn, server):
+        rows = conn.execute(
+            "SELECT workshop_id, name, time_updated FROM mod_state WHERE server = ?", (server,)
+        )
+        return {wid: {"name": name, "workshop_id": wid, "time_updated": time_updated} for wid, name, time_updated in rows}
+
+    def load_state(self, server):
+        """
+        Return the current mods of a server as a dict keyed by workshop ID.
+        """
+        conn = self._connect()
+        self._import_legacy(conn, server)
+        return self._read_state(conn, server)
+
+    def record(self, server, mods, recorded_at=None):
+        """
+        Make `mods` (dict keyed by workshop ID) the current state of a server.
+        Only added, removed and changed rows are written; returns the change events recorded.
+        """
+        recorded_at = recorded_at or time.time()
+        conn = self._connect()
+        self._import_legacy(conn, server)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            previous = self._read_state(conn, server)
+            events = []
+            upserts = []
+            for wid, mod in mods.items():
+                wid = str(wid)
+                name = mod.get("name")
+                time_updated = int(mod.get("time_updated") or 0)
+                old = previous.get(wid)
+                if old is None:
+                    events.append((server, wid, "added", name, time_updated, None, recorded_at))
+                elif old["time_updated"] != time_updated:
+                    events.append((server, wid, "updated", name, time_updated, old["time_updated"], recorded_at))
+                elif old["name"] == name:
+                    continue
+                upserts.append((server, wid, name, time_updated))
+            removed = [wid for wid in previous if wid not in mods]
+            for wid in removed:
+                old = previous[wid]
+                events.append((server, wid, "removed", old["name"], None, old["time_updated"], recorded_at))
+
+            conn.executemany(
+                "INSERT OR REPLACE INTO mod_state (server, workshop_id, name, time_updated) VALUES (?, ?, ?, ?)", upserts
+            )
+            conn.executemany("DELETE FROM mod_state WHERE server = ? AND workshop_id = ?", [(server, wid) for wid in removed])
+            conn.executemany(
+                f"INSERT INTO mod_events ({', '.join(_EVENT_COLUMNS)}) VALUES ({', '.join('?' * len(_EVENT_COLUMNS))})", events
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return [dict(zip(_EVENT_COLUMNS, event)) for event in events]
+
+    def _events(self, where, params):
+        rows = self._connect().execute(
+            f"SELECT {', '.join(_EVENT_COLUMNS)} FROM mod_events WHERE {where} ORDER BY recorded_at, id", params
+        )
+        return [dict(zip(_EVENT_COLUMNS, row)) for row in rows]
+
+    def changes_since(self, server, since):
+        """
+        Return the change events of a server recorded at or after `since` (epoch seconds), oldest first.
+        """
+        return self._events("server = ? AND recorded_at >= ?", (server, since))
+
+    def mod_history(self, workshop_id, server=None):
+        """
+        Return every change event of one workshop ID, optionally limited to one server.
+        """
+        if server is None:
+            return self._events("workshop_id = ?", (str(workshop_id),))
+        return self._events("workshop_id = ? AND server = ?", (str(workshop_id), server))
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+def get_store(path=None):
+    """
+    Return the shared TrackingStore for a database file (default data/tracking/tracking.sqlite3).
+    """
+    path = Path(path or TRACKING_FILE).resolve()
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = TrackingStore(path)
+            _stores[path] = store
+        return store
@@ -0,0 +1,180 @@
+# DayZ Server Monitor
+# Project: DayZ Server Monitor
+# File: tests/fakes/a2s_server.py
+# Purpose: Local stand-in for DayZ game servers answering A2S_RULES (and a minimal A2S_INFO) over UDP.
+#          One background event loop serves any number of fake servers, each on its own port, with a
+#          configurable mod list encoded the way DayZ does (escaped binary rules split over 2-byte keys).
+#          Responses go through a challenge round and are split into multiple packets when large.
+# Author: Tig Campbell-Moore (firstname[at]lastname[dot]com)
+# License: CC BY-NC 4.0 (see LICENSE file)
+
+import asyncio
+import struct
+import threading
+import zlib
+
+SIMPLE_HEADER = b"\xFF\xFF\xFF\xFF"
+SPLIT_HEADER = b"\xFE\xFF\xFF\xFF"
+CHALLENGE = b"\x5A\x17\xC3\x09"
+
+# Largest payload sent in one packet; bigger responses are split like a real server does
+MAX_PACKET_PAYLOAD = 1248
+RULE_CHUNK_SIZE = 127
+# The rules blob stores the mod count in one byte
+MAX_MODS_PER_SERVER = 255
+
+def _escape(data):
+    return data.replace(b"\x01", b"\x01\x01").replace(b"\x00", b"\x01\x02").replace(b"\xFF", b"\x01\x03")
+
+def _mod_entry(workshop_id, name):
+    workshop_id = int(workshop_id)
+    # Hash bytes are kept away from the escape range; only identification matters here
+    mod_hash = bytes(b | 0x10 for b in zlib.crc32(str(workshop_id).encode()).to_bytes(4, "little"))
+    id_bytes = workshop_id.to_bytes(max(1, (workshop_id.bit_length() + 7) // 8), "little")
+    name_bytes = name.encode("utf-8")[:255]
+    return mod_hash + bytes([len(id_bytes)]) + id_bytes + bytes([len(name_bytes)]) + name_bytes
+
+def is_encodable(workshop_id, name):
+    """
+    dayzquery unescapes with sequential replaces, so a raw 0x01 followed by 0x02/0x03 would decode wrongly.
+    Real workshop IDs practically never hit this; generated ones should be skipped if they do.
+    """
+    entry = _mod_entry(workshop_id, name)
+    return b"\x01\x02" not in entry and b"\x01\x03" not in entry
+
+def encode_rules(mods, island="chernarusplus", platform="win", time_left=15):
+    """
+    Build the raw A2S_RULES dict (bytes keys/values) a DayZ server reports for the given mods,
+    a list of (workshop_id, name) tuples.
+    """
+    mods = list(mods)[:MAX_MODS_PER_SERVER]
+    blob = struct.pack("<BBH", 2, 0, 0) + bytes([len(mods)])
+    blob += b"".join(_mod_entry(workshop_id, name) for workshop_id, name in mods)
+    blob += b"\x00"  # No signatures
+    escaped = _escape(blob)
+    chunks = [escaped[i:i + RULE_CHUNK_SIZE] for i in range(0, len(escaped), RULE_CHUNK_SIZE)]
+    rules = {bytes([index + 1, len(chunks)]): chunk for index, chunk in enumerate(chunks)}
+    rules.update({
+        b"allowedBuild": b"0",
+        b"dedicated": b"1",
+        b"island": island.encode(),
+        b"language": b"65545",
+        b"platform": platform.encode(),
+        b"requiredBuild": b"0",
+        b"requiredVersion": b"127",
+        b"timeLeft": str(time_left).encode(),
+    })
+    return rules
+
+def rules_response(rules):
+    body = b"E" + struct.pack("<h", len(rules))
+    for key, value in rules.items():
+        body += key + b"\x00" + value + b"\x00"
+    return SIMPLE_HEADER + body
+
+def info_response(name, island, players=0, max_players=60):
+    body = b"I" + bytes([17])
+    body += b"".join(text.encode() + b"\x00" for text in (name, island, "dayz", "DayZ"))
+    body += struct.pack("<HBBBccBB", 0, players, max_players, 0, b"d", b"w", 0, 1)
+    body += b"1.27\x00"
+    return SIMPLE_HEADER + body
+
+def split_packets(payload, response_id):
+    fragments = [payload[i:i + MAX_PACKET_PAYLOAD] for i in range(0, len(payload), MAX_PACKET_PAYLOAD)]
+    return [
+        SPLIT_HEADER + struct.pack("<lBBh", response_id, len(fragments), number, MAX_PACKET_PAYLOAD) + fragment
+        for number, fragment in enumerate(fragments)
+    ]
+
+class _ServerProtocol(asyncio.DatagramProtocol):
+    def __init__(self, server):
+        self.server = server
+        self.transport = None
+        self._response_id = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def _send(self, payload, addr):
+        if len(payload) <= MAX_PACKET_PAYLOAD:
+            self.transport.sendto(payload, addr)
+            return
+        self._response_id = (self._response_id + 1) & 0x7FFFFFFF
+        for packet in split_packets(payload, self._response_id):
+            self.transport.sendto(packet, addr)
+
+    def datagram_received(self, data, addr):
+        server = self.server
+        server.queries += 1
+        if data[:4] != SIMPLE_HEADER or len(data) < 5:
+            return
+        kind = data[4:5]
+        if kind == b"V":
+            if data[5:9] != CHALLENGE:
+                self.transport.sendto(SIMPLE_HEADER + b"A" + CHALLENGE, addr)
+                return
+            self._send(server.rules_payload, addr)
+        elif kind == b"T":
+            self._send(server.info_payload, addr)
+
+class FakeDayZServer:
+    """One fake server: its mods and pre-built responses."""
+    def __init__(self, mods, name="Fake DayZ Server", island="chernarusplus"):
+        self.mods = list(mods)[:MAX_MODS_PER_SERVER]
+        self.name = name
+        self.island = island
+        self.port = None
+        self.queries = 0
+        self.set_mods(self.mods)
+
+    def set_mods(self, mods):
+        """Change the mod list reported by this server (e.g. to simulate an update)."""
+        self.mods = list(mods)[:MAX_MODS_PER_SERVER]
+        self.rules_payload = rules_response(encode_rules(self.mods, island=self.island))
+        self.info_payload = info_response(self.name, self.island)
+
+class FakeA2SCluster:
+    """
+    Runs many FakeDayZServers on one background event loop, one UDP port each.
+    mod_lists is a list of mod lists (one per server), each a list of (workshop_id, name) tuples.
+    """
+    def __init__(self, mod_lists, host="127.0.0.1"):
+        self.host = host
+        self.servers = [FakeDayZServer(mods, name=f"Fake DayZ Server {i + 1}") for i, mods in enumerate(mod_lists)]
+        self._loop = None
+        self._thread = None
+        self._transports = []
+
+    @property
+    def addresses(self):
+        return [(self.host, server.port) for server in self.servers]
+
+    async def _bind_all(self):
+        for server in self.servers:
+            transport, _ = await self._loop.create_datagram_endpoint(
+                lambda server=server: _ServerProtocol(server), local_addr=(self.host, 0)
+            )
+            server.port = transport.get_extra_info("sockname")[1]
+            self._transports.append(transport)
+
+    def start(self):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="fake-a2s", daemon=True)
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._bind_all(), self._loop).result(timeout=30)
+        return self
+
+    def stop(self):
+        def close():
+            for transport in self._transports:
+                transport.close()
+            self._loop.stop()
+        self._loop.call_soon_threadsafe(close)
+        self._thread.join(timeout=5)
+        self._loop.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
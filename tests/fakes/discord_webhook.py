@@ -0,0 +1,104 @@
+# DayZ Server Monitor
+# Project: DayZ Server Monitor
+# File: tests/fakes/discord_webhook.py
+# Purpose: Local stand-in for a Discord webhook, for tests. Enforces a rate-limit bucket of `limit` posts per
+#          `reset_after` seconds with X-RateLimit-* headers, answers posts over the bucket with 429 and a JSON
+#          retry_after, can delay responses and fail the first `fail_first` posts with fail_status, and records
+#          every accepted payload.
+# Author: Tig Campbell-Moore (firstname[at]lastname[dot]com)
+# License: CC BY-NC 4.0 (see LICENSE file)
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WEBHOOK_PATH = "/api/webhooks/1/token"
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        payload = json.loads(self.rfile.read(length).decode("utf-8") or "null")
+        status, body, headers = self.server.fake.respond(self.path.split("?")[0], payload)
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+class FakeDiscordWebhook:
+    """
+    Threaded HTTP server accepting webhook posts on WEBHOOK_PATH.
+    """
+    def __init__(self, limit=5, reset_after=0.2, latency=0.0, fail_first=0, fail_status=502, host="127.0.0.1", port=0):
+        self.limit = limit
+        self.reset_after = reset_after
+        self.latency = latency
+        self.fail_first = fail_first
+        self.fail_status = fail_status
+        self._lock = threading.Lock()
+        self._window_start = 0.0
+        self._used = 0
+        self.payloads = []
+        self.requests = 0
+        self.throttled = 0
+        self.failed = 0
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.fake = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}{WEBHOOK_PATH}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-discord", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def respond(self, path, payload):
+        """Return (status, body, headers) for one post."""
+        if path != WEBHOOK_PATH:
+            return 404, b"", {}
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.requests += 1
+            if self.failed < self.fail_first:
+                self.failed += 1
+                return self.fail_status, b"", {}
+            now = time.monotonic()
+            if now - self._window_start >= self.reset_after:
+                self._window_start, self._used = now, 0
+            reset_after = max(0.0, self._window_start + self.reset_after - now)
+            if self._used >= self.limit:
+                self.throttled += 1
+                body = json.dumps({"message": "You are being rate limited.", "retry_after": reset_after, "global": False})
+                return 429, body.encode("utf-8"), {"Content-Type": "application/json", "Retry-After": str(int(reset_after) + 1)}
+            self._used += 1
+            self.payloads.append(payload)
+            headers = {
+                "X-RateLimit-Bucket": "fake-bucket",
+                "X-RateLimit-Limit": str(self.limit),
+                "X-RateLimit-Remaining": str(self.limit - self._used),
+                "X-RateLimit-Reset-After": f"{reset_after:.3f}",
+            }
+        return 204, b"", headers
@@ -0,0 +1,205 @@
+# DayZ Server Monitor
+# Project: DayZ Server Monitor
+# File: tests/fakes/steam_server.py
+# Purpose: Local stand-in for the Steam Web API GetPublishedFileDetails endpoint, for tests and benchmarks.
+#          Serves multi-item requests with configurable latency, jitter, error rate, 429 throttling
+#          (with Retry-After) and occasional slow responses, and records request counts and
+#          server-side per-request latency.
+#          Also serves Workshop changelog pages (CHANGELOG_PATH/<id>) for the changelog fetcher.
+# Author: Tig Campbell-Moore (firstname[at]lastname[dot]com)
+# License: CC BY-NC 4.0 (see LICENSE file)
+
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+API_PATH = "/ISteamRemoteStorage/GetPublishedFileDetails/v1/"
+CHANGELOG_PATH = "/sharedfiles/filedetails/changelog/"
+
+def make_item(workshop_id):
+    """Deterministic Workshop details for a workshop ID."""
+    workshop_id = str(workshop_id)
+    seed = int(workshop_id) if workshop_id.isdigit() else sum(map(ord, workshop_id))
+    return {
+        "publishedfileid": workshop_id,
+        "result": 1,
+        "title": f"Mod {workshop_id}",
+        "time_updated": 1700000000 + seed % 1000000,
+        "description": f"[h1]Mod {workshop_id}[/h1]\n[b]Changelog[/b]\n- Fixed things in build {seed % 97}",
+    }
+
+def make_changelog_page(workshop_id, filler_kb=64):
+    """A Workshop changelog page: the latest entry in the first changeLogBlock, older entries and filler after it."""
+    item = make_item(workshop_id)
+    entries = "".join(
+        f'<div class="detailBox workshopAnnouncement changeLogBlock"><div class="headline">Update {n}</div>'
+        f'<p id="{item["time_updated"] - n}">Build {n} for {item["title"]}<br>Fixed &amp; improved things</p></div>'
+        for n in range(3)
+    )
+    filler = "<div class=\"commentthread_comment\">" + "lorem ipsum " * 85 + "</div>"
+    return (
+        f"<!DOCTYPE html><html><head><title>{item['title']}</title></head><body>"
+        f'<div class="workshopItemTitle">{item["title"]}</div>{entries}'
+        + filler * filler_kb + "</body></html>"
+    ).encode("utf-8")
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=b"", headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        fake = self.server.fake
+        path = self.path.split("?")[0]
+        if not path.startswith(CHANGELOG_PATH):
+            self._send(404)
+            return
+        fake.record_changelog()
+        self._send(200, make_changelog_page(path[len(CHANGELOG_PATH):].strip("/")), {"Content-Type": "text/html; charset=utf-8"})
+
+    def do_POST(self):
+        fake = self.server.fake
+        started = time.perf_counter()
+        length = int(self.headers.get("Content-Length") or 0)
+        form = parse_qs(self.rfile.read(length).decode("utf-8"))
+        if self.path.split("?")[0] != API_PATH:
+            self._send(404)
+            return
+        count = int(form.get("itemcount", ["0"])[0])
+        ids = [form.get(f"publishedfileids[{i}]", [""])[0] for i in range(count)]
+
+        status, body, headers = fake.respond(ids)
+        # Record before replying so stats are complete once the client has its response
+        fake.record(len(ids), status, time.perf_counter() - started)
+        self._send(status, body, headers)
+
+class _Server(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        # Clients may hang up early (e.g. the changelog fetcher stops reading after the first entry)
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+class FakeSteamServer:
+    """
+    Threaded HTTP server answering GetPublishedFileDetails for any workshop ID.
+    latency/jitter are in seconds; error_rate is the fraction of requests answered with error_status;
+    throttle_rate is the fraction answered 429 with a Retry-After of retry_after seconds;
+    slow_rate is the fraction delayed by an extra slow_seconds.
+    """
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, error_status=500, throttle_rate=0.0, retry_after=1,
+                 slow_rate=0.0, slow_seconds=5.0, seed=None, host="127.0.0.1", port=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.slow_rate = slow_rate
+        self.slow_seconds = slow_seconds
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = _Server((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.fake = self
+        self._thread = None
+        self.reset_stats()
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}{API_PATH}"
+
+    @property
+    def changelog_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}{CHANGELOG_PATH}{{workshop_id}}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-steam", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _draw(self):
+        with self._lock:
+            delay = self.latency + self._random.uniform(-self.jitter, self.jitter)
+            if self._random.random() < self.slow_rate:
+                delay += self.slow_seconds
+            throttled = self._random.random() < self.throttle_rate
+            failed = self._random.random() < self.error_rate
+        return max(0.0, delay), throttled, failed
+
+    def respond(self, ids):
+        """Return (status, body, headers) for one request."""
+        delay, throttled, failed = self._draw()
+        if throttled:
+            # Steam answers rate-limited requests immediately
+            return 429, b"", {"Retry-After": str(self.retry_after)}
+        if delay:
+            time.sleep(delay)
+        if failed:
+            return self.error_status, b"", {}
+        payload = {"response": {"result": 1, "resultcount": len(ids), "publishedfiledetails": [make_item(wid) for wid in ids]}}
+        return 200, json.dumps(payload).encode("utf-8"), {"Content-Type": "application/json"}
+
+    def record(self, items, status, seconds):
+        with self._lock:
+            self._requests += 1
+            self._items += items
+            if status == 429:
+                self._throttled += 1
+            elif status != 200:
+                self._errors += 1
+            self._latencies.append(seconds)
+
+    def record_changelog(self):
+        with self._lock:
+            self.changelog_requests += 1
+
+    def reset_stats(self):
+        with self._lock:
+            self.changelog_requests = 0
+            self._requests = 0
+            self._items = 0
+            self._errors = 0
+            self._throttled = 0
+            self._latencies = []
+
+    def stats(self):
+        """Request counts and server-side per-request latency percentiles (milliseconds)."""
+        with self._lock:
+            latencies = list(self._latencies)
+            stats = {"requests": self._requests, "items": self._items, "errors": self._errors, "throttled": self._throttled}
+        p50 = percentile(latencies, 0.50)
+        p99 = percentile(latencies, 0.99)
+        stats["latency_p50_ms"] = round(p50 * 1000, 2) if p50 is not None else None
+        stats["latency_p99_ms"] = round(p99 * 1000, 2) if p99 is not None else None
+        return stats
@@ -0,0 +1,66 @@
+# DayZ Server Monitor
+# Project: DayZ Server Monitor
+# File: tests/test_a2s_async.py
+# Purpose: Unit tests for the asyncio A2S engine (challenge handling, split-packet reassembly, timeouts)
+# Author: Tig Campbell-Moore (firstname[at]lastname[dot]com)
+# License: CC BY-NC 4.0 (see LICENSE file)
+
+import asyncio
+import socket
+import struct
+import pytest
+from src import a2s_async
+
+CHALLENGE = b"\x11\x22\x33\x44"
+
+def rules_body(rules):
+    body = b"E" + struct.pack("<h", len(rules))
+    for key, value in rules.items():
+        body += key + b"\x00" + value + b"\x00"
+    return b"\xFF\xFF\xFF\xFF" + body
+
+class RulesResponder(asyncio.DatagramProtocol):
+    """Answers A2S_RULES with a challenge first, then with the rules split over several packets."""
+    def __init__(self, rules, fragment_size):
+        self.payload = rules_body(rules)
+        self.fragment_size = fragment_size
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        if data[4:5] != b"V":
+            return
+        if data[5:9] != CHALLENGE:
+            self.transport.sendto(b"\xFF\xFF\xFF\xFFA" + CHALLENGE, addr)
+            return
+        fragments = [self.payload[i:i + self.fragment_size] for i in range(0, len(self.payload), self.fragment_size)]
+        # Send out of order to exercise reassembly
+        for number in reversed(range(len(fragments))):
+            header = b"\xFE\xFF\xFF\xFF" + struct.pack("<lBBh", 7, len(fragments), number, 1248)
+            self.transport.sendto(header + fragments[number], addr)
+
+async def query_rules(rules, fragment_size):
+    loop = asyncio.get_running_loop()
+    transport, _ = await loop.create_datagram_endpoint(
+        lambda: RulesResponder(rules, fragment_size), local_addr=("127.0.0.1", 0)
+    )
+    try:
+        port = transport.get_extra_info("sockname")[1]
+        return await a2s_async.arules(("127.0.0.1", port), timeout=2)
+    finally:
+        transport.close()
+
+def test_rules_with_challenge_and_split_packets():
+    rules = {b"island": b"chernarusplus", b"\x01\x02": b"x" * 300, b"dedicated": b"1"}
+    assert asyncio.run(query_rules(rules, fragment_size=100)) == rules
+
+def test_timeout_raises_builtin_timeout_error():
+    # Bind a socket that never answers
+    silent = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    silent.bind(("127.0.0.1", 0))
+    try:
+        with pytest.raises(TimeoutError):
+            asyncio.run(a2s_async.arules(silent.getsockname(), timeout=0.2))
+    finally:
+        silent.close()
@@ -0,0 +1,114 @@
+# DayZ Server Monitor
+# Project: DayZ Server Monitor
+# File: tests/test_advanced_logging.py
+# Purpose: AdvancedLogger rotation: decided from the in-memory byte counter and cached daily rotation time,
+#          with the filesystem only consulted once a threshold is crossed; compression and pruning in the background
+# Author: Tig Campbell-Moore (firstname[at]lastname[dot]com)
+# License: CC BY-NC 4.0 (see LICENSE file)
+
+import gzip
+import time
+from datetime import datetime, timedelta
+from src import advanced_logging
+from src.advanced_logging import AdvancedLogger
+
+def make_config(tmp_path, **rotation):
+    return {
+        "log_dir": str(tmp_path),
+        "_config_file": "server1.yaml",
+        "logging": {"level": "DEBUG"},
+        "log_rotation": dict({"enabled": True, "daily": False, "compress": None, "backup_count": 50, "min_days": 0}, **rotation),
+    }
+
+def rotated_files(tmp_path):
+    return [p for p in tmp_path.iterdir() if p.name.endswith(".log") and p.name.count(".") > 3]
+
+def test_byte_counter_tracks_the_file(tmp_path):
+    log = AdvancedLogger(make_config(tmp_path, max_bytes="1M"))
+    for n in range(100):
+        log.info(f"line {n} ✅")
+    assert log._handler.bytes_written == log.logfile.stat().st_size
+
+def test_size_rotation_only_checks_the_file_when_the_counter_crosses(tmp_path, monkeypatch):
+    calls = []
+    original = advanced_logging.should_rotate_size
+    monkeypatch.setattr(advanced_logging, "should_rotate_size", lambda *a: calls.append(1) or original(*a))
+    log = AdvancedLogger(make_config(tmp_path, max_bytes="2K"))
+    line = "x" * 100
+    for _ in range(25):
+        log.info(line)
+    # About 20 lines fit in 2K: the file was looked at once, when the counter crossed it
+    assert len(calls) == 1
+    assert len(rotated_files(tmp_path)) == 1
+    assert log._handler.bytes_written < 2048
+    assert log._handler.bytes_written == log.logfile.stat().st_size
+
+def test_counter_resyncs_when_the_file_shrank_elsewhere(tmp_path):
+    log = AdvancedLogger(make_config(tmp_path, max_bytes="1K"))
+    log._handler.bytes_written = 5000  # e.g. the file was truncated by another process
+    log.info("hello")
+    assert not rotated_files(tmp_path)
+    assert log._handler.bytes_written == log.logfile.stat().st_size
+
+def test_daily_rotation_uses_cached_time(tmp_path, monkeypatch):
+    yesterday = datetime.now() - timedelta(days=1)
+    config = make_config(tmp_path, daily=True, rotate_time="00:00")
+    log = AdvancedLogger(config)
+    advanced_logging.save_last_rotate(log.logfile, yesterday)
+    log.refresh_thresholds()
+
+    loads = []
+    original = advanced_logging.load_last_rotate
+    monkeypatch.setattr(advanced_logging, "load_last_rotate", lambda f: loads.append(1) or original(f))
+    log.info("first line")  # nothing to rotate yet: the file was empty
+    log.info("second line")  # due since midnight: rotates
+    for n in range(20):
+        log.info(f"line {n}")
+    assert len(rotated_files(tmp_path)) == 1
+    # The state file was read when the rotation was due and after it, not per log call
+    assert len(loads) <= 3
+    assert log._next_rotate_at == advanced_logging.next_daily_rotation("00:00", datetime.now())
+
+def test_next_daily_rotation():
+    now = datetime(2024, 5, 10, 12, 0)
+    assert advanced_logging.next_daily_rotation("02:00", None, now) == datetime(2024, 5, 10, 2, 0).timestamp()
+    assert advanced_logging.next_daily_rotation("02:00", datetime(2024, 5, 10, 2, 0), now) == datetime(2024, 5, 11, 2, 0).timestamp()
+    assert advanced_logging.next_daily_rotation("14:30", datetime(2024, 5, 9, 14, 30), now) == datetime(2024, 5, 10, 14, 30).timestamp()
+
+def test_rotation_compresses_and_prunes_in_the_background(tmp_path, monkeypatch):
+    started = []
+    original = advanced_logging.compress_file
+
+    def slow_compress(src, method, level):
+        started.append((method, level))
+        time.sleep(0.3)
+        return original(src, method, level)
+    monkeypatch.setattr(advanced_logging, "compress_file", slow_compress)
+
+    log = AdvancedLogger(make_config(tmp_path, max_bytes="1M", compress="gz", compress_level=1, backup_count=2))
+    begin = time.perf_counter()
+    for round_ in range(4):
+        for n in range(10):
+            log.info(f"round {round_} line {n}")
+        log.rotate_logs(force=True)
+    # Four rotations within the same second, none of which waited for its compression
+    assert time.perf_counter() - begin < 0.3
+    advanced_logging.wait_for_archiving()
+
+    assert started == [("gz", 1)] * 4
+    archives = sorted(p.name for p in tmp_path.iterdir() if p.name.endswith(".gz"))
+    assert len(archives) == 2
+    assert not rotated_files(tmp_path)
+    with gzip.open(tmp_path / archives[-1], "rt") as f:
+        assert "round 3" in f.read()
+
+def test_scan_rotated_logs_lists_oldest_first(tmp_path):
+    logfile = tmp_path / "server1.info.2024-05-10.log"
+    logfile.write_text("current")
+    for n, suffix in enumerate([".log", ".log.gz", ".log.zip"]):
+        (tmp_path / f"server1.info.2024-05-10.2024-05-1{n}_000000{suffix}").write_text(str(n))
+        time.sleep(0.01)
+    (tmp_path / "server1.info.2024-05-10.logrotate").write_text("last_rotate: x")
+    (tmp_path / "server2.info.2024-05-10.2024-05-10_000000.log").write_text("other server")
+    rotated = advanced_logging.list_rotated_logs(logfile, advanced_logging.COMPRESSION_METHODS)
+    assert [p.read_text() for p in rotated] == ["0", "1", "2"]
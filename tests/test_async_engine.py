@@ -0,0 +1,68 @@
+# DayZ Server Monitor
+# Project: DayZ Server Monitor
+# File: tests/test_async_engine.py
+# Purpose: Async mode engine: settings from mods:, loop/session reuse across runs, per-lookup deadline
+# Author: Tig Campbell-Moore (firstname[at]lastname[dot]com)
+# License: CC BY-NC 4.0 (see LICENSE file)
+
+import time
+import pytest
+from src import mod_resolver
+from src.modes import async_mode
+from tests.fakes.steam_server import FakeSteamServer
+
+@pytest.fixture
+def engine():
+    yield async_mode.get_engine()
+    async_mode.close()
+
+def make_config(url, **mods):
+    return {
+        "mods": {"mod_check_mode": "async", "steam_batch_size": 5, **mods},
+        "steam": {"cache_enabled": False, "api_url": url},
+    }
+
+def make_mods(count, first=800):
+    return [{"name": f"Mod {i}", "workshop_id": str(first + i)} for i in range(count)]
+
+def test_engine_settings_from_config():
+    settings, deadline = async_mode.get_engine_settings({"mods": {
+        "async_concurrency": 4, "async_limit_per_host": 2, "async_connect_timeout": 1.5,
+        "async_read_timeout": 3, "async_dns_cache_ttl": 0, "async_lookup_deadline_seconds": 0,
+    }})
+    assert settings == async_mode.EngineSettings(4, 2, 1.5, 3.0, 0)
+    assert deadline is None
+    assert async_mode.get_engine_settings({})[1] == 60.0
+    # The former option name still applies, also over the default of the new one
+    legacy = {"mods": {"async_lookup_deadline_seconds": 60, "async_deadline_seconds": 5}}
+    assert async_mode.get_engine_settings(legacy)[1] == 5.0
+
+def test_loop_and_session_are_reused_across_runs(engine):
+    with FakeSteamServer(latency=0.005) as server:
+        config = make_config(server.url)
+        first = mod_resolver.fetch_mod_details(config, None, make_mods(12))
+        sessions = dict(engine._sessions)
+        thread = engine._thread
+        second = mod_resolver.fetch_mod_details(config, None, make_mods(12, first=900))
+        assert len(first) == len(second) == 12
+        assert engine._sessions == sessions and len(sessions) == 1
+        assert engine._thread is thread
+        # Different connector settings get their own pooled session
+        mod_resolver.fetch_mod_details(make_config(server.url, async_concurrency=3), None, make_mods(3))
+        assert len(engine._sessions) == 2
+
+def test_deadline_cancels_outstanding_lookups(engine):
+    with FakeSteamServer(slow_rate=1.0, slow_seconds=3.0) as server:
+        config = make_config(server.url, async_lookup_deadline_seconds=0.3)
+        start = time.perf_counter()
+        results = mod_resolver.fetch_mod_details(config, None, make_mods(10))
+        assert results == []
+        assert time.perf_counter() - start < 2.0
+
+def test_close_releases_and_restarts(engine):
+    with FakeSteamServer() as server:
+        config = make_config(server.url)
+        mod_resolver.fetch_mod_details(config, None, make_mods(2))
+        mod_resolver.close()
+        assert engine._loop is None and engine._sessions == {}
+        assert len(mod_resolver.fetch_mod_details(config, None, make_mods(2))) == 2
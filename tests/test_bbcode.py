@@ -0,0 +1,80 @@
+# DayZ Server Monitor
+# Project: DayZ Server Monitor
+# File: tests/test_bbcode.py
+# Purpose: The BBCode converter matches the previous multi-pass output, including on random tag soup, and stops
+#          early at a line limit
+# Author: Tig Campbell-Moore (firstname[at]lastname[dot]com)
+# License: CC BY-NC 4.0 (see LICENSE file)
+
+import random
+import pytest
+from src.bbcode import bbcode_to_discord, bbcode_to_discord_lines
+from src.mod_checker import render_changelog
+from benchmarks.bench_bbcode import legacy_bbcode_to_discord, make_description
+
+SAMPLES = [
+    "",
+    "[h1]Update 1.2[/h1]\n[list]\n[*] [b]Fixed[/b] crash\n[*] [i]Added[/i] [u]stuff[/u]\n[/list]",
+    "[B]Upper[/b] and [s]strike[/S]",
+    "[b]unclosed bold\nnext line",
+    "[b]x[b]y[/b]z[/b]",
+    "[url=https://example.com]link text[/url] after\n[img]https://x/y.png[/img]\n[url]dangling",
+    '<a href="https://discord.gg/x">Discord</a> <img src="a.png"><br>text<p>para</p>',
+    "[b][/b]\n   \n***\n[color=#fff][size=3]Coloured[/size][/color]",
+    "[b]x<y[/b]>z[/b]",
+    "line one\r\nline two\rline three line four",
+    "[*] list item [/*] and [foo=bar]custom[/foo] tags",
+    "[spoiler]hidden[/spoiler] [quote=someone]quoted[/quote] [code]x = 1[/code]",
+    "[b]a[img]x[/b][/img]b[/b]",
+    "[b]a<a href=x>[/b]</a>",
+    "[i]one[url=x][/i][/url] [i]two[/i] [I]three",
+    'Thanks <3 to everyone\n[b]Fixed[/b] loot\n<img src="a.png">\nMore',
+    'Version <2.0 changes:\n- item one\n- item two\n<a href="https://x">Discord</a>',
+    "[url]a[img]b[/url]c[/img]",
+    "[color=[b]]x[/b] [<br>b]y[/b] [[b]b]",
+]
+
+# Fragments for random inputs: tags, partial tags and stray brackets in every order
+FRAGMENTS = [
+    "[b]", "[/b]", "[B]", "[/S]", "[u]", "[/u]", "[i]", "[/i]", "[s]", "[/s]", "[img]", "[/img]", "[image]", "[/image]",
+    "[url]", "[url=x]", "[/url]", '<a href="x">', "</a>", "<A>", '<img src="a">', "<img", "<br>", "<p>", "</p>",
+    "<", ">", "<3", "[", "]", "[[", "]]", "=", "/", "[color=red]", "[/color]", "[h1]", "[*]", "[foo=bar]",
+    "\n", "\r\n", " ", "x", "y", "*", "_", "~",
+]
+
+@pytest.mark.parametrize("text", SAMPLES)
+def test_matches_legacy_output(text):
+    assert bbcode_to_discord(text) == legacy_bbcode_to_discord(text)
+
+@pytest.mark.parametrize("seed", range(20))
+def test_matches_legacy_output_on_generated_descriptions(seed):
+    text = make_description(1000 + seed * 500, seed=seed)
+    assert bbcode_to_discord(text) == legacy_bbcode_to_discord(text)
+
+def test_matches_legacy_output_on_random_inputs():
+    rng = random.Random(9)
+    for _ in range(5000):
+        text = "".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(0, 30)))
+        legacy = legacy_bbcode_to_discord(text)
+        assert bbcode_to_discord(text) == legacy, text
+        limit = rng.randint(1, 4)
+        assert bbcode_to_discord_lines(text, limit=limit) == legacy.splitlines()[:limit], text
+
+@pytest.mark.parametrize("limit", [1, 3, 10, 50])
+def test_line_limit_returns_prefix_of_full_output(limit):
+    text = make_description(20000, seed=7)
+    full = legacy_bbcode_to_discord(text).splitlines()
+    assert bbcode_to_discord_lines(text, limit=limit) == full[:limit]
+
+def test_render_changelog_truncates():
+    description = "\n".join(f"[b]Change {n}[/b]" for n in range(30))
+    rendered = render_changelog(description, "", 5)
+    assert rendered.splitlines() == [f"**Change {n}**" for n in range(5)] + ["[...] (truncated)"]
+    assert "truncated" not in render_changelog(description, "", 30)
+
+def test_many_unclosed_tags():
+    # Openers after the last closer are not scanned to the end of the text (the legacy converter is quadratic here)
+    text = "[b]x " * 50000
+    assert bbcode_to_discord(text) == "x " * 50000
+    text = "[url=<a " * 20000 + "end"
+    assert bbcode_to_discord(text) == text
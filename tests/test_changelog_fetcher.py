@@ -0,0 +1,139 @@
+# DayZ Server Monitor
+# Project: DayZ Server Monitor
+# File: tests/test_changelog_fetcher.py
+# Purpose: Incremental changelog page parsing, cached concurrent fetching, and Workshop changelogs in reports
+# Author: Tig Campbell-Moore (firstname[at]lastname[dot]com)
+# License: CC BY-NC 4.0 (see LICENSE file)
+
+import time
+from pathlib import Path
+from src import changelog_fetcher
+from src import mod_checker
+from src import output_handler
+from src import rate_limiter
+from src import server_query
+from src.changelog_fetcher import ChangelogFetcher, parse_changelog
+from src.templates import TemplateLoader
+from tests.fakes.steam_server import FakeSteamServer, make_changelog_page, make_item
+
+LOCALES = Path(__file__).resolve().parent.parent / "locales"
+
+PAGE = (
+    '<html><body><div class="changeLogBlock other"><div class="headline">Update: 1 Mar</div>'
+    '<p id="1">Fixed <b>vehicles</b> &amp; doors<br>Added <div>nested</div> maps</p></div>'
+    '<div class="changeLogBlock"><p>Older entry</p></div></body></html>'
+)
+
+def chunks(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+def test_parses_only_first_block_across_chunk_boundaries():
+    for size in (1, 7, 64, len(PAGE)):
+        assert parse_changelog(chunks(PAGE, size)) == "Update: 1 Mar\nFixed vehicles & doors\nAdded\nnested\nmaps"
+
+def test_stops_reading_after_first_block():
+    page = make_changelog_page("1559212036")
+    consumed = []
+    def feed():
+        for chunk in chunks(page.decode(), 1024):
+            consumed.append(chunk)
+            yield chunk
+    assert parse_changelog(feed()).startswith("Update 0\nBuild 0 for Mod 1559212036")
+    assert len(consumed) < len(page) // 1024 // 4
+
+def test_page_without_block():
+    assert parse_changelog(["<html><body><p>No changelog here</p></body></html>"]) is None
+
+def test_pages_do_not_use_the_steam_api_rate_limit(monkeypatch):
+    # The Web API bucket is empty; changelog pages on steamcommunity.com must not wait for it or use it up
+    bucket = rate_limiter.TokenBucket(rate=2, burst=1)
+    bucket.reserve()
+    monkeypatch.setattr(rate_limiter, "_limiter", bucket)
+    with FakeSteamServer() as server:
+        config = {"mods": {"changelog_url": server.changelog_url}, "steam": {"cache_enabled": False}}
+        with ChangelogFetcher(config) as fetcher:
+            texts = [fetcher.submit(str(1559212036 + n), 100).result() for n in range(3)]
+    assert all(texts)
+    assert bucket.waits == 0
+
+def test_fetcher_caches_by_workshop_id_and_time_updated(tmp_path):
+    with FakeSteamServer() as server:
+        config = {
+            "mods": {"changelog_url": server.changelog_url},
+            "steam": {"cache_path": str(tmp_path / "cache.sqlite3")},
+        }
+        with ChangelogFetcher(config) as fetcher:
+            futures = [fetcher.submit("1559212036", 100), fetcher.submit("1564026768", 100)]
+            texts = [future.result() for future in futures]
+        with ChangelogFetcher(config) as fetcher:
+            assert fetcher.submit("1559212036", 100).result() == texts[0]
+            # A new update is fetched again
+            fetcher.submit("1559212036", 200).result()
+        assert server.changelog_requests == 3
+    assert all(text.startswith("Update 0") for text in texts)
+
+def test_missing_changelog_returns_none():
+    with FakeSteamServer() as server:
+        # The stand-in answers 404 outside its changelog path
+        assert changelog_fetcher.get_workshop_changelog("1", server.url + "{workshop_id}") is None
+
+def test_report_uses_workshop_changelog(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    mods = [{"name": "CF", "workshop_id": "1559212036"}]
+    monkeypatch.setattr(server_query, "query_server", lambda ip, port, timeout=None: ({"island": "chernarusplus"}, mods))
+    with FakeSteamServer() as server:
+        config = {
+            "server_name": "changelog_test",
+            "server": {"ip": "127.0.0.1", "port": 2302},
+            "mods": {"mod_check_mode": "serial", "max_changelog_lines": 2, "changelog_url": server.changelog_url},
+            "output": {"to_console": False, "to_discord": False},
+            "steam": {"cache_enabled": False, "api_url": server.url},
+        }
+        with output_handler.output_buffer():
+            mod_checker.run_mod_check(config, TemplateLoader("en_GB", base_path=LOCALES))
+            summary = output_handler.get_all_output()
+        assert server.changelog_requests == 1
+
+    assert "Build 0 for Mod 1559212036" in summary
+    assert "[...] (truncated)" in summary
+    assert make_item("1559212036")["description"].split("\n")[0] not in summary
+
+def run_check(tmp_path, monkeypatch, mods, **mods_cfg):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(server_query, "query_server", lambda ip, port, timeout=None: ({"island": "chernarusplus"}, mods))
+    stats = []
+    monkeypatch.setattr(mod_checker, "update_performance", lambda server_name, entry: stats.append(entry))
+    with FakeSteamServer() as server:
+        config = {
+            "server_name": "changelog_test",
+            "server": {"ip": "127.0.0.1", "port": 2302},
+            "mods": dict({"mod_check_mode": "serial", "changelog_url": server.changelog_url}, **mods_cfg),
+            "output": {"to_console": False, "to_discord": False},
+            "steam": {"cache_enabled": False, "api_url": server.url},
+        }
+        with output_handler.output_buffer():
+            mod_checker.run_mod_check(config, TemplateLoader("en_GB", base_path=LOCALES))
+            summary = output_handler.get_all_output()
+    return summary, stats[0]
+
+def test_fetch_seconds_excludes_changelog_pages(tmp_path, monkeypatch):
+    def slow_changelog(workshop_id, url_template):
+        time.sleep(0.5)
+        return "Slow changelog"
+    monkeypatch.setattr(changelog_fetcher, "get_workshop_changelog", slow_changelog)
+    summary, stats = run_check(tmp_path, monkeypatch, [{"name": "CF", "workshop_id": "1559212036"}])
+    assert "Slow changelog" in summary
+    assert stats["duration_seconds"] >= 0.5
+    assert stats["fetch_seconds"] < 0.5
+
+def test_too_many_changes_cancels_changelog_fetches(tmp_path, monkeypatch):
+    fetched, cancelled = [], []
+    monkeypatch.setattr(changelog_fetcher, "get_workshop_changelog", lambda workshop_id, url_template: fetched.append(workshop_id))
+    original_cancel = ChangelogFetcher.cancel
+    monkeypatch.setattr(ChangelogFetcher, "cancel", lambda self: cancelled.append(1) or original_cancel(self))
+    mods = [{"name": f"Mod {n}", "workshop_id": str(1000 + n)} for n in range(5)]
+    summary, _ = run_check(tmp_path, monkeypatch, mods, report_limit=1)
+    assert "5 mods updated/added" in summary
+    assert cancelled == [1]
+    # Only the first change was queued before the limit was exceeded
+    assert len(fetched) <= 1
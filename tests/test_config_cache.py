@@ -0,0 +1,116 @@
+# DayZ Server Monitor
+# Project: DayZ Server Monitor
+# File: tests/test_config_cache.py
+# Purpose: Compiled config cache: an unchanged config directory skips YAML parsing and validation, while edited
+#          files, new server files, secrets and environment overrides invalidate it
+# Author: Tig Campbell-Moore (firstname[at]lastname[dot]com)
+# License: CC BY-NC 4.0 (see LICENSE file)
+
+import logging
+import os
+import pytest
+from src import config_loader
+
+SERVER_YAML = """
+server:
+  ip: 127.0.0.1
+  port: {port}
+  name: Server {port}
+"""
+
+@pytest.fixture
+def config_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(config_loader, "SECRETS_DIR", tmp_path / "secrets")
+    for var_name in config_loader.SECRET_OVERRIDES + config_loader.ENV_OVERRIDES:
+        monkeypatch.delenv(var_name, raising=False)
+    directory = tmp_path / "config"
+    directory.mkdir()
+    (directory / "config.defaults.yaml").write_text("steam:\n  api_key: from-defaults\nmods:\n  mod_check_mode: auto\n")
+    (directory / "monitor.yaml").write_text("discord:\n  webhook_url: https://example.invalid/hook\n")
+    (directory / "server1.yaml").write_text(SERVER_YAML.format(port=2302))
+    (directory / "server2.yaml").write_text(SERVER_YAML.format(port=2402))
+    return directory
+
+@pytest.fixture
+def yaml_loads(monkeypatch):
+    loads = []
+    original = config_loader.load_yaml
+    monkeypatch.setattr(config_loader, "load_yaml", lambda path: loads.append(path.name) or original(path))
+    return loads
+
+def load(config_dir):
+    return config_loader.load_configs(str(config_dir), config_dir.parent / "cache")
+
+def bump(path, text):
+    # A new mtime even on filesystems with coarse timestamps
+    path.write_text(text)
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 2_000_000_000))
+
+def test_unchanged_configs_come_from_the_cache(config_dir, yaml_loads):
+    raw, required, models = load(config_dir)
+    assert len(yaml_loads) == 5
+    yaml_loads.clear()
+
+    cached_raw, cached_required, cached_models = load(config_dir)
+    assert yaml_loads == []
+    assert cached_raw == raw and cached_required == required
+    assert [m.model_dump() for m in cached_models] == [m.model_dump() for m in models]
+    assert cached_models[1].server.port == 2402
+    # Callers get their own copies to modify
+    cached_raw[0]["output"] = {"to_discord": False}
+    assert "output" not in load(config_dir)[0][0]
+
+def test_cache_file_is_private(config_dir):
+    load(config_dir)
+    cache_file = config_loader.config_cache_path(config_dir, config_dir.parent / "cache")
+    assert cache_file.exists()
+    if os.name == "posix":
+        assert cache_file.stat().st_mode & 0o077 == 0
+
+def test_edited_and_added_files_invalidate_the_cache(config_dir, yaml_loads):
+    load(config_dir)
+    bump(config_dir / "server2.yaml", SERVER_YAML.format(port=2502))
+    yaml_loads.clear()
+    raw, _, models = load(config_dir)
+    assert yaml_loads
+    assert models[1].server.port == 2502
+
+    (config_dir / "server3.yaml").write_text(SERVER_YAML.format(port=2602))
+    raw, _, models = load(config_dir)
+    assert [c["_config_file"] for c in raw] == ["server1.yaml", "server2.yaml", "server3.yaml"]
+
+def test_secrets_and_env_invalidate_the_cache(config_dir, monkeypatch):
+    assert load(config_dir)[0][0]["steam"]["api_key"] == "from-defaults"
+    monkeypatch.setenv("STEAM_API_KEY", "from-env")
+    assert load(config_dir)[0][0]["steam"]["api_key"] == "from-env"
+    monkeypatch.setenv("STEAM_API_URL", "http://127.0.0.1:1/api")
+    assert load(config_dir)[0][0]["steam"]["api_url"] == "http://127.0.0.1:1/api"
+
+    secrets = config_dir.parent / "secrets"
+    secrets.mkdir()
+    (secrets / "DISCORD_WEBHOOK_URL").write_text("https://example.invalid/secret-hook\n")
+    assert load(config_dir)[0][0]["discord"]["webhook_url"] == "https://example.invalid/secret-hook"
+    (secrets / "DISCORD_WEBHOOK_URL").write_text("https://example.invalid/rotated\n")
+    assert load(config_dir)[0][0]["discord"]["webhook_url"] == "https://example.invalid/rotated"
+
+def test_validation_errors_are_logged_on_every_load(config_dir, yaml_loads, caplog):
+    (config_dir / "broken.yaml").write_text("server:\n  ip: 127.0.0.1\n  port: not-a-port\n")
+    with caplog.at_level(logging.ERROR):
+        _, _, models = load(config_dir)
+        yaml_loads.clear()
+        _, _, cached_models = load(config_dir)
+    assert yaml_loads == []
+    assert len(models) == len(cached_models) == 2
+    assert len([r for r in caplog.records if "broken.yaml" in r.getMessage()]) == 2
+
+def test_corrupt_or_disabled_cache_falls_back_to_parsing(config_dir, yaml_loads):
+    load(config_dir)
+    config_loader.config_cache_path(config_dir, config_dir.parent / "cache").write_bytes(b"not a pickle")
+    yaml_loads.clear()
+    assert len(load(config_dir)[2]) == 2
+    assert yaml_loads
+
+    yaml_loads.clear()
+    config_loader.load_configs(str(config_dir), None)
+    assert len(yaml_loads) == 5
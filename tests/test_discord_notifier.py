@@ -0,0 +1,200 @@
+# DayZ Server Monitor
+# Project: DayZ Server Monitor
+# File: tests/test_discord_notifier.py
+# Purpose: Discord delivery: splitting at line boundaries, embeds, rate-limit buckets, background sending from
+#          the durable outbox, retries and deduplication
+# Author: Tig Campbell-Moore (firstname[at]lastname[dot]com)
+# License: CC BY-NC 4.0 (see LICENSE file)
+
+import time
+import requests
+from src import discord_notifier
+from src import mod_checker
+from src.discord_outbox import Outbox
+from src.discord_notifier import DiscordSender, WebhookRateLimits
+from tests.fakes.discord_webhook import FakeDiscordWebhook
+
+def summary(lines=300):
+    return "\n".join(f"Mod {n} updated: fixed things in build {n}" for n in range(lines))
+
+def test_split_message_breaks_between_lines():
+    text = summary()
+    chunks = discord_notifier.split_message(text, 2000)
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 2000 for chunk in chunks)
+    assert "\n".join(chunks) == text
+
+def test_split_message_wraps_overlong_lines():
+    chunks = discord_notifier.split_message("short\n" + "word " * 1000 + "\n\nend", 100)
+    assert all(0 < len(chunk) <= 100 for chunk in chunks)
+    assert chunks[0] == "short"
+    assert chunks[-1] == "end"
+    assert discord_notifier.split_message("x" * 250, 100) == ["x" * 100, "x" * 100, "x" * 50]
+    assert discord_notifier.split_message("\n \n", 100) == []
+
+def test_embeds_respect_per_message_limits():
+    settings = dict(discord_notifier.DEFAULT_DISCORD_SETTINGS, use_embeds=True)
+    payloads = discord_notifier.build_payloads(summary(1500), settings)
+    for payload in payloads:
+        descriptions = [embed["description"] for embed in payload["embeds"]]
+        assert len(descriptions) <= discord_notifier.EMBEDS_PER_MESSAGE
+        assert sum(map(len, descriptions)) <= discord_notifier.EMBED_TOTAL_LIMIT
+        assert all(len(d) <= discord_notifier.EMBED_DESCRIPTION_LIMIT for d in descriptions)
+    text = "\n".join(embed["description"] for payload in payloads for embed in payload["embeds"])
+    assert text == summary(1500)
+
+def test_rate_limit_bucket_holds_until_reset():
+    now = [100.0]
+    limits = WebhookRateLimits(clock=lambda: now[0])
+    url = "https://discord.test/webhook"
+    assert limits.wait_time(url) == 0
+    limits.update(url, {"X-RateLimit-Bucket": "b", "X-RateLimit-Remaining": "0", "X-RateLimit-Reset-After": "2.5"})
+    assert limits.wait_time(url) == 2.5
+    now[0] += 3
+    assert limits.wait_time(url) == 0
+    assert limits.throttled(url, {}, {"retry_after": 1.5, "global": True}) == 1.5
+    assert limits.wait_time("https://discord.test/other") == 1.5
+
+FAST_RETRIES = dict(discord_notifier.DEFAULT_DISCORD_SETTINGS, retry_base_seconds=0.01)
+
+def test_long_summary_is_delivered_in_order_within_rate_limits(tmp_path):
+    with FakeDiscordWebhook(limit=3, reset_after=0.2) as webhook:
+        outbox = Outbox(tmp_path / "outbox.sqlite3")
+        sender = DiscordSender(outbox)
+        payloads = discord_notifier.build_payloads(summary(600))
+        assert len(payloads) > 6
+        assert outbox.enqueue(webhook.url, payloads) == len(payloads)
+        assert sender.flush(timeout=10)
+        sender.close(0)
+    assert webhook.payloads == payloads
+    # The bucket headers keep the sender within the limit instead of running into 429s
+    assert webhook.throttled == 0
+    assert outbox.counts() == {"pending": 0, "sending": 0, "sent": len(payloads), "failed": 0}
+
+def test_retries_throttled_and_failed_posts():
+    with FakeDiscordWebhook(limit=1, reset_after=0.5) as webhook:
+        # Another client uses up the bucket, so the retry after the 502 meets a 429
+        assert requests.post(webhook.url, json={"content": "other"}).status_code == 204
+        webhook.fail_first = 1
+        payloads = [{"content": "one"}, {"content": "two"}]
+        assert discord_notifier.deliver(webhook.url, payloads, WebhookRateLimits(), FAST_RETRIES)
+    assert webhook.payloads[1:] == payloads
+    assert (webhook.failed, webhook.throttled) == (1, 1)
+
+def test_webhook_post_is_not_resent_by_the_http_layer():
+    with FakeDiscordWebhook(fail_first=1, fail_status=503) as webhook:
+        # The 503 may follow a delivered post: only the outbox decides whether to send it again
+        assert discord_notifier.post_once(webhook.url, {"content": "one"}, WebhookRateLimits())[0] == "retry"
+    assert webhook.requests == 1 and not webhook.payloads
+
+def test_dispatch_returns_without_waiting_for_the_webhook(tmp_path, monkeypatch):
+    sender = DiscordSender(Outbox(tmp_path / "outbox.sqlite3"))
+    monkeypatch.setattr(discord_notifier, "_sender", sender)
+    with FakeDiscordWebhook(latency=0.5) as webhook:
+        config = {"discord": {"enabled": True, "webhook_url": webhook.url}}
+        started = time.perf_counter()
+        discord_notifier.dispatch_discord(config, "first")
+        discord_notifier.dispatch_discord(config, "second")
+        assert time.perf_counter() - started < 0.3
+        assert sender.outbox.count_pending() > 0
+        discord_notifier.close(timeout=10)
+    assert [p["content"] for p in webhook.payloads] == ["first", "second"]
+    assert sender.outbox.count_pending() == 0
+
+def test_outbox_deduplicates_summaries(tmp_path):
+    outbox = Outbox(tmp_path / "outbox.sqlite3")
+    url = "https://discord.test/webhook"
+    assert outbox.enqueue(url, [{"content": "no changes"}]) == 1
+    # An identical summary is not queued twice while the first is pending, but is again once it was sent
+    assert outbox.enqueue(url, [{"content": "no changes"}]) == 0
+    outbox.mark_sent(outbox.head(url)["id"])
+    assert outbox.enqueue(url, [{"content": "no changes"}]) == 1
+    # A keyed change summary stays deduplicated for the window, whatever its text
+    assert outbox.enqueue(url, [{"content": "A updated"}], "server:abc", dedup_window=3600) == 1
+    assert outbox.enqueue(url, [{"content": "A updated (again)"}], "server:abc", dedup_window=3600) == 0
+    for row in outbox.list("pending"):
+        outbox.mark_sent(row["id"])
+    assert outbox.enqueue(url, [{"content": "A updated"}], "server:abc", dedup_window=3600) == 0
+    assert outbox.enqueue(url, [{"content": "A updated"}], "server:abc", now=time.time() + 7200) == 1
+
+def test_change_key_identifies_the_changes():
+    mods = {"1": {"time_updated": 5}, "2": {"time_updated": 7}}
+    key = mod_checker.change_key("srv", {"1": "updated", "2": "new"}, mods, {"3"})
+    assert key == mod_checker.change_key("srv", {"2": "new", "1": "updated"}, mods, {"3"})
+    assert key != mod_checker.change_key("srv", {"1": "updated", "2": "new"}, dict(mods, **{"1": {"time_updated": 6}}), {"3"})
+    assert key != mod_checker.change_key("other", {"1": "updated", "2": "new"}, mods, {"3"})
+    assert mod_checker.change_key("srv", {}, mods, set()) is None
+
+def test_failed_post_stays_in_the_outbox_until_delivered(tmp_path):
+    path = tmp_path / "outbox.sqlite3"
+    with FakeDiscordWebhook(fail_first=1) as webhook:
+        webhook.fail_status = 500
+        sender = DiscordSender(Outbox(path), dict(FAST_RETRIES, retry_base_seconds=60))
+        sender.outbox.enqueue(webhook.url, [{"content": "update"}])
+        # The post failed and is rescheduled a minute out, so there is nothing due within the timeout
+        assert sender.flush(timeout=0.5)
+        sender.close(0)
+        (row,) = Outbox(path).list()
+        assert (row["status"], row["attempts"], row["last_error"]) == ("pending", 1, "status 500: ")
+
+        # A later run (here: the CLI's flush) picks it up from the file
+        outbox = Outbox(path)
+        outbox.reschedule_pending()
+        sender = DiscordSender(outbox)
+        assert sender.flush(timeout=10)
+        sender.close(0)
+    assert webhook.payloads == [{"content": "update"}]
+    assert outbox.counts()["sent"] == 1
+
+def test_post_is_given_up_after_max_retries(tmp_path):
+    with FakeDiscordWebhook(fail_first=5) as webhook:
+        webhook.fail_status = 500
+        sender = DiscordSender(Outbox(tmp_path / "outbox.sqlite3"), dict(FAST_RETRIES, max_retries=2))
+        sender.outbox.enqueue(webhook.url, [{"content": "a"}])
+        sender.outbox.enqueue(webhook.url, [{"content": "b"}])
+        assert sender.flush(timeout=10)
+        sender.close(0)
+    (failed,) = sender.outbox.list("failed")
+    assert (failed["attempts"], failed["payload"]) == (3, '{"content": "a"}')
+    # The next post of the webhook is not blocked by the one that failed
+    assert webhook.payloads == [{"content": "b"}]
+
+def test_overlapping_processes_send_each_post_once(tmp_path):
+    path = tmp_path / "outbox.sqlite3"
+    payloads = [{"content": f"part {n}"} for n in range(12)]
+    with FakeDiscordWebhook(limit=100, latency=0.05) as webhook:
+        Outbox(path).enqueue(webhook.url, payloads)
+        # E.g. a cron run still draining at exit while the next run starts: separate connections to one file
+        senders = [DiscordSender(Outbox(path), FAST_RETRIES) for _ in range(2)]
+        for sender in senders:
+            sender.wake()
+        for sender in senders:
+            assert sender.flush(timeout=20)
+            sender.close(0)
+    assert webhook.payloads == payloads
+
+def test_claims_are_exclusive_until_the_lease_expires(tmp_path):
+    outbox = Outbox(tmp_path / "outbox.sqlite3")
+    url = "http://127.0.0.1:1/api/webhooks/1/token"
+    outbox.enqueue(url, [{"content": "a"}], now=1000.0)
+    row_id = outbox.head(url)["id"]
+    assert outbox.claim(row_id, lease=60, now=1000.0)
+    assert not Outbox(outbox.path).claim(row_id, lease=60, now=1030.0)
+    assert outbox.head(url)["status"] == "sending"
+    assert outbox.count_pending() == 1
+    # The claiming process died: the post is reclaimed once its lease is over
+    assert Outbox(outbox.path).claim(row_id, lease=60, now=1061.0)
+    outbox.mark_sent(row_id)
+    assert not outbox.claim(row_id, now=2000.0)
+
+def test_failed_part_fails_the_rest_of_its_summary(tmp_path):
+    outbox = Outbox(tmp_path / "outbox.sqlite3")
+    url = "http://127.0.0.1:1/api/webhooks/1/token"
+    outbox.enqueue(url, [{"content": f"part {n}"} for n in range(1, 4)], "server:abc")
+    outbox.enqueue(url, [{"content": "next summary"}], "server:def")
+    first = outbox.head(url)
+    outbox.mark_sent(first["id"])
+    second = outbox.head(url)
+    assert outbox.mark_failed(second["id"], "status 400") == 2
+    assert [row["status"] for row in outbox.list(None)] == ["sent", "failed", "failed", "pending"]
+    assert outbox.head(url)["payload"] == {"content": "next summary"}
@@ -0,0 +1,79 @@
+# DayZ Server Monitor
+# Project: DayZ Server Monitor
+# File: tests/test_fake_steam_server.py
+# Purpose: Mod check modes and the steam_api lookup helpers against the local Steam stand-in (steam.api_url),
+#          including 429 throttling, and server queries against the local A2S stand-in (query.host / query.port)
+# Author: Tig Campbell-Moore (firstname[at]lastname[dot]com)
+# License: CC BY-NC 4.0 (see LICENSE file)
+
+import pytest
+from src import config_loader
+from src import http_session
+from src import mod_resolver
+from src import rate_limiter
+from src import server_query
+from src import steam_api
+from tests.fakes.a2s_server import FakeA2SCluster
+from tests.fakes.steam_server import FakeSteamServer, make_item
+
+@pytest.fixture
+def fake_steam():
+    with FakeSteamServer(latency=0.01, jitter=0.005, seed=1) as server:
+        yield server
+
+@pytest.mark.parametrize("mode", ["serial", "threaded", "async"])
+def test_modes_resolve_against_stand_in(fake_steam, mode):
+    config = {
+        "mods": {"mod_check_mode": mode, "steam_batch_size": 7},
+        "steam": {"cache_enabled": False, "api_url": fake_steam.url},
+    }
+    mods = [{"name": f"Mod {i}", "workshop_id": str(500 + i)} for i in range(20)]
+
+    results = mod_resolver.fetch_mod_details(config, None, mods)
+
+    assert [r["workshop_id"] for r in results] == [m["workshop_id"] for m in mods]
+    assert [r["time_updated"] for r in results] == [make_item(m["workshop_id"])["time_updated"] for m in mods]
+    stats = fake_steam.stats()
+    assert (stats["requests"], stats["items"], stats["errors"]) == (3, 20, 0)
+    assert stats["latency_p50_ms"] >= 5
+
+def test_lookup_helpers_use_the_stand_in(fake_steam):
+    api_url = steam_api.get_api_url({"steam": {"api_url": fake_steam.url}})
+    details = steam_api.get_mod_info_batch(["501", "502", "503"], batch_size=2, api_url=api_url)
+    assert sorted(details) == ["501", "502", "503"]
+    assert steam_api.get_mod_info("504", api_url=api_url)["time_updated"] == make_item("504")["time_updated"]
+    assert fake_steam.stats()["requests"] == 3
+
+def test_throttled_requests_leave_mods_unresolved():
+    # With no retries left, a throttled batch is given up
+    http_session.configure({"http": {"max_retries": 0}})
+    rate_limiter.configure({"steam": {"max_retries": 0}})
+    try:
+        with FakeSteamServer(throttle_rate=1.0, retry_after=7) as server:
+            config = {"mods": {"mod_check_mode": "serial"}, "steam": {"cache_enabled": False, "api_url": server.url}}
+            results = mod_resolver.fetch_mod_details(config, None, [{"name": "CF", "workshop_id": "1559212036"}])
+            assert results == []
+            assert server.stats()["throttled"] == 1
+    finally:
+        http_session.configure({})
+        rate_limiter.configure({})
+
+def test_api_url_env_override(monkeypatch):
+    monkeypatch.setenv("STEAM_API_URL", "http://127.0.0.1:1/fake")
+    config = {"steam": {"api_url": "http://example.invalid/"}}
+    config_loader.apply_secrets_and_env_overrides(config)
+    assert config["steam"]["api_url"] == "http://127.0.0.1:1/fake"
+
+def test_query_servers_against_a2s_stand_in():
+    mod_lists = [[("1559212036", "CF"), ("1564026768", "Community-Online-Tools")], [(str(2000000000 + i), f"Mod {i}") for i in range(200)]]
+    with FakeA2SCluster(mod_lists) as cluster:
+        configs = [
+            {"server": {"ip": "10.0.0.1", "port": 2302}, "query": {"host": host, "port": port}}
+            for host, port in cluster.addresses
+        ]
+        targets = [(*server_query.get_query_target(config), 2.0) for config in configs]
+        results = server_query.query_servers(targets)
+
+    for (info, mods), expected in zip(results, mod_lists):
+        assert info["island"] == "chernarusplus"
+        assert [(mod["workshop_id"], mod["name"]) for mod in mods] == expected
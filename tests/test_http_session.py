@@ -0,0 +1,77 @@
+# DayZ Server Monitor
+# Project: DayZ Server Monitor
+# File: tests/test_http_session.py
+# Purpose: Unit tests for the shared pooled HTTP session and its connection-reuse counters
+# Author: Tig Campbell-Moore (firstname[at]lastname[dot]com)
+# License: CC BY-NC 4.0 (see LICENSE file)
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from src import http_session
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        # Always unavailable: counts how often the client sends the same post
+        self.server.posts += 1
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self.send_response(503)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def http_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    server.posts = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def local_server(http_server):
+    return f"http://127.0.0.1:{http_server.server_address[1]}/"
+
+def test_connections_are_reused(local_server):
+    http_session.close()
+    before = http_session.get_stats()
+    session = http_session.get_session()
+    for _ in range(3):
+        assert session.get(local_server, timeout=5).text == "ok"
+    after = http_session.get_stats()
+    assert after["requests"] - before["requests"] == 3
+    assert after["connections"] - before["connections"] == 1
+    assert after["reused"] - before["reused"] == 2
+
+def test_configure_rebuilds_session_and_keeps_counters(local_server):
+    session = http_session.get_session()
+    session.get(local_server, timeout=5)
+    before = http_session.get_stats()
+    http_session.configure({"http": {"pool_maxsize": 4}})
+    assert http_session.get_session() is not session
+    assert http_session.get_stats() == before
+    http_session.configure({})
+
+def test_posts_are_only_retried_when_safe(http_server, local_server):
+    http_session.configure({"http": {"max_retries": 2, "backoff_factor": 0}})
+    try:
+        assert http_session.get_session().post(local_server, data=b"x", timeout=5).status_code == 503
+        assert http_server.posts == 3
+        # Not safe to repeat (e.g. a Discord webhook post): one attempt, the caller decides
+        assert http_session.get_session(retry_posts=False).post(local_server, data=b"x", timeout=5).status_code == 503
+        assert http_server.posts == 4
+    finally:
+        http_session.configure({})
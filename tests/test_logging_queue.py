@@ -0,0 +1,66 @@
+# DayZ Server Monitor
+# Project: DayZ Server Monitor
+# File: tests/test_logging_queue.py
+# Purpose: Queue-based logging: records from worker threads reach the per-level files via the listener,
+#          and everything is written once the queue is drained
+# Author: Tig Campbell-Moore (firstname[at]lastname[dot]com)
+# License: CC BY-NC 4.0 (see LICENSE file)
+
+import logging
+import threading
+import pytest
+from logging.handlers import QueueHandler
+from src import logger
+
+@pytest.fixture
+def restore_root_logging():
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    yield
+    logger.stop_queue_logging()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(level)
+
+def test_queue_mode_writes_from_listener(tmp_path, restore_root_logging):
+    config = {"logging": {"enabled": True, "level": "INFO", "log_dir": str(tmp_path), "queue": True}}
+    logger.setup_logging(config)
+    root = logging.getLogger()
+    assert [type(h) for h in root.handlers] == [logger._EnqueueHandler]
+
+    def worker(index):
+        for n in range(50):
+            logging.info("worker %d line %d", index, n)
+        try:
+            raise ValueError(f"boom {index}")
+        except ValueError:
+            logging.exception(f"failed in worker {index}")
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    logger.stop_queue_logging()
+
+    info = (tmp_path / "info.log").read_text()
+    error = (tmp_path / "error.log").read_text()
+    assert info.count(" line ") == 200
+    assert "worker 3 line 49" in info
+    assert error.count("Traceback") == 4 and "ValueError: boom 2" in error
+    assert "boom" not in info
+
+    # After the listener stopped, the real handlers are back on the root logger
+    assert not any(isinstance(h, QueueHandler) for h in root.handlers)
+    logging.error("after shutdown")
+    for handler in root.handlers:
+        handler.flush()
+    assert "after shutdown" in (tmp_path / "error.log").read_text()
+
+def test_direct_mode_is_the_default(tmp_path, restore_root_logging):
+    logger.setup_logging({"logging": {"enabled": True, "level": "INFO", "log_dir": str(tmp_path)}})
+    assert not any(isinstance(h, QueueHandler) for h in logging.getLogger().handlers)
+    assert logger._listener is None
@@ -0,0 +1,195 @@
+# DayZ Server Monitor
+# Project: DayZ Server Monitor
+# File: tests/test_mod_check_flow.py
+# Purpose: End-to-end run_mod_check test with the server query and Steam lookups stubbed out, and concurrent
+#          server runs: output grouped per server and released in config order, failures isolated
+# Author: Tig Campbell-Moore (firstname[at]lastname[dot]com)
+# License: CC BY-NC 4.0 (see LICENSE file)
+
+import logging
+import time
+from pathlib import Path
+import pytest
+import monitor
+from src import discord_notifier
+from src import mod_checker
+from src import output_handler
+from src import server_query
+from src import steam_api
+from src.templates import TemplateLoader
+
+LOCALES = Path(__file__).resolve().parent.parent / "locales"
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+def make_config():
+    return {
+        "server_name": "flow_test",
+        "server": {"ip": "127.0.0.1", "port": 2302},
+        "mods": {"mod_check_mode": "serial", "max_changelog_lines": 2, "changelog_source": "description"},
+        "output": {"to_console": False, "to_discord": False},
+        "steam": {"cache_enabled": False},
+    }
+
+def test_changelog_uses_description_from_mode_results(workdir, monkeypatch):
+    mods = [{"name": "Alpha", "workshop_id": "1"}, {"name": "Beta", "workshop_id": "2"}]
+    monkeypatch.setattr(server_query, "query_server", lambda ip, port, timeout=None: ({"island": "chernarusplus"}, mods))
+
+    calls = []
+    def fetch(batch, api_url=None):
+        calls.append(list(batch))
+        return {wid: steam_api.details_to_info({
+            "publishedfileid": wid,
+            "title": f"Mod {wid}",
+            "time_updated": 100,
+            "description": f"[b]Changes for {wid}[/b]\nline two\nline three",
+        }) for wid in batch}
+    monkeypatch.setattr(steam_api, "fetch_batch", fetch)
+
+    templates = TemplateLoader("en_GB", base_path=LOCALES)
+    wids, stats = mod_checker.run_mod_check(make_config(), templates)
+
+    assert sorted(wids) == ["1", "2"]
+    assert stats["mod_count"] == 2
+    # One batched lookup; changelogs are rendered from the same records
+    assert calls == [["1", "2"]]
+    summary = output_handler.get_all_output()
+    assert "**Changes for 1**" in summary
+    assert "line three" not in summary
+
+def test_cycle_resolves_shared_workshop_ids_once(workdir, monkeypatch):
+    server_mods = {
+        2302: [{"name": "Alpha", "workshop_id": "1"}, {"name": "Beta", "workshop_id": "2"}],
+        2402: [{"name": "Beta", "workshop_id": "2"}, {"name": "Gamma", "workshop_id": "3"}],
+    }
+    monkeypatch.setattr(server_query, "query_servers", lambda targets, max_concurrent=None: [
+        ({"island": "chernarusplus"}, server_mods[port]) for _, port, _ in targets
+    ])
+
+    calls = []
+    def fetch(batch, api_url=None):
+        calls.append(sorted(batch))
+        return {wid: steam_api.details_to_info({"publishedfileid": wid, "title": f"Mod {wid}", "time_updated": 1})
+                for wid in batch}
+    monkeypatch.setattr(steam_api, "fetch_batch", fetch)
+    monkeypatch.setattr(monitor, "get_templates", lambda locale: TemplateLoader("en_GB", base_path=LOCALES))
+
+    servers = []
+    for port in server_mods:
+        config = make_config()
+        config["server_name"] = f"server_{port}"
+        config["server"] = {"ip": "127.0.0.1", "port": port}
+        servers.append((config, None))
+    monitor.run_servers(servers, {}, max_workers=2)
+
+    assert calls == [["1", "2", "3"]]
+    from src.server_monitor_tracker import load_mod_tracking
+    assert sorted(load_mod_tracking("server_2302")) == ["1", "2"]
+    assert sorted(load_mod_tracking("server_2402")) == ["2", "3"]
+
+def test_failed_lookup_is_not_reported_as_removed(workdir, monkeypatch):
+    mods = [{"name": "Alpha", "workshop_id": "1"}, {"name": "Beta", "workshop_id": "2"}]
+    monkeypatch.setattr(server_query, "query_server", lambda ip, port, timeout=None: ({"island": "chernarusplus"}, mods))
+    failing = set()
+    def fetch(batch, api_url=None):
+        return {wid: steam_api.details_to_info({"publishedfileid": wid, "title": f"Mod {wid}", "time_updated": 100})
+                for wid in batch if wid not in failing}
+    monkeypatch.setattr(steam_api, "fetch_batch", fetch)
+    config = make_config()
+    config["mods"]["steam_batch_size"] = 1
+    templates = TemplateLoader("en_GB", base_path=LOCALES)
+
+    with output_handler.output_buffer():
+        mod_checker.run_mod_check(config, templates)
+    failing.add("2")
+    with output_handler.output_buffer():
+        wids, _ = mod_checker.run_mod_check(config, templates)
+        summary = output_handler.get_all_output()
+
+    assert sorted(wids) == ["1", "2"]
+    assert "Mod removed" not in summary
+    from src.server_monitor_tracker import load_mod_tracking
+    assert load_mod_tracking("flow_test")["2"]["time_updated"] == 100
+
+@pytest.fixture
+def concurrent_servers(workdir, monkeypatch):
+    """
+    Three servers, each with its own two mods. The first in config order answers its query last.
+    Returns (servers, finished, posted): completion order and Discord summaries by server name.
+    """
+    delays = {2302: 0.4, 2402: 0.2, 2502: 0.0}
+    def query_server(ip, port, timeout=None):
+        time.sleep(delays[port])
+        return {"island": "chernarusplus"}, [{"name": f"Mod {port}{n}", "workshop_id": f"{port}{n}"} for n in (1, 2)]
+    monkeypatch.setattr(server_query, "query_server", query_server)
+    monkeypatch.setattr(steam_api, "fetch_batch", lambda batch, api_url=None: {
+        wid: steam_api.details_to_info({"publishedfileid": wid, "title": f"Mod {wid}", "time_updated": 1}) for wid in batch
+    })
+    monkeypatch.setattr(monitor, "get_templates", lambda locale: TemplateLoader("en_GB", base_path=LOCALES))
+
+    finished = []
+    run_mod_check = mod_checker.run_mod_check
+    def tracked_run_mod_check(config, *args, **kwargs):
+        result = run_mod_check(config, *args, **kwargs)
+        finished.append(config["server_name"])
+        return result
+    monkeypatch.setattr(mod_checker, "run_mod_check", tracked_run_mod_check)
+    posted = []
+    monkeypatch.setattr(discord_notifier, "dispatch_discord", lambda config, message, key=None: posted.append(
+        (config["server_name"], message)
+    ))
+
+    servers = []
+    for port in delays:
+        config = make_config()
+        config["server_name"] = f"server_{port}"
+        config["server"] = {"ip": "127.0.0.1", "port": port}
+        config["output"] = {"to_console": True, "to_discord": True}
+        # Each server is queried from its own worker
+        config["query"] = {"engine": "dayzquery"}
+        servers.append((config, None))
+    return servers, finished, posted
+
+def test_concurrent_servers_release_output_in_config_order(concurrent_servers, caplog):
+    servers, finished, posted = concurrent_servers
+    with caplog.at_level(logging.INFO):
+        monitor.run_servers(servers, {}, max_workers=3)
+
+    assert finished == ["server_2502", "server_2402", "server_2302"]
+    assert [name for name, _ in posted] == ["server_2302", "server_2402", "server_2502"]
+    # Each summary holds exactly its own server's mods
+    for name, message in posted:
+        port = name.split("_")[1]
+        assert f"Mod {port}1" in message and f"Mod {port}2" in message
+        assert sum(f"Mod {other}" in message for other in (2302, 2402, 2502)) == 1
+    summaries = [r.getMessage() for r in caplog.records if "Summary for" in r.getMessage()]
+    assert [text.split("Summary for ")[1].split("*")[0] for text in summaries] == [
+        "server_2302", "server_2402", "server_2502"
+    ]
+
+def test_failing_server_does_not_stop_the_others(concurrent_servers, monkeypatch):
+    servers, finished, posted = concurrent_servers
+    # The first server fails outside its mod check (the worker itself raises)...
+    servers[0][0]["locale"] = "broken"
+    get_templates = monitor.get_templates
+    def failing_templates(locale):
+        if locale == "broken":
+            raise RuntimeError("no such locale")
+        return get_templates(locale)
+    monkeypatch.setattr(monitor, "get_templates", failing_templates)
+    # ...and the second one inside it
+    query_server = server_query.query_server
+    def failing_query(ip, port, timeout=None):
+        if port == 2402:
+            raise RuntimeError("query failed")
+        return query_server(ip, port, timeout)
+    monkeypatch.setattr(server_query, "query_server", failing_query)
+
+    monitor.run_servers(servers, {}, max_workers=3)
+    assert sorted(finished) == ["server_2402", "server_2502"]
+    assert [name for name, _ in posted] == ["server_2502"]
+    from src.server_monitor_tracker import load_mod_tracking
+    assert sorted(load_mod_tracking("server_2502")) == ["25021", "25022"]
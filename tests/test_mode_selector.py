@@ -0,0 +1,107 @@
+# DayZ Server Monitor
+# Project: DayZ Server Monitor
+# File: tests/test_mode_selector.py
+# Purpose: mod_check_mode auto: exploring untried modes, picking the fastest for the mod count, re-probing,
+#          ignoring runs served mostly from the Steam cache
+# Author: Tig Campbell-Moore (firstname[at]lastname[dot]com)
+# License: CC BY-NC 4.0 (see LICENSE file)
+
+import random
+import pytest
+from src import mode_selector, mod_resolver, perf_store
+from src.mode_selector import Arm
+
+CONFIG = {"mods": {"mod_check_mode": "auto", "auto_concurrency_levels": [4, 10], "auto_probe_rate": 0.0}}
+
+def history(arm, seconds, mod_count=100, runs=3, fetched_count=None):
+    records = [
+        {"check_mode": arm.mode, "concurrency": arm.concurrency, "fetch_seconds": seconds, "mod_count": mod_count}
+        for _ in range(runs)
+    ]
+    if fetched_count is not None:
+        for record in records:
+            record["fetched_count"] = fetched_count
+    return records
+
+def test_untried_arms_are_explored_first():
+    records = history(Arm("serial", 1), 5.0) + history(Arm("threaded", 4), 1.0)
+    arm, reason, _ = mode_selector.select(CONFIG, records, 100)
+    assert (arm, reason) == (Arm("threaded", 10), "explore")
+
+def test_fastest_arm_for_similar_mod_count_wins():
+    records = (
+        history(Arm("serial", 1), 0.2, mod_count=10)
+        + history(Arm("serial", 1), 9.0, mod_count=1000)
+        + history(Arm("threaded", 4), 0.5, mod_count=1000)
+        + history(Arm("threaded", 10), 0.4, mod_count=1000)
+        + history(Arm("async", 4), 0.6, mod_count=1000)
+        + history(Arm("async", 10), 0.3, mod_count=1000)
+    )
+    assert mode_selector.select(CONFIG, records, 1000)[0] == Arm("async", 10)
+    # A small server only looks at small runs, where serial is quickest
+    small = records + history(Arm("serial", 1), 0.2, mod_count=10)
+    for arm in mode_selector.get_arms(CONFIG)[1:]:
+        small += history(arm, 0.25, mod_count=10)
+    assert mode_selector.select(CONFIG, small, 10)[0] == Arm("serial", 1)
+
+def test_estimate_scales_by_request_rounds_when_no_similar_runs():
+    records = history(Arm("serial", 1), 1.0, mod_count=100) + history(Arm("async", 4), 1.0, mod_count=400)
+    assert mode_selector.estimate(records, Arm("serial", 1), 1000) == pytest.approx(10.0)
+    # 10 batches over 4 connections take 3 rounds, 4 batches take 1
+    assert mode_selector.estimate(records, Arm("async", 4), 1000) == pytest.approx(3.0)
+    assert mode_selector.estimate(records, Arm("async", 10), 1000) is None
+
+def test_runs_served_from_the_cache_do_not_make_an_arm_win():
+    records = []
+    for arm, seconds in zip(mode_selector.get_arms(CONFIG), [5.0, 3.0, 3.0, 3.0, 2.0]):
+        records += history(arm, seconds, fetched_count=100)
+    # async x4 then ran while the cache was warm: once with every mod cached, twice with most of them
+    records += history(Arm("async", 4), 0.01, fetched_count=0, runs=1)
+    records += history(Arm("async", 4), 0.05, fetched_count=5, runs=2)
+    assert mode_selector.estimate(records, Arm("async", 4), 100) == pytest.approx(3.0)
+    assert mode_selector.select(CONFIG, records, 100)[0] == Arm("async", 10)
+    # Runs that fetched most of their mods count by the mods fetched
+    records += history(Arm("async", 4), 0.5, fetched_count=60)
+    assert mode_selector.estimate(records, Arm("async", 4), 60) == pytest.approx(0.5)
+
+def test_probe_picks_a_non_best_arm():
+    records = []
+    for arm, seconds in zip(mode_selector.get_arms(CONFIG), [5.0, 1.0, 2.0, 3.0, 4.0]):
+        records += history(arm, seconds)
+    config = {"mods": dict(CONFIG["mods"], auto_probe_rate=1.0)}
+    picks = {mode_selector.select(config, records, 100, random.Random(seed))[0] for seed in range(30)}
+    assert Arm("threaded", 4) not in picks
+    assert len(picks) > 1
+
+def test_apply_sets_mode_and_concurrency():
+    config = dict(CONFIG, threaded_mode={"max_workers": 10})
+    threaded = mode_selector.apply(config, Arm("threaded", 4))
+    assert threaded["mods"]["mod_check_mode"] == "threaded"
+    assert mode_selector.get_concurrency(threaded, "threaded") == 4
+    assert config["threaded_mode"]["max_workers"] == 10
+    assert mode_selector.get_concurrency(mode_selector.apply(config, Arm("async", 4)), "async") == 4
+
+def test_resolve_cycle_records_choice(tmp_path, monkeypatch):
+    monkeypatch.setattr(perf_store, "PERFORMANCE_DIR", tmp_path)
+    monkeypatch.setattr(perf_store, "_prepared", set())
+    monkeypatch.setattr(perf_store, "_compacted", {})
+    used = []
+
+    def fake_fetch(config, info, mods, mode=None):
+        used.append((mode, mode_selector.get_concurrency(config, mode)))
+        # Mod 1 comes from the Steam cache
+        return [
+            {"workshop_id": mod["workshop_id"], "time_updated": 1, "cached": mod["workshop_id"] == "1"} for mod in mods
+        ]
+    monkeypatch.setattr(mod_resolver, "fetch_mod_details", fake_fetch)
+
+    config = dict(CONFIG, steam={"cache_enabled": False})
+    query_results = [({}, [{"name": "A", "workshop_id": "1"}, {"name": "B", "workshop_id": "2"}])]
+    for _ in range(len(mode_selector.get_arms(config))):
+        assert set(mod_resolver.resolve_cycle(config, query_results)) == {"1", "2"}
+
+    assert used == [(arm.mode, arm.concurrency) for arm in mode_selector.get_arms(config)]
+    records = perf_store.tail(mod_resolver.CYCLE_PERF_STREAM, 10)
+    assert [(r["check_mode"], r["concurrency"], r["mod_count"], r["fetched_count"]) for r in records] == [
+        (arm.mode, arm.concurrency, 2, 1) for arm in mode_selector.get_arms(config)
+    ]
@@ -0,0 +1,56 @@
+# DayZ Server Monitor
+# Project: DayZ Server Monitor
+# File: tests/test_perf_store.py
+# Purpose: Append-only performance store: tail reads, legacy migration and compaction into daily aggregates
+# Author: Tig Campbell-Moore (firstname[at]lastname[dot]com)
+# License: CC BY-NC 4.0 (see LICENSE file)
+
+import json
+from datetime import date, timedelta
+import pytest
+from src import perf_store
+
+@pytest.fixture(autouse=True)
+def store_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(perf_store, "PERFORMANCE_DIR", tmp_path)
+    monkeypatch.setattr(perf_store, "_prepared", set())
+    monkeypatch.setattr(perf_store, "_compacted", {})
+    return tmp_path
+
+def test_tail_reads_across_segments(store_dir, monkeypatch):
+    monkeypatch.setattr(perf_store, "TAIL_BLOCK_SIZE", 64)
+    yesterday = date.today() - timedelta(days=1)
+    (store_dir / "srv_perf").mkdir()
+    perf_store._append_lines(perf_store._segment_path("srv_perf", yesterday), [{"run": n} for n in range(50)])
+    for n in range(50, 55):
+        perf_store.append("srv_perf", {"run": n})
+
+    assert [r["run"] for r in perf_store.tail("srv_perf", 3)] == [52, 53, 54]
+    assert [r["run"] for r in perf_store.tail("srv_perf", 20)] == list(range(35, 55))
+    assert len(perf_store.tail("srv_perf", 1000)) == 55
+
+def test_legacy_json_log_is_migrated_once(store_dir):
+    legacy = [{"timestamp": date.today().isoformat() + "T10:00:00", "duration_seconds": n} for n in range(3)]
+    (store_dir / "performance_log.json").write_text(json.dumps(legacy))
+
+    perf_store.append("performance_log", {"duration_seconds": 9})
+
+    assert not (store_dir / "performance_log.json").exists()
+    assert (store_dir / "performance_log.json.migrated").exists()
+    assert [r["duration_seconds"] for r in perf_store.tail("performance_log", 10)] == [0, 1, 2, 9]
+
+def test_old_segments_are_compacted_into_aggregates(store_dir):
+    old_day = date.today() - timedelta(days=40)
+    (store_dir / "srv_perf").mkdir()
+    perf_store._append_lines(perf_store._segment_path("srv_perf", old_day), [
+        {"check_mode": "serial", "duration_seconds": 1.0, "mod_count": 10},
+        {"check_mode": "serial", "duration_seconds": 3.0, "mod_count": 10},
+        {"check_mode": "async", "duration_seconds": 0.5, "mod_count": 10},
+    ])
+
+    assert perf_store.compact("srv_perf", retention_days=30) == 1
+    assert not perf_store._segment_path("srv_perf", old_day).exists()
+    aggregates = {a["check_mode"]: a for a in perf_store.load_aggregates("srv_perf")}
+    assert aggregates["serial"]["runs"] == 2
+    assert aggregates["serial"]["duration_seconds"] == {"avg": 2.0, "min": 1.0, "max": 3.0}
+    assert aggregates["async"]["date"] == old_day.isoformat()
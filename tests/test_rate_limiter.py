@@ -0,0 +1,83 @@
+# DayZ Server Monitor
+# Project: DayZ Server Monitor
+# File: tests/test_rate_limiter.py
+# Purpose: Shared Steam token bucket: rate and burst, Retry-After pauses, and 429 retries in every mode
+# Author: Tig Campbell-Moore (firstname[at]lastname[dot]com)
+# License: CC BY-NC 4.0 (see LICENSE file)
+
+import concurrent.futures
+import time
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+import pytest
+from src import http_session
+from src import mod_resolver
+from src import rate_limiter
+from src.rate_limiter import TokenBucket
+from tests.fakes.steam_server import FakeSteamServer
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def fast_retries():
+    http_session.configure({"http": {"max_retries": 0}})
+    rate_limiter.configure({"steam": {"rate_limit_per_second": 0, "max_retries": 20, "backoff_max_seconds": 0.05}})
+    yield
+    http_session.configure({})
+    rate_limiter.configure({})
+
+def test_bucket_allows_burst_then_spaces_requests():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=4, burst=2, clock=clock)
+    waits = [bucket.reserve() for _ in range(5)]
+    assert waits == pytest.approx([0, 0, 0.25, 0.5, 0.75])
+    # An idle second refills up to the burst size only
+    clock.now += 10
+    assert [bucket.reserve() for _ in range(3)] == pytest.approx([0, 0, 0.25])
+
+def test_pause_holds_every_caller():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=10, burst=5, clock=clock)
+    bucket.reserve()
+    bucket.pause(2.0)
+    assert bucket.reserve() == pytest.approx(2.0)
+    assert bucket.reserve() == pytest.approx(2.1)
+    clock.now += 3
+    assert bucket.reserve() == pytest.approx(0.0)
+
+def test_threads_share_the_rate():
+    bucket = TokenBucket(rate=50, burst=1)
+    start = time.monotonic()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(lambda _: bucket.acquire(), range(20)))
+    # 19 spaced slots at 50/s, however many threads ask at once
+    assert 0.35 <= time.monotonic() - start < 1.5
+
+def test_parse_retry_after():
+    assert rate_limiter.parse_retry_after("3") == 3.0
+    assert rate_limiter.parse_retry_after(None) is None
+    assert rate_limiter.parse_retry_after("soon") is None
+    later = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+    assert 25 <= rate_limiter.parse_retry_after(later) <= 30
+
+@pytest.mark.parametrize("mode", ["serial", "threaded", "async"])
+def test_throttled_lookups_are_retried_not_dropped(fast_retries, mode):
+    with FakeSteamServer(throttle_rate=0.5, retry_after=0, seed=3) as server:
+        config = {
+            "mods": {"mod_check_mode": mode, "steam_batch_size": 5},
+            "steam": {"cache_enabled": False, "api_url": server.url},
+        }
+        mods = [{"name": f"Mod {i}", "workshop_id": str(700 + i)} for i in range(40)]
+        results = mod_resolver.fetch_mod_details(config, None, mods)
+        stats = server.stats()
+
+    assert [r["workshop_id"] for r in results] == [m["workshop_id"] for m in mods]
+    assert stats["throttled"] > 0
+    # Every batch got through exactly once in the end
+    assert stats["requests"] - stats["throttled"] == 8
+    assert rate_limiter.get_limiter().pauses > 0
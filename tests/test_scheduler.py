@@ -0,0 +1,71 @@
+# DayZ Server Monitor
+# Project: DayZ Server Monitor
+# File: tests/test_scheduler.py
+# Purpose: Unit tests for the daemon-mode scheduler, and reloading the daemon's configs on SIGHUP
+# Author: Tig Campbell-Moore (firstname[at]lastname[dot]com)
+# License: CC BY-NC 4.0 (see LICENSE file)
+
+import os
+import signal
+import threading
+import time
+import pytest
+import monitor
+from src.scheduler import Scheduler
+
+def test_runs_due_jobs_and_stops():
+    scheduler = Scheduler()
+    scheduler.schedule("a", 60)
+    scheduler.schedule("b", 60, delay_seconds=3600)
+    seen = []
+
+    def run_due(keys):
+        seen.append(sorted(keys))
+        scheduler.stop()
+
+    scheduler.run(run_due)
+    assert seen == [["a"]]
+
+def test_stop_interrupts_wait():
+    scheduler = Scheduler()
+    scheduler.schedule("a", 3600, delay_seconds=3600)
+    threading.Timer(0.1, scheduler.stop).start()
+    started = time.monotonic()
+    scheduler.run(lambda keys: None)
+    assert time.monotonic() - started < 5
+
+def test_overrun_skips_missed_runs():
+    scheduler = Scheduler()
+    scheduler.schedule("a", 10)
+    first = scheduler._jobs["a"]["next_run"]
+    scheduler._advance("a", first + 35)
+    assert scheduler._jobs["a"]["next_run"] == first + 40
+
+@pytest.fixture
+def restore_signals():
+    names = ["SIGTERM", "SIGINT", "SIGHUP"]
+    saved = {name: signal.getsignal(getattr(signal, name)) for name in names if hasattr(signal, name)}
+    yield
+    for name, handler in saved.items():
+        signal.signal(getattr(signal, name), handler)
+
+@pytest.mark.skipif(not hasattr(signal, "SIGHUP"), reason="SIGHUP is not available on this platform")
+def test_sighup_reapplies_process_settings(monkeypatch, restore_signals):
+    old = {"_config_file": "server1.yaml", "http": {"pool_maxsize": 20}}
+    new = {"_config_file": "server1.yaml", "http": {"pool_maxsize": 5}, "schedule": {"max_concurrent_servers": 4}}
+    configured = []
+    cycles = []
+    monkeypatch.setattr(monitor, "configure_process", configured.append)
+    monkeypatch.setattr(monitor, "load_configs", lambda config_dir, cache_dir: ([new], {}, [None]))
+    monkeypatch.setattr(monitor, "log_http_stats", lambda: None)
+    for closer in (monitor.mod_resolver, monitor.discord_notifier, monitor.http_session):
+        monkeypatch.setattr(closer, "close", lambda: None)
+
+    def run_servers(servers, required, max_workers=1):
+        cycles.append(([config for config, _ in servers], max_workers))
+        os.kill(os.getpid(), signal.SIGHUP if len(cycles) == 1 else signal.SIGTERM)
+    monkeypatch.setattr(monitor, "run_servers", run_servers)
+
+    monitor.run_daemon("config", [old], {}, [None], max_workers=1, config_cache_dir=None)
+    assert configured == [new]
+    assert cycles == [([old], 1), ([new], 4)]
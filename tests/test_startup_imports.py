@@ -0,0 +1,27 @@
+# DayZ Server Monitor
+# Project: DayZ Server Monitor
+# File: tests/test_startup_imports.py
+# Purpose: Importing the entrypoint does not load the HTTP, async and server-query dependencies; the mod check
+#          modes are imported by mod_resolver on first use
+# Author: Tig Campbell-Moore (firstname[at]lastname[dot]com)
+# License: CC BY-NC 4.0 (see LICENSE file)
+
+from src import mod_resolver
+from benchmarks.bench_startup import eager_lazy_modules, parse_importtime
+
+def test_monitor_import_leaves_heavy_dependencies_unloaded():
+    assert eager_lazy_modules("monitor") == []
+
+def test_modes_are_imported_on_first_use():
+    from src.modes import async_mode, serial_mode
+    assert mod_resolver._get_runner("async") is async_mode
+    assert mod_resolver._get_runner("nonsense") is serial_mode
+
+def test_parse_importtime():
+    stderr = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |   _io\n"
+        "import time:      1500 |       2100 | monitor\n"
+        "unrelated warning\n"
+    )
+    assert parse_importtime(stderr) == [("_io", 120, 120), ("monitor", 1500, 2100)]
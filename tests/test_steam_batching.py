@@ -0,0 +1,55 @@
+# DayZ Server Monitor
+# Project: DayZ Server Monitor
+# File: tests/test_steam_batching.py
+# Purpose: Unit tests for batched Steam GetPublishedFileDetails lookups
+# Author: Tig Campbell-Moore (firstname[at]lastname[dot]com)
+# License: CC BY-NC 4.0 (see LICENSE file)
+
+from src import steam_api
+from src.modes import serial_mode, threaded_mode
+
+def fake_details(batch):
+    return {wid: {"title": f"Mod {wid}", "time_updated": int(wid), "description": ""} for wid in batch}
+
+def test_build_batch_payload():
+    data = steam_api.build_batch_payload(["1", "2", "3"])
+    assert data["itemcount"] == 3
+    assert data["publishedfileids[0]"] == "1"
+    assert data["publishedfileids[2]"] == "3"
+
+def test_parse_batch_response_keys_by_id():
+    payload = {"response": {"publishedfiledetails": [
+        {"publishedfileid": "10", "title": "A", "time_updated": 5},
+        {"publishedfileid": "11", "result": 9},
+    ]}}
+    details = steam_api.parse_batch_response(payload)
+    assert details["10"]["title"] == "A"
+    assert details["11"]["title"] == "Unknown"
+
+def test_serial_mode_batches_requests(monkeypatch):
+    calls = []
+    def fetch(batch, api_url=None):
+        calls.append(list(batch))
+        return fake_details(batch)
+    monkeypatch.setattr(steam_api, "fetch_batch", fetch)
+
+    mods = [{"workshop_id": str(i)} for i in range(1, 251)]
+    config = {"mods": {"steam_batch_size": 100}, "steam": {"cache_enabled": False}}
+    results = serial_mode.run(config, {}, mods)
+
+    assert [len(c) for c in calls] == [100, 100, 50]
+    assert [r["workshop_id"] for r in results] == [m["workshop_id"] for m in mods]
+
+def test_threaded_mode_batches_requests(monkeypatch):
+    calls = []
+    def fetch(batch, api_url=None):
+        calls.append(list(batch))
+        return fake_details(batch)
+    monkeypatch.setattr(steam_api, "fetch_batch", fetch)
+
+    mods = [{"workshop_id": str(i)} for i in range(1, 21)] + [{"workshop_id": "5"}, {"name": "no id"}]
+    config = {"mods": {"steam_batch_size": 8}, "threaded_mode": {"max_workers": 4}, "steam": {"cache_enabled": False}}
+    results = threaded_mode.run(config, {}, mods)
+
+    assert sorted(len(c) for c in calls) == [4, 8, 8]
+    assert len(results) == 20
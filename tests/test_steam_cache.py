@@ -0,0 +1,65 @@
+# DayZ Server Monitor
+# Project: DayZ Server Monitor
+# File: tests/test_steam_cache.py
+# Purpose: Unit tests for the persistent Steam Workshop metadata cache
+# Author: Tig Campbell-Moore (firstname[at]lastname[dot]com)
+# License: CC BY-NC 4.0 (see LICENSE file)
+
+import time
+import monitor
+from src import steam_api
+from src import steam_cache
+from src.modes import serial_mode
+
+def test_cache_round_trip_and_ttl(tmp_path, monkeypatch):
+    cache = steam_cache.WorkshopCache(tmp_path / "cache.sqlite3", ttl_seconds=60, max_entries=100)
+    cache.put_many({"1": {"title": "A", "time_updated": 5, "description": "x"}})
+    assert cache.get_many(["1", "2"]) == {"1": {"title": "A", "time_updated": 5, "description": "x"}}
+
+    real_time = time.time
+    monkeypatch.setattr(steam_cache.time, "time", lambda: real_time() + 120)
+    assert cache.get_many(["1"]) == {}
+
+def test_cache_evicts_oldest_entries(tmp_path):
+    cache = steam_cache.WorkshopCache(tmp_path / "cache.sqlite3", ttl_seconds=600, max_entries=3)
+    for wid in ("1", "2", "3", "4", "5"):
+        cache.put_many({wid: {"title": wid}})
+    assert set(cache.get_many(["1", "2", "3", "4", "5"])) == {"3", "4", "5"}
+
+def test_cache_shared_between_connections(tmp_path):
+    path = tmp_path / "cache.sqlite3"
+    steam_cache.WorkshopCache(path).put_many({"7": {"title": "Shared"}})
+    assert steam_cache.WorkshopCache(path).get_many(["7"])["7"]["title"] == "Shared"
+
+def test_serial_mode_uses_cache(tmp_path, monkeypatch):
+    calls = []
+    def fetch(batch, api_url=None):
+        calls.append(list(batch))
+        return {wid: {"title": f"Mod {wid}", "time_updated": 1, "description": ""} for wid in batch}
+    monkeypatch.setattr(steam_api, "fetch_batch", fetch)
+
+    config = {"steam": {"cache_path": str(tmp_path / "cache.sqlite3")}}
+    mods = [{"workshop_id": "1"}, {"workshop_id": "2"}]
+    serial_mode.run(config, {}, mods)
+    results = serial_mode.run(config, {}, mods + [{"workshop_id": "3"}])
+
+    assert calls == [["1", "2"], ["3"]]
+    assert [(r["workshop_id"], r["cached"]) for r in results] == [("1", True), ("2", True), ("3", False)]
+
+def test_unresolved_lookups_are_not_cached(tmp_path, monkeypatch):
+    calls = []
+    def fetch(batch, api_url=None):
+        calls.append(list(batch))
+        details = {"1": {"title": "Mod 1", "time_updated": 1, "description": "", "raw": {"result": 1, "time_updated": 1}}}
+        # Steam could not resolve mod 2 this time (e.g. a transient failure)
+        details["2"] = steam_api.details_to_info({"publishedfileid": "2", "result": 9})
+        return details
+    monkeypatch.setattr(steam_api, "fetch_batch", fetch)
+
+    config = {"steam": {"cache_path": str(tmp_path / "cache.sqlite3")}}
+    mods = [{"workshop_id": "1"}, {"workshop_id": "2"}]
+    serial_mode.run(config, {}, mods)
+    serial_mode.run(config, {}, mods)
+    assert calls == [["1", "2"], ["2"]]
+    # Every scheduled check sees fresh details
+    assert steam_cache.DEFAULT_TTL_SECONDS < monitor.DEFAULT_INTERVAL_SECONDS
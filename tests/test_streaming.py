@@ -0,0 +1,120 @@
+# DayZ Server Monitor
+# Project: DayZ Server Monitor
+# File: tests/test_streaming.py
+# Purpose: Mode results stream out per completed batch, and run_mod_check diffs/renders them as they arrive
+# Author: Tig Campbell-Moore (firstname[at]lastname[dot]com)
+# License: CC BY-NC 4.0 (see LICENSE file)
+
+import time
+from pathlib import Path
+import pytest
+from src import mod_checker
+from src import mod_resolver
+from src import output_handler
+from src import server_query
+from src import steam_api
+from src.modes import async_mode
+from src.templates import TemplateLoader
+from tests.fakes.steam_server import FakeSteamServer
+
+LOCALES = Path(__file__).resolve().parent.parent / "locales"
+SLOW_ID = "900"
+
+class SlowBatchServer(FakeSteamServer):
+    """Delays only the batch containing SLOW_ID."""
+    def respond(self, ids):
+        if SLOW_ID in ids:
+            time.sleep(1.0)
+        return super().respond(ids)
+
+@pytest.fixture(autouse=True)
+def close_engine():
+    yield
+    async_mode.close()
+
+@pytest.mark.parametrize("mode", ["threaded", "async"])
+def test_results_stream_in_completion_order(mode):
+    mods = [{"name": f"Mod {i}", "workshop_id": str(900 + i)} for i in range(20)]
+    with SlowBatchServer() as server:
+        config = {
+            "mods": {"mod_check_mode": mode, "steam_batch_size": 5},
+            "steam": {"cache_enabled": False, "api_url": server.url},
+        }
+        start = time.perf_counter()
+        arrivals = []
+        for record in mod_resolver.iter_mod_details(config, None, mods):
+            arrivals.append((record["workshop_id"], time.perf_counter() - start))
+
+    assert len(arrivals) == 20
+    # The fast batches are not held back by the slow one
+    assert arrivals[0][1] < 0.5
+    assert {wid for wid, _ in arrivals[-5:]} == {str(900 + i) for i in range(5)}
+
+def test_run_keeps_server_order():
+    mods = [{"name": f"Mod {i}", "workshop_id": str(900 + i)} for i in range(12)]
+    with SlowBatchServer() as server:
+        config = {"mods": {"steam_batch_size": 4}, "steam": {"cache_enabled": False, "api_url": server.url}}
+        results = mod_resolver.fetch_mod_details(config, None, mods, "threaded")
+    assert [r["workshop_id"] for r in results] == [m["workshop_id"] for m in mods]
+
+def test_changelogs_rendered_only_within_report_limit(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    mods = [{"name": f"Mod {i}", "workshop_id": str(i)} for i in range(1, 31)]
+    monkeypatch.setattr(server_query, "query_server", lambda ip, port, timeout=None: ({"island": "chernarusplus"}, mods))
+    monkeypatch.setattr(steam_api, "fetch_batch", lambda batch, api_url=None: {
+        wid: steam_api.details_to_info({"publishedfileid": wid, "title": f"Mod {wid}", "time_updated": 5, "description": "x"})
+        for wid in batch
+    })
+    rendered = []
+    real_render = mod_checker.render_changelog
+    monkeypatch.setattr(mod_checker, "render_changelog", lambda *args: rendered.append(args[1]) or real_render(*args))
+    config = {
+        "server_name": "stream_test",
+        "server": {"ip": "127.0.0.1", "port": 2302},
+        "mods": {"mod_check_mode": "serial", "steam_batch_size": 7, "report_limit": 3, "changelog_source": "description"},
+        "output": {"to_console": False, "to_discord": False},
+        "steam": {"cache_enabled": False},
+    }
+    templates = TemplateLoader("en_GB", base_path=LOCALES)
+
+    with output_handler.output_buffer():
+        wids, _ = mod_checker.run_mod_check(config, templates)
+        summary = output_handler.get_all_output()
+
+    assert len(wids) == 30
+    assert "30 mods updated/added" in summary
+    assert len(rendered) == 3
+
+def test_added_then_updated_in_server_order(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    mods = [{"name": name, "workshop_id": wid} for wid, name in (("3", "C"), ("1", "A"), ("2", "B"))]
+    monkeypatch.setattr(server_query, "query_server", lambda ip, port, timeout=None: ({"island": "chernarusplus"}, mods))
+    times = {"1": 1, "2": 1, "3": 1}
+    monkeypatch.setattr(steam_api, "fetch_batch", lambda batch, api_url=None: {
+        wid: steam_api.details_to_info({"publishedfileid": wid, "title": f"Mod {wid}", "time_updated": times[wid]})
+        for wid in batch if wid in times
+    })
+    config = {
+        "server_name": "order_test",
+        "server": {"ip": "127.0.0.1", "port": 2302},
+        "mods": {"mod_check_mode": "serial", "steam_batch_size": 1, "show_mod_changelog": False},
+        "output": {"to_console": False, "to_discord": False},
+        "steam": {"cache_enabled": False},
+    }
+    templates = TemplateLoader("en_GB", base_path=LOCALES)
+    captured = []
+    real_build = mod_checker.build_summary_with_mods
+    def build(config, templates, mod_messages, **kwargs):
+        captured.append([(m["type"], m["title"]) for m in mod_messages])
+        return real_build(config, templates, mod_messages, **kwargs)
+    monkeypatch.setattr(mod_checker, "build_summary_with_mods", build)
+
+    del times["2"]
+    with output_handler.output_buffer():
+        mod_checker.run_mod_check(config, templates)
+    times.update({"1": 2, "2": 1})
+    with output_handler.output_buffer():
+        mod_checker.run_mod_check(config, templates)
+
+    assert captured[0] == [("new", "Mod 3"), ("new", "Mod 1")]
+    assert captured[1][:2] == [("new", "Mod 2"), ("updated", "Mod 1")]
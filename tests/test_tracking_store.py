@@ -0,0 +1,61 @@
+# DayZ Server Monitor
+# Project: DayZ Server Monitor
+# File: tests/test_tracking_store.py
+# Purpose: Mod tracking store: delta writes, change events since a time, legacy snapshot import
+# Author: Tig Campbell-Moore (firstname[at]lastname[dot]com)
+# License: CC BY-NC 4.0 (see LICENSE file)
+
+import json
+from pathlib import Path
+from src.tracking_store import TrackingStore
+
+def mods(*entries):
+    return {wid: {"name": name, "workshop_id": wid, "time_updated": updated} for wid, name, updated in entries}
+
+def test_only_changes_are_recorded(tmp_path):
+    store = TrackingStore(tmp_path / "tracking.sqlite3")
+    first = store.record("srv", mods(("1", "CF", 100), ("2", "Expansion", 200)), recorded_at=1000)
+    assert sorted((e["workshop_id"], e["event"]) for e in first) == [("1", "added"), ("2", "added")]
+
+    # Unchanged state writes nothing
+    assert store.record("srv", mods(("1", "CF", 100), ("2", "Expansion", 200)), recorded_at=2000) == []
+
+    second = store.record("srv", mods(("1", "CF", 150), ("3", "Trader", 300)), recorded_at=3000)
+    assert sorted((e["workshop_id"], e["event"]) for e in second) == [("1", "updated"), ("2", "removed"), ("3", "added")]
+    updated = next(e for e in second if e["event"] == "updated")
+    assert (updated["time_updated"], updated["previous_time_updated"]) == (150, 100)
+
+    assert store.load_state("srv") == mods(("1", "CF", 150), ("3", "Trader", 300))
+    assert [e["event"] for e in store.changes_since("srv", 2500)] == ["updated", "added", "removed"]
+    assert len(store.changes_since("srv", 0)) == 5
+    assert store.changes_since("other", 0) == []
+    assert [e["event"] for e in store.mod_history("1")] == ["added", "updated"]
+
+def test_legacy_snapshot_is_imported_without_events(tmp_path):
+    legacy = mods(("1", "CF", 100), ("2", "Expansion", 200))
+    (tmp_path / "srv_mods.json").write_text(json.dumps(legacy))
+    store = TrackingStore(tmp_path / "tracking.sqlite3")
+
+    assert store.load_state("srv") == legacy
+    assert store.changes_since("srv", 0) == []
+    assert (tmp_path / "srv_mods.json.migrated").exists()
+
+    events = store.record("srv", mods(("1", "CF", 100)), recorded_at=10)
+    assert [(e["workshop_id"], e["event"]) for e in events] == [("2", "removed")]
+
+def test_legacy_import_tolerates_a_concurrent_import(tmp_path, monkeypatch):
+    legacy = mods(("1", "CF", 100), ("2", "Expansion", 200))
+    (tmp_path / "srv_mods.json").write_text(json.dumps(legacy))
+    (tmp_path / "new_mods.json").write_text(json.dumps(legacy))
+    # Another process (its own store and connection) imports and renames the files first ...
+    other = TrackingStore(tmp_path / "tracking.sqlite3")
+    assert other.load_state("srv") == legacy
+
+    # ... after this one saw them: the rename, and for a server with no rows yet the read, miss the file
+    store = TrackingStore(tmp_path / "tracking.sqlite3")
+    (tmp_path / "new_mods.json").rename(tmp_path / "gone.json")
+    original_exists = Path.exists
+    monkeypatch.setattr(Path, "exists", lambda self: self.name.endswith("_mods.json") or original_exists(self))
+    assert store.load_state("srv") == legacy
+    assert store.record("srv", legacy) == []
+    assert store.load_state("new") == {}